@@ -0,0 +1,132 @@
+"""
+Batch S2DR4 inference over an AOI and a list of dates.
+Splits the AOI into overlapping 4x4 km cells and runs every (cell, date)
+job from a resumable manifest; re-running resumes where it stopped and
+retries failed cells.
+Run inside WSL2 with the s2dr4_env activated:
+    python batch_s2dr4.py --bbox 32.45 15.45 32.65 15.70 --dates 2026-02-04 2026-03-06
+    python batch_s2dr4.py --aoi khartoum.geojson --dates 2026-02-04
+    python batch_s2dr4.py            # resume the existing manifest
+"""
+import os
+import sys
+import json
+import argparse
+
+from inference_batch import (CELL_OVERLAP_M, CELL_SIZE_M, MAX_ATTEMPTS, Manifest,
+                             bbox_polygon, load_aoi_polygons, plan_cells, run_jobs)
+from cog import COG_COMPRESS, convert_to_cog
+from consistency import check_thresholds, consistency_metrics, report_path
+from result_cache import ResultCache, s2dr4_version
+
+# Output directory — results saved here
+OUTPUT_DIR = os.path.expanduser("~/s2dr4_output")
+COLAB_OUTPUT = "/content/output"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch S2DR4 inference over an AOI grid.")
+    aoi = parser.add_mutually_exclusive_group()
+    aoi.add_argument("--bbox", type=float, nargs=4, metavar=("LON_MIN", "LAT_MIN", "LON_MAX", "LAT_MAX"))
+    aoi.add_argument("--aoi", metavar="GEOJSON", help="AOI polygon(s) in lon/lat")
+    parser.add_argument("--dates", nargs="+", default=[], help="target dates, YYYY-MM-DD")
+    parser.add_argument("--cell-size", type=float, default=CELL_SIZE_M, help="cell size in m")
+    parser.add_argument("--overlap", type=float, default=CELL_OVERLAP_M, help="cell overlap in m")
+    parser.add_argument("--manifest", default=os.path.join(OUTPUT_DIR, "batch_manifest.json"))
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    parser.add_argument("--no-cache", action="store_true", help="always run inference")
+    parser.add_argument("--cog", default=COG_COMPRESS, choices=["ZSTD", "DEFLATE", "none"],
+                        help="rewrite outputs as COGs with this codec (default: %(default)s)")
+    parser.add_argument("--reference", help="original 10 m stack; each cell's _MS product is "
+                        "checked against it (<stem>_consistency.json)")
+    parser.add_argument("--min-ssim", type=float, help="fail cells below this mean SSIM vs --reference")
+    parser.add_argument("--max-sam", type=float,
+                        help="fail cells above this mean spectral angle (deg) vs --reference")
+    parser.add_argument("--plan-only", action="store_true", help="write the manifest and stop")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("S2DR4 Batch Inference")
+    print("=" * 60)
+
+    manifest = Manifest(args.manifest)
+    if args.bbox or args.aoi:
+        if not args.dates:
+            parser.error("--dates is required when adding an AOI")
+        rings = [bbox_polygon(*args.bbox)] if args.bbox else load_aoi_polygons(args.aoi)
+        cells = plan_cells(rings, args.cell_size, args.overlap)
+        added = manifest.add(cells, args.dates)
+        print(f"  Cells:     {len(cells)} x {len(args.dates)} dates "
+              f"({args.cell_size / 1000:g} km, {args.overlap:g} m overlap) in {cells[0]['crs']}")
+        print(f"  New jobs:  {added}")
+    elif not manifest.jobs:
+        parser.error(f"no manifest at {args.manifest}; pass --bbox or --aoi with --dates")
+
+    print(f"  Manifest:  {args.manifest}")
+    print(f"  Jobs:      {manifest.counts()}")
+    if args.plan_only:
+        return
+
+    # S2DR4 expects output at /content/output (Google Colab convention)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs("/content", exist_ok=True)
+    if os.path.islink(COLAB_OUTPUT):
+        os.unlink(COLAB_OUTPUT)
+    if not os.path.exists(COLAB_OUTPUT):
+        os.symlink(OUTPUT_DIR, COLAB_OUTPUT)
+
+    try:
+        import s2dr4.inferutils
+    except ImportError:
+        print("ERROR: s2dr4 not installed. Run setup_wsl.sh first.")
+        sys.exit(1)
+
+    cache = None if args.no_cache else ResultCache()
+    version = s2dr4_version()
+
+    def infer(lonlat, date):
+        """Link a cached result if there is one, otherwise run S2DR4."""
+        entry = cache.lookup(lonlat, date, version) if cache else None
+        if entry:
+            print(f"    cache hit (scene {entry['scene_date']})")
+            return cache.materialize(entry, OUTPUT_DIR)
+        s2dr4.inferutils.test(lonlat, date)
+        return None
+
+    def check_consistency(job_id, outputs):
+        """Compare the cell's _MS product with --reference; raise if a threshold fails.
+        Cells outside the reference are recorded but not gated."""
+        for path in outputs:
+            if not path.endswith("_MS.tif"):
+                continue
+            metrics = consistency_metrics(path, args.reference)
+            with open(report_path(path), "w", encoding="utf-8") as f:
+                json.dump(metrics, f, indent=1)
+            manifest.update(job_id, metrics=dict(metrics["summary"], valid_pixels=metrics["valid_pixels"],
+                                                 sam_deg=metrics["spectral_angle"]["mean_deg"]))
+            failed = metrics["valid_pixels"] and check_thresholds(
+                metrics, min_ssim=args.min_ssim, max_sam=args.max_sam)
+            if failed:
+                raise ValueError(f"consistency: {'; '.join(failed)}")
+
+    def postprocess(job_id, job, outputs):
+        if args.cog != "none":
+            convert_to_cog(outputs, compress=args.cog, log=lambda msg: None)
+        if args.reference:
+            # Before caching, so results that fail the gate are not reused
+            check_consistency(job_id, outputs)
+        if cache:
+            cache.store(job["lonlat"], job["date"], version, OUTPUT_DIR, outputs)
+
+    print("\nRunning jobs...")
+    counts = run_jobs(manifest, infer, OUTPUT_DIR, postprocess=postprocess,
+                      max_attempts=args.max_attempts)
+
+    print("\n" + "=" * 60)
+    print(f"DONE! {counts}")
+    print(f"  Manifest: {args.manifest}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Benchmark the imagery hot paths on deterministic synthetic scenes.
+Generates (once, then reuses) synthetic rasters in the real Data/ and
+S2DR4_Khartoum_1m/ layouts at several sizes, times each hot function and the
+full comparison build, records peak memory, and writes the results as JSON
+so runs can be compared over time.
+Run: python benchmark.py [--sizes 1 2 4] [--repeat 3] [--compare old.json]
+"""
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import argparse
+
+import numpy as np
+import PIL
+import rasterio
+from PIL import Image
+
+from s2dr4_tools import (MAX_DIM, float_to_uint8, ndvi_colormap, raster_stats, read_full,
+                         read_within_bounds)
+from s2dr4_tools.grid_align import clear_grid_maps
+from s2dr4_tools.image_codecs import save_image
+from s2dr4_tools.spectral import INDICES, compute_indices, evaluate
+from synthetic_data import make_scene
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.expanduser("~/.cache/s2dr4_bench")
+RESULTS_DIR = os.path.join(BASE, "benchmarks")
+RSS_POLL_S = 0.02
+
+
+def measure(fn, repeat):
+    """Best/median wall time over repeat runs, then one traced run for peak Python/numpy memory."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"best_s": min(times), "median_s": statistics.median(times),
+            "peak_mb": peak / (1024 * 1024)}
+
+
+def _peak_rss_mb(pid):
+    """VmHWM (peak resident set) of a running process, Linux only."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def measure_script(root, script_args, repeat):
+    """Run create_comparison.py against a scene tree; peak is the child's max RSS."""
+    # create_comparison.py resolves its data relative to its own directory
+    # (without following symlinks), so a scripts/ link makes root the project
+    link = os.path.join(root, "scripts")
+    if not os.path.exists(link):
+        os.symlink(SCRIPT_DIR, link, target_is_directory=True)
+    cmd = [sys.executable, os.path.join(link, "create_comparison.py")] + script_args
+    env = dict(os.environ, BROWSER="true")
+    times, peak = [], None
+    for _ in range(repeat):
+        with tempfile.TemporaryFile() as err:
+            t0 = time.perf_counter()
+            proc = subprocess.Popen(cmd, cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=err)
+            # The high-water mark only grows, so the last sample before exit is the peak
+            while proc.poll() is None:
+                rss = _peak_rss_mb(proc.pid)
+                if rss is not None:
+                    peak = max(peak or 0, rss)
+                time.sleep(RSS_POLL_S)
+            times.append(time.perf_counter() - t0)
+            if proc.returncode != 0:
+                err.seek(0)
+                raise RuntimeError(f"{' '.join(script_args) or 'static'} build failed:\n"
+                                   f"{err.read().decode(errors='replace')[-2000:]}")
+    return {"best_s": min(times), "median_s": statistics.median(times), "peak_mb": peak}
+
+
+def cases(paths, workdir):
+    """{name: zero-argument callable} for one scene."""
+    with rasterio.open(paths["TCI"]) as ds:
+        sr_bounds, sr_crs, sr_w, sr_h = ds.bounds, ds.crs, ds.width, ds.height
+    with rasterio.open(paths["orig"]) as ds:
+        descriptions = ds.descriptions
+    b4, b8 = descriptions.index("B4") + 1, descriptions.index("B8") + 1
+    scale = min(1.0, MAX_DIM / max(sr_w, sr_h))
+    disp_w, disp_h = int(sr_w * scale), int(sr_h * scale)
+
+    def read_orig():
+        # Original bands onto the full SR grid, map built cold
+        clear_grid_maps()
+        return read_within_bounds(paths["orig"], sr_bounds, sr_w, sr_h, [b4, b8], sr_crs)
+
+    red, nir = read_orig()
+
+    def read_sr_display():
+        # Decimated decode of the TCI at display size
+        return read_full(paths["TCI"], target_w=disp_w, target_h=disp_h)[0]
+
+    tci = Image.fromarray(np.moveaxis(read_sr_display(), 0, -1))
+
+    def stretch():
+        return float_to_uint8(red)
+
+    def ndvi():
+        return ndvi_colormap(evaluate(INDICES["NDVI"], {"B8": nir, "B4": red}))
+
+    def encode(codec):
+        return lambda: save_image(tci, io.BytesIO(), codec, 88)
+
+    return {
+        "read_within_bounds": read_orig,
+        "read_full_display": read_sr_display,
+        "float_to_uint8": stretch,
+        "ndvi_colormap": ndvi,
+        "encode_jpeg": encode("jpeg"),
+        "encode_webp": encode("webp"),
+        "stats_ms": lambda: raster_stats(paths["MS"]),
+        "spectral_indices": lambda: compute_indices(
+            paths["MS"], {k: INDICES[k] for k in ("NDVI", "NDWI", "MNDWI")}, workdir),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "numpy": np.__version__, "pillow": PIL.__version__,
+            "rasterio": rasterio.__version__, "gdal": rasterio.__gdal_version__}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark imagery hot paths on synthetic scenes.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 2],
+                        help="SR extents in km (1 km = 1000 x 1000 px at 1 m)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", metavar="CASE", help="run only these cases")
+    parser.add_argument("--no-build", action="store_true", help="skip the full comparison builds")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="where synthetic scenes are cached")
+    parser.add_argument("--output", help="results JSON (default: benchmarks/bench_<time>.json)")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results to compare against")
+    args = parser.parse_args(argv)
+
+    print("=" * 72)
+    print("Imagery benchmark (synthetic scenes)")
+    print("=" * 72)
+
+    results = []
+    for size in args.sizes:
+        root = os.path.join(args.data_dir, f"{size:g}km")
+        t0 = time.perf_counter()
+        paths = make_scene(root, size)
+        print(f"\n  Scene {size:g} km: {root} ({time.perf_counter() - t0:.1f} s to prepare)")
+        print(f"  {'Case':<22} {'Best s':>9} {'Median s':>9} {'Peak MB':>9}")
+        with tempfile.TemporaryDirectory() as workdir:
+            runs = cases(paths, workdir)
+            if not args.no_build:
+                runs["comparison_static"] = lambda: measure_script(root, [], args.repeat)
+                runs["comparison_tiles"] = lambda: measure_script(root, ["--tiles"], args.repeat)
+            for name, fn in runs.items():
+                if args.only and name not in args.only:
+                    continue
+                r = fn() if name.startswith("comparison_") else measure(fn, args.repeat)
+                results.append(dict(r, case=name, size_km=size))
+                peak = f"{r['peak_mb']:9.1f}" if r["peak_mb"] is not None else f"{'-':>9}"
+                print(f"  {name:<22} {r['best_s']:9.3f} {r['median_s']:9.3f} {peak}")
+
+    report = {"environment": environment(), "repeat": args.repeat, "results": results}
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"\n  Results: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {(r["case"], r["size_km"]): r for r in json.load(f)["results"]}
+        print(f"\n  vs {args.compare} (speedup = old best / new best)")
+        for r in results:
+            old = baseline.get((r["case"], r["size_km"]))
+            if old:
+                print(f"  {r['case']:<22} {r['size_km']:>4g} km  {old['best_s'] / r['best_s']:6.2f}x")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Refresh and query the raster catalog.
+Rescans only GeoTIFFs that are new or changed since the last run, then lists
+the rasters matching the filters.
+Run: python catalog.py [roots ...] [--product MS] [--date 20260131] [--bbox 32.45 15.45 32.65 15.70]
+"""
+import os
+import time
+import argparse
+
+from raster_catalog import CATALOG_PATH, CATALOG_WORKERS, RasterCatalog
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE = os.path.dirname(SCRIPT_DIR)
+DEFAULT_ROOTS = [os.path.join(BASE, "Data"), os.path.join(BASE, "S2DR4_Khartoum_1m"),
+                 os.path.expanduser("~/s2dr4_output")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh and query the raster catalog.")
+    parser.add_argument("roots", nargs="*", help="directories or files to catalog "
+                        "(default: Data/, S2DR4_Khartoum_1m/ and ~/s2dr4_output when present)")
+    parser.add_argument("--db", default=CATALOG_PATH, help="catalog file (default: %(default)s)")
+    parser.add_argument("--bbox", type=float, nargs=4, metavar=("LON_MIN", "LAT_MIN", "LON_MAX", "LAT_MAX"))
+    parser.add_argument("--date", help="scene date, YYYYMMDD or YYYY-MM-DD")
+    parser.add_argument("--start", help="first date of a range")
+    parser.add_argument("--end", help="last date of a range")
+    parser.add_argument("--product", nargs="+", choices=["MS", "TCI", "IRP", "NDVI"])
+    parser.add_argument("--tile", help="MGRS tile, e.g. T36PVC")
+    parser.add_argument("--no-refresh", action="store_true", help="query without rescanning")
+    parser.add_argument("--no-stats", action="store_true", help="catalog metadata only (faster)")
+    parser.add_argument("--workers", type=int, default=CATALOG_WORKERS)
+    args = parser.parse_args(argv)
+
+    roots = args.roots or [r for r in DEFAULT_ROOTS if os.path.exists(r)]
+
+    print("=" * 80)
+    print(f"Raster catalog: {args.db}")
+    print("=" * 80)
+
+    with RasterCatalog(args.db) as catalog:
+        if not args.no_refresh:
+            t0 = time.perf_counter()
+            result = catalog.refresh(roots, workers=args.workers, stats=not args.no_stats,
+                                     progress=lambda done, total: print(f"\r  Scanned: {done}/{total}", end=""))
+            print(f"\r  {len(result['scanned'])} scanned, {result['unchanged']} unchanged, "
+                  f"{len(result['removed'])} removed ({time.perf_counter() - t0:.1f} s)")
+            for path in result["scanned"]:
+                rec = catalog.get(path)
+                if rec["error"]:
+                    print(f"  ERROR {path}: {rec['error']}")
+
+        try:
+            rows = catalog.query(bbox=args.bbox, date=args.date, start=args.start, end=args.end,
+                                 product=args.product, tile=args.tile,
+                                 under=args.roots or None)
+        except ValueError as e:
+            parser.error(str(e))
+
+        print(f"\n  {'Date':<10} {'Product':<7} {'Tile':<7} {'Size px':>11} {'Bands':>5} {'Res m':>6}  Path")
+        for r in rows:
+            size = f"{r['width']}x{r['height']}"
+            print(f"  {r['date'] or '-':<10} {r['product'] or '-':<7} {r['tile'] or '-':<7} "
+                  f"{size:>11} {r['count']:>5} {r['res_x']:>6.1f}  {r['path']}")
+        print(f"\n  {len(rows)} rasters")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
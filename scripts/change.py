@@ -0,0 +1,295 @@
+"""
+Bi-temporal change detection between two S2DR4 products of one AOI.
+Both rasters are streamed block by block across a thread pool, the earlier
+one aligned onto the later one's grid when the grids differ. _MS pairs give
+the change-vector magnitude over their common bands and the NDVI delta
+(B8 / B4); single-band NDVI rasters (compute_indices.py) give the delta
+alone. A second pass over the written rasters thresholds them into a
+change-class mask and counts changed pixels per coarse cell; cells that are
+mostly changed are vectorized into summary polygons. Only the blocks in
+flight and the cell grid (1 / CELL_PX^2 of the pixels) are held in memory.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import rasterio
+from affine import Affine
+from rasterio.features import shapes
+from rasterio.warp import transform_geom
+
+from raster_catalog import parse_name
+from s2dr4_tools.grid_align import grid_map
+from s2dr4_tools.spectral import INDICES, band_names, evaluate
+from s2dr4_tools.stats import BandStats
+from s2dr4_tools.validity import load_mask
+
+CHANGE_WORKERS = os.cpu_count()
+BLOCK_SIZE = 512
+CELL_PX = 32
+MAGNITUDE_SIGMA = 2.0
+NDVI_DELTA = 0.2
+MIN_CELL_FRACTION = 0.25
+
+# Change mask bit flags; MASK_NODATA where either date is invalid
+CHANGED, NDVI_LOSS, NDVI_GAIN = 1, 2, 4
+MASK_NODATA = 255
+CLASSES = {"changed": CHANGED, "ndvi_loss": NDVI_LOSS, "ndvi_gain": NDVI_GAIN}
+
+
+def _kind(ds):
+    """'MS' (named multi-band reflectance) or 'NDVI' (one band of values)."""
+    if ds.count == 1:
+        return "NDVI"
+    if ds.count == 3 and ds.dtypes[0] == "uint8":
+        raise ValueError(f"{ds.name} is a color rendering; pass the _MS product or an "
+                         f"NDVI raster from compute_indices.py")
+    band_names(ds)
+    return "MS"
+
+
+def _stem(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for suffix in ("_MS", "_NDVI"):
+        if stem.endswith(suffix):
+            return stem[:-len(suffix)]
+    return stem
+
+
+def change_prefix(before_path, after_path, output_dir):
+    """<output_dir>/<after stem>_vs_<before date or stem>"""
+    date = parse_name(before_path)["date"]
+    return os.path.join(output_dir, f"{_stem(after_path)}_vs_"
+                                    f"{date.replace('-', '') if date else _stem(before_path)}")
+
+
+def _polygon_area(coords):
+    x, y = np.asarray(coords, dtype=np.float64).T
+    return 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))))
+
+
+def _stats_summary(stats):
+    if not stats.count:
+        return None
+    p5, p50, p95 = stats.percentile([5, 50, 95]).tolist()
+    return {"mean": stats.mean, "std": stats.std, "min": stats.min, "max": stats.max,
+            "p5": p5, "p50": p50, "p95": p95}
+
+
+def detect_change(before_path, after_path, output_dir, magnitude_threshold=None,
+                  sigma=MAGNITUDE_SIGMA, ndvi_delta=NDVI_DELTA, scale=1.0, cell_px=CELL_PX,
+                  min_cell_fraction=MIN_CELL_FRACTION, workers=CHANGE_WORKERS,
+                  block_size=BLOCK_SIZE, progress=None):
+    """Compare before_path with after_path and write, under change_prefix():
+    _magnitude.tif (_MS pairs), _dNDVI.tif, _change.tif (uint8 CHANGED /
+    NDVI_LOSS / NDVI_GAIN flags), _change.geojson (lon/lat polygons of cells
+    at least min_cell_fraction changed) and _change.json (the returned summary).
+
+    Without magnitude_threshold a pixel is CHANGED above mean + sigma * std of
+    the magnitude. scale multiplies the bands of _MS inputs (1e-4 for 0-10000
+    DN), never an NDVI raster. progress(pass, done, total) is called per block.
+    """
+    t0 = time.perf_counter()
+    if block_size % cell_px:
+        raise ValueError(f"block size {block_size} is not a multiple of the cell size {cell_px}")
+    with rasterio.open(before_path) as b, rasterio.open(after_path) as a:
+        kinds = (_kind(b), _kind(a))
+        grid = (a.crs, a.transform, a.width, a.height)
+        same_grid = (b.crs, b.transform, b.width, b.height) == grid
+        res = abs(a.transform.a), abs(a.transform.e)
+        if "NDVI" in kinds:
+            b_bands, a_bands, common = {"NDVI": 1}, {"NDVI": 1}, []
+            if kinds[0] == "MS":
+                b_bands = {k: band_names(b)[k] for k in ("B8", "B4")}
+            if kinds[1] == "MS":
+                a_bands = {k: band_names(a)[k] for k in ("B8", "B4")}
+        else:
+            b_names, a_names = band_names(b), band_names(a)
+            common = [n for n in a_names if n in b_names]
+            if not {"B8", "B4"} <= set(common):
+                raise ValueError("both _MS products need B8 and B4")
+            b_bands = {n: b_names[n] for n in common}
+            a_bands = {n: a_names[n] for n in common}
+        profile = {"driver": "GTiff", "width": a.width, "height": a.height, "count": 1,
+                   "dtype": "float32", "crs": a.crs, "transform": a.transform,
+                   "nodata": np.nan, "tiled": True, "blockxsize": block_size,
+                   "blockysize": block_size, "compress": "DEFLATE", "predictor": 3,
+                   "BIGTIFF": "IF_SAFER"}
+    masks = (load_mask(before_path), load_mask(after_path))
+
+    os.makedirs(output_dir, exist_ok=True)
+    prefix = change_prefix(before_path, after_path, output_dir)
+    paths = {"dNDVI": f"{prefix}_dNDVI.tif", "change": f"{prefix}_change.tif",
+             "polygons": f"{prefix}_change.geojson", "summary": f"{prefix}_change.json"}
+    if common:
+        paths["magnitude"] = f"{prefix}_magnitude.tif"
+    rasters = [name for name in ("magnitude", "dNDVI") if name in paths]
+
+    local = threading.local()
+    lock = threading.Lock()
+    handles = []
+
+    def reader(path):
+        # Per-thread read handles: GDAL datasets are not thread-safe
+        if not hasattr(local, "ds"):
+            local.ds = {}
+            handles.append(local.ds)
+        if path not in local.ds:
+            local.ds[path] = rasterio.open(path)
+        return local.ds[path]
+
+    def read_pair(window):
+        """(before, after) {band: float32} and their joint validity on window."""
+        ds_a, ds_b = reader(after_path), reader(before_path)
+        after = ds_a.read(list(a_bands.values()), window=window).astype(np.float32, copy=False)
+        valid = masks[1].read(window)
+        if same_grid:
+            before = ds_b.read(list(b_bands.values()), window=window)
+            valid &= masks[0].read(window)
+        else:
+            gmap = grid_map(ds_b.transform, ds_b.crs, ds_b.width, ds_b.height,
+                            ds_a.window_transform(window), ds_a.crs,
+                            int(window.width), int(window.height))
+            before = gmap.read(ds_b, list(b_bands.values()))
+            valid &= gmap.read_mask(masks[0])
+        before = before.astype(np.float32, copy=False)
+        if scale != 1.0:
+            # Only reflectance is in DN; an NDVI raster is already a ratio
+            if kinds[0] == "MS":
+                before *= np.float32(scale)
+            if kinds[1] == "MS":
+                after *= np.float32(scale)
+        return dict(zip(b_bands, before)), dict(zip(a_bands, after)), valid
+
+    def ndvi(bands):
+        return bands["NDVI"] if "NDVI" in bands else evaluate(INDICES["NDVI"], bands)
+
+    # ── Pass 1: magnitude and NDVI delta ──
+    outputs = {name: rasterio.open(paths[name], "w", **profile) for name in rasters}
+    for name, dst in outputs.items():
+        dst.set_band_description(1, name)
+    # One running total per raster; each block's stats are folded in as it finishes
+    totals = {name: BandStats() for name in rasters}
+
+    def measure(window):
+        before, after, valid = read_pair(window)
+        results = {"dNDVI": ndvi(after) - ndvi(before)}
+        if common:
+            diff = np.zeros(valid.shape, dtype=np.float32)
+            for n in common:
+                diff += np.square(after[n] - before[n])
+            results["magnitude"] = np.sqrt(diff, out=diff)
+        block_stats = {}
+        for name, result in results.items():
+            result[~valid] = np.nan
+            block_stats[name] = BandStats()
+            block_stats[name].update(result)
+        with lock:
+            for name, result in results.items():
+                outputs[name].write(result, 1, window=window)
+                totals[name].merge(block_stats[name])
+
+    try:
+        windows = [win for _, win in next(iter(outputs.values())).block_windows(1)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for done, _ in enumerate(pool.map(measure, windows), start=1):
+                if progress:
+                    progress(1, done, len(windows))
+    finally:
+        for dst in outputs.values():
+            dst.close()
+    threshold = magnitude_threshold
+    if common and threshold is None and totals["magnitude"].count:
+        threshold = totals["magnitude"].mean + sigma * totals["magnitude"].std
+
+    # ── Pass 2: thresholded mask and per-cell change counts ──
+    mask_profile = dict(profile, dtype="uint8", nodata=MASK_NODATA, predictor=2)
+    ny, nx = -(-profile["height"] // cell_px), -(-profile["width"] // cell_px)
+    cell_changed = np.zeros((ny, nx), dtype=np.int32)
+    cell_valid = np.zeros((ny, nx), dtype=np.int32)
+    counts = dict.fromkeys(CLASSES, 0)
+    counts["valid"] = 0
+
+    def classify(window):
+        data = {name: reader(paths[name]).read(1, window=window) for name in rasters}
+        delta = data["dNDVI"]
+        valid = np.isfinite(delta)
+        mask = np.zeros(delta.shape, dtype=np.uint8)
+        with np.errstate(invalid="ignore"):
+            if threshold is not None:
+                mask[data["magnitude"] > threshold] |= CHANGED
+            mask[delta < -ndvi_delta] |= NDVI_LOSS
+            mask[delta > ndvi_delta] |= NDVI_GAIN
+        if not common:
+            mask[mask != 0] |= CHANGED
+        mask[~valid] = MASK_NODATA
+        changed = valid & (mask & CHANGED).astype(bool)
+
+        # Windows start on cell boundaries; pad the edge ones to whole cells
+        r0, c0 = int(window.row_off) // cell_px, int(window.col_off) // cell_px
+        h, w = -(-changed.shape[0] // cell_px), -(-changed.shape[1] // cell_px)
+        pad = ((0, h * cell_px - changed.shape[0]), (0, w * cell_px - changed.shape[1]))
+        for grid_counts, pixels in ((cell_changed, changed), (cell_valid, valid)):
+            grid_counts[r0:r0 + h, c0:c0 + w] = np.pad(pixels, pad).reshape(
+                h, cell_px, w, cell_px).sum(axis=(1, 3))
+        block_counts = {name: int(np.count_nonzero(valid & (mask & flag).astype(bool)))
+                        for name, flag in CLASSES.items()}
+        with lock:
+            mask_dst.write(mask, 1, window=window)
+            for name, n in block_counts.items():
+                counts[name] += n
+            counts["valid"] += int(valid.sum())
+
+    mask_dst = rasterio.open(paths["change"], "w", **mask_profile)
+    mask_dst.set_band_description(1, "change flags")
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for done, _ in enumerate(pool.map(classify, windows), start=1):
+                if progress:
+                    progress(2, done, len(windows))
+    finally:
+        mask_dst.close()
+        for opened in handles:
+            for ds in opened.values():
+                ds.close()
+
+    # ── Summary polygons from the cell grid ──
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hot = (cell_changed / cell_valid >= min_cell_fraction) & (cell_valid > 0)
+    cell_transform = profile["transform"] * Affine.scale(cell_px, cell_px)
+    features = []
+    for geom, _ in shapes(hot.astype(np.uint8), mask=hot, transform=cell_transform):
+        area = _polygon_area(geom["coordinates"][0]) - sum(
+            _polygon_area(ring) for ring in geom["coordinates"][1:])
+        features.append({"type": "Feature",
+                         "properties": {"id": len(features), "area_m2": round(area, 1)},
+                         "geometry": transform_geom(profile["crs"], "EPSG:4326", geom)})
+    with open(paths["polygons"], "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+
+    px_area = res[0] * res[1]
+    summary = {
+        "before": os.path.abspath(before_path),
+        "after": os.path.abspath(after_path),
+        "kind": "MS" if common else "NDVI",
+        "aligned": not same_grid,
+        "valid_pixels": counts["valid"],
+        "magnitude_threshold": threshold,
+        "ndvi_delta": ndvi_delta,
+        "classes": {name: {"pixels": counts[name], "area_m2": counts[name] * px_area,
+                           "fraction": counts[name] / counts["valid"] if counts["valid"] else None}
+                    for name in CLASSES},
+        "dNDVI": _stats_summary(totals["dNDVI"]),
+        "magnitude": _stats_summary(totals["magnitude"]) if common else None,
+        "polygons": len(features),
+        "polygon_area_m2": round(sum(f["properties"]["area_m2"] for f in features), 1),
+        "cell_px": cell_px,
+        "outputs": paths,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+    with open(paths["summary"], "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=1)
+    return summary
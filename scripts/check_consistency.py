@@ -0,0 +1,91 @@
+"""
+Check that S2DR4 _MS products stay consistent with the original 10 m data.
+Block-averages each SR product back to 10 m, compares it with the original
+stack and writes <stem>_consistency.json next to it. With thresholds, exits
+non-zero when any product fails, so batch runs can be gated on it.
+Run: python check_consistency.py ~/s2dr4_output --reference ../Data/S2_..._10bands.tif
+     python check_consistency.py ~/s2dr4_output --min-ssim 0.8 --max-sam 5
+"""
+import os
+import sys
+import json
+import argparse
+
+from consistency import METRIC_WORKERS, check_thresholds, consistency_metrics, report_path
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE = os.path.dirname(SCRIPT_DIR)
+REFERENCE = os.path.join(BASE, "Data", "S2_Khartoum_khartoum_center_20260204_10bands.tif")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SR vs original consistency metrics.")
+    parser.add_argument("paths", nargs="+", help="_MS GeoTIFFs or directories to search")
+    parser.add_argument("--reference", default=REFERENCE, help="original 10 m stack (default: %(default)s)")
+    parser.add_argument("--sr-scale", type=float, default=1.0, help="scale applied to the SR bands")
+    parser.add_argument("--ref-scale", type=float, default=1.0,
+                        help="scale applied to the original bands (1e-4 for 0-10000 DN)")
+    parser.add_argument("--output-dir", help="default: next to each input")
+    parser.add_argument("--workers", type=int, default=METRIC_WORKERS)
+    parser.add_argument("--max-rmse", type=float, help="fail above this mean RMSE")
+    parser.add_argument("--min-correlation", type=float, help="fail below this mean correlation")
+    parser.add_argument("--min-ssim", type=float, help="fail below this mean SSIM")
+    parser.add_argument("--max-sam", type=float, help="fail above this mean spectral angle (deg)")
+    args = parser.parse_args(argv)
+
+    sources = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            for dirpath, _, names in os.walk(path):
+                sources += [os.path.join(dirpath, n) for n in sorted(names) if n.endswith("_MS.tif")]
+        else:
+            sources.append(path)
+    if not sources:
+        print("No _MS GeoTIFFs found")
+        sys.exit(1)
+
+    print("=" * 72)
+    print(f"SR consistency vs {args.reference}")
+    print("=" * 72)
+
+    failures = 0
+    for src in sources:
+        print(f"\n  {src}")
+        try:
+            metrics = consistency_metrics(src, args.reference, sr_scale=args.sr_scale,
+                                          ref_scale=args.ref_scale, workers=args.workers)
+        except ValueError as e:
+            print(f"  ERROR: {e}")
+            failures += 1
+            continue
+        failed = check_thresholds(metrics, args.max_rmse, args.min_correlation, args.min_ssim,
+                                  args.max_sam)
+        metrics["failed"] = failed
+
+        out = report_path(src, args.output_dir)
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(metrics, f, indent=1)
+
+        grid = metrics["grid"]
+        print(f"  {grid['width']} x {grid['height']} px at {grid['resolution_m']:g} m, "
+              f"{metrics['valid_fraction']:.1%} valid, {metrics['seconds']:.2f} s")
+        print(f"  {'Band':<5} {'RMSE':>9} {'Bias':>10} {'Corr':>7} {'SSIM':>7}")
+        fmt = lambda v, spec: format(v, spec) if v is not None else "-"
+        for name, m in metrics["bands"].items():
+            print(f"  {name:<5} {fmt(m['rmse'], '9.5f'):>9} {fmt(m['bias'], '+10.5f'):>10} "
+                  f"{fmt(m['correlation'], '7.4f'):>7} {fmt(m['ssim'], '7.4f'):>7}")
+        print(f"  Spectral angle: {fmt(metrics['spectral_angle']['mean_deg'], '.3f')} deg mean")
+        print(f"  Report: {out}")
+        if failed:
+            failures += 1
+            print(f"  FAILED: {'; '.join(failed)}")
+
+    print("\n" + "=" * 72)
+    print(f"{len(sources) - failures}/{len(sources)} passed")
+    print("=" * 72)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
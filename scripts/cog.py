@@ -0,0 +1,63 @@
+"""
+Cloud-Optimized GeoTIFF post-processing for SR products.
+Rewrites each product as a tiled COG with internal overviews, so previews,
+stats and viewers can read a reduced-resolution level instead of decoding
+the full 1 m raster. Float products (_MS) use the floating-point predictor;
+uint8 products (_TCI, _IRP, _NDVI) use horizontal differencing.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import rasterio
+import rasterio.shutil
+from rasterio.errors import RasterioError
+
+COG_COMPRESS = "ZSTD"
+COG_BLOCKSIZE = 512
+COG_WORKERS = 2
+
+
+def is_cog(path):
+    """True if path is already tiled with internal overviews."""
+    with rasterio.open(path) as ds:
+        return ds.profile.get("tiled", False) and bool(ds.overviews(1))
+
+
+def to_cog(src, dst=None, compress=COG_COMPRESS, blocksize=COG_BLOCKSIZE, resampling="AVERAGE"):
+    """Rewrite src as a COG at dst (in place when dst is None).
+    Falls back to DEFLATE if this GDAL build lacks the requested codec.
+    """
+    dst = dst or src
+    with rasterio.open(src) as ds:
+        is_float = ds.dtypes[0].startswith("float")
+    tmp = f"{dst}.cog.tmp"
+    options = {"driver": "COG", "blocksize": blocksize, "predictor": 3 if is_float else 2,
+               "overviews": "AUTO", "resampling": resampling, "BIGTIFF": "IF_SAFER",
+               "num_threads": "ALL_CPUS"}
+    try:
+        try:
+            rasterio.shutil.copy(src, tmp, compress=compress, **options)
+        except RasterioError:
+            if compress == "DEFLATE":
+                raise
+            rasterio.shutil.copy(src, tmp, compress="DEFLATE", **options)
+        os.replace(tmp, dst)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return dst
+
+
+def convert_to_cog(paths, compress=COG_COMPRESS, workers=COG_WORKERS, force=False, log=print):
+    """Convert GeoTIFFs to COGs in place (skipping ones that already are)."""
+    def convert(path):
+        if not force and is_cog(path):
+            return path, False
+        before = os.path.getsize(path)
+        to_cog(path, compress=compress)
+        log(f"  COG: {os.path.basename(path)} "
+            f"({before / (1024 * 1024):.1f} -> {os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+        return path, True
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [p for p, _ in pool.map(convert, paths)]
@@ -0,0 +1,42 @@
+"""
+Rewrite SR GeoTIFF products as Cloud-Optimized GeoTIFFs with overviews.
+Accepts files and/or directories (searched recursively for .tif).
+Run: python cog_convert.py ~/s2dr4_output [--compress ZSTD] [--force]
+"""
+import os
+import sys
+import time
+import argparse
+
+from cog import COG_COMPRESS, COG_WORKERS, convert_to_cog
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert SR products to COGs in place.")
+    parser.add_argument("paths", nargs="+", help="GeoTIFF files or directories")
+    parser.add_argument("--compress", default=COG_COMPRESS, choices=["ZSTD", "DEFLATE", "LZW"])
+    parser.add_argument("--workers", type=int, default=COG_WORKERS)
+    parser.add_argument("--force", action="store_true", help="rewrite files that are already COGs")
+    args = parser.parse_args(argv)
+
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            for dirpath, _, names in os.walk(path):
+                files += [os.path.join(dirpath, n) for n in sorted(names) if n.lower().endswith(".tif")]
+        else:
+            files.append(path)
+    if not files:
+        print("No GeoTIFFs found.")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"Converting {len(files)} GeoTIFFs to COG ({args.compress})...")
+    print("=" * 60)
+    t0 = time.perf_counter()
+    convert_to_cog(files, compress=args.compress, workers=args.workers, force=args.force)
+    print(f"\nDONE in {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compute spectral indices (NDVI, NDWI, MNDWI, NDBI, SAVI, ...) from S2DR4
+_MS products in one blockwise pass per file.
+Run: python compute_indices.py ~/s2dr4_output/.../S2L3Ax10_..._MS.tif
+     python compute_indices.py ~/s2dr4_output --indices NDWI MNDWI --expr "GNDVI=(B8-B3)/(B8+B3)"
+"""
+import os
+import sys
+import time
+import argparse
+
+from s2dr4_tools.spectral import INDEX_WORKERS, INDICES, compute_indices
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spectral indices from S2DR4 _MS products.")
+    parser.add_argument("paths", nargs="+", help="_MS GeoTIFFs or directories to search")
+    parser.add_argument("--indices", nargs="*", choices=sorted(INDICES), metavar="NAME",
+                        help=f"built-in indices (default: all of {', '.join(INDICES)})")
+    parser.add_argument("--expr", action="append", default=[], metavar="NAME=EXPR",
+                        help="extra index over B2..B12, e.g. \"GNDVI=(B8-B3)/(B8+B3)\"")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="reflectance scale applied to the bands (1e-4 for 0-10000 DN)")
+    parser.add_argument("--output-dir", help="default: an indices/ folder next to each input")
+    parser.add_argument("--workers", type=int, default=INDEX_WORKERS)
+    args = parser.parse_args(argv)
+
+    indices = {name: INDICES[name] for name in (INDICES if args.indices is None else args.indices)}
+    for item in args.expr:
+        name, sep, expr = item.partition("=")
+        if not sep or not name.strip():
+            parser.error(f"--expr must be NAME=EXPR, got {item!r}")
+        indices[name.strip()] = expr.strip()
+    if not indices:
+        parser.error("no indices selected")
+
+    sources = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            for dirpath, _, names in os.walk(path):
+                sources += [os.path.join(dirpath, n) for n in sorted(names) if n.endswith("_MS.tif")]
+        else:
+            sources.append(path)
+    if not sources:
+        print("No _MS GeoTIFFs found")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"Spectral indices: {', '.join(indices)}")
+    print("=" * 60)
+
+    for src in sources:
+        print(f"\n  {src}")
+        out_dir = args.output_dir or os.path.join(os.path.dirname(src), "indices")
+        t0 = time.perf_counter()
+        try:
+            paths = compute_indices(src, indices, out_dir, workers=args.workers, scale=args.scale,
+                                    progress=lambda done, total: print(f"\r  Blocks: {done}/{total}", end=""))
+        except ValueError as e:
+            print(f"  ERROR: {e}")
+            sys.exit(1)
+        print(f"\r  Done in {time.perf_counter() - t0:.1f} s")
+        for name, path in paths.items():
+            print(f"    {name:<6} {os.path.getsize(path) / (1024 * 1024):7.1f} MB  {path}")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Detect change between two dates of the same AOI from S2DR4 _MS products
+(or single-band NDVI rasters from compute_indices.py).
+Writes the change magnitude, NDVI delta and a change-flag mask as tiled
+GeoTIFFs, summary polygons as GeoJSON and the statistics as JSON.
+Run: python detect_change.py BEFORE_MS.tif AFTER_MS.tif
+     python detect_change.py BEFORE_MS.tif AFTER_MS.tif --ndvi-delta 0.15 --magnitude-threshold 0.1
+"""
+import os
+import sys
+import argparse
+
+from change import (CELL_PX, CHANGE_WORKERS, MAGNITUDE_SIGMA, MIN_CELL_FRACTION, NDVI_DELTA,
+                    detect_change)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bi-temporal change detection for SR products.")
+    parser.add_argument("before", help="earlier _MS product (or NDVI raster)")
+    parser.add_argument("after", help="later _MS product (or NDVI raster); its grid is used")
+    parser.add_argument("--output-dir", help="default: a change/ folder next to the later product")
+    parser.add_argument("--magnitude-threshold", type=float,
+                        help="change-vector magnitude above which a pixel has changed "
+                             "(default: mean + --sigma std)")
+    parser.add_argument("--sigma", type=float, default=MAGNITUDE_SIGMA)
+    parser.add_argument("--ndvi-delta", type=float, default=NDVI_DELTA,
+                        help="NDVI drop / rise flagged as vegetation loss / gain")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="reflectance scale applied to _MS bands (1e-4 for 0-10000 DN)")
+    parser.add_argument("--cell", type=int, default=CELL_PX, help="summary polygon cell size in px")
+    parser.add_argument("--min-cell-fraction", type=float, default=MIN_CELL_FRACTION,
+                        help="changed share of a cell for it to join a polygon")
+    parser.add_argument("--workers", type=int, default=CHANGE_WORKERS)
+    args = parser.parse_args(argv)
+
+    output_dir = args.output_dir or os.path.join(os.path.dirname(os.path.abspath(args.after)), "change")
+
+    print("=" * 60)
+    print("Change detection")
+    print("=" * 60)
+    print(f"  Before: {args.before}")
+    print(f"  After:  {args.after}")
+
+    passes = {1: "Measuring", 2: "Classifying"}
+    try:
+        summary = detect_change(args.before, args.after, output_dir,
+                                magnitude_threshold=args.magnitude_threshold, sigma=args.sigma,
+                                ndvi_delta=args.ndvi_delta, scale=args.scale, cell_px=args.cell,
+                                min_cell_fraction=args.min_cell_fraction, workers=args.workers,
+                                progress=lambda p, done, total: print(
+                                    f"\r  {passes[p]} blocks: {done}/{total}", end=""))
+    except ValueError as e:
+        print(f"\n  ERROR: {e}")
+        sys.exit(1)
+
+    print(f"\r  Done in {summary['seconds']:.1f} s")
+    if summary["aligned"]:
+        print("  Earlier date aligned onto the later grid")
+    if summary["magnitude_threshold"] is not None:
+        print(f"  Magnitude threshold: {summary['magnitude_threshold']:.4g}")
+    d = summary["dNDVI"]
+    if d:
+        print(f"  dNDVI: mean {d['mean']:+.4f}, p5 {d['p5']:+.4f}, p95 {d['p95']:+.4f}")
+    print(f"\n  {'Class':<10} {'Pixels':>12} {'Area ha':>10} {'Share':>7}")
+    for name, c in summary["classes"].items():
+        share = f"{c['fraction']:.2%}" if c["fraction"] is not None else "-"
+        print(f"  {name:<10} {c['pixels']:>12,} {c['area_m2'] / 1e4:>10.2f} {share:>7}")
+    print(f"\n  {summary['polygons']} change polygon(s), {summary['polygon_area_m2'] / 1e4:.2f} ha")
+    for name, path in summary["outputs"].items():
+        print(f"    {name:<10} {path}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Grid planning and a resumable job queue for batch S2DR4 inference.
+An AOI (bbox or polygon, lon/lat) is split into overlapping 4x4 km cells
+in its UTM zone; every (cell, date) pair becomes a job in a JSON manifest
+that records pending / running / done / failed state and retry counts.
+"""
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rasterio.warp import transform as transform_coords
+
+CELL_SIZE_M = 4000
+CELL_OVERLAP_M = 200
+MAX_ATTEMPTS = 3
+
+
+def utm_crs_for(lon, lat):
+    zone = int((lon + 180) // 6) + 1
+    return f"EPSG:{(32600 if lat >= 0 else 32700) + zone}"
+
+
+def bbox_polygon(lon_min, lat_min, lon_max, lat_max):
+    return [(lon_min, lat_min), (lon_max, lat_min), (lon_max, lat_max), (lon_min, lat_max)]
+
+
+def load_aoi_polygons(geojson_path):
+    """Exterior rings (lon/lat) of every Polygon/MultiPolygon in a GeoJSON file."""
+    with open(geojson_path, encoding="utf-8") as f:
+        obj = json.load(f)
+    if obj.get("type") == "FeatureCollection":
+        geoms = [feat["geometry"] for feat in obj["features"]]
+    elif obj.get("type") == "Feature":
+        geoms = [obj["geometry"]]
+    else:
+        geoms = [obj]
+    rings = []
+    for geom in geoms:
+        if geom["type"] == "Polygon":
+            rings.append([tuple(p[:2]) for p in geom["coordinates"][0]])
+        elif geom["type"] == "MultiPolygon":
+            rings.extend([tuple(p[:2]) for p in poly[0]] for poly in geom["coordinates"])
+    if not rings:
+        raise ValueError(f"no polygons found in {geojson_path}")
+    return rings
+
+
+def _point_in_ring(x, y, ring):
+    inside = False
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+def _cell_touches_ring(xmin, ymin, xmax, ymax, ring):
+    corners = [(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax),
+               ((xmin + xmax) / 2, (ymin + ymax) / 2)]
+    if any(_point_in_ring(x, y, ring) for x, y in corners):
+        return True
+    return any(xmin <= x <= xmax and ymin <= y <= ymax for x, y in ring)
+
+
+def plan_cells(rings, cell_size=CELL_SIZE_M, overlap=CELL_OVERLAP_M):
+    """Split lon/lat polygons into overlapping square UTM cells.
+    Returns [{"id", "row", "col", "lonlat", "crs", "bounds"}] for every cell
+    touching the AOI; the grid is centered on the AOI's UTM bounding box.
+    """
+    lons = [p[0] for ring in rings for p in ring]
+    lats = [p[1] for ring in rings for p in ring]
+    crs = utm_crs_for((min(lons) + max(lons)) / 2, (min(lats) + max(lats)) / 2)
+    utm_rings = []
+    for ring in rings:
+        xs, ys = transform_coords("EPSG:4326", crs, [p[0] for p in ring], [p[1] for p in ring])
+        utm_rings.append(list(zip(xs, ys)))
+    xs = [p[0] for ring in utm_rings for p in ring]
+    ys = [p[1] for ring in utm_rings for p in ring]
+    step = cell_size - overlap
+    width, height = max(xs) - min(xs), max(ys) - min(ys)
+    ncols = max(1, math.ceil((width - overlap) / step))
+    nrows = max(1, math.ceil((height - overlap) / step))
+    x0 = min(xs) - (ncols * step + overlap - width) / 2
+    y0 = max(ys) + (nrows * step + overlap - height) / 2
+
+    cells = []
+    for row in range(nrows):
+        for col in range(ncols):
+            xmin = x0 + col * step
+            ymax = y0 - row * step
+            bounds = (xmin, ymax - cell_size, xmin + cell_size, ymax)
+            if any(_cell_touches_ring(*bounds, ring) for ring in utm_rings):
+                cells.append({"id": f"r{row:03d}c{col:03d}", "row": row, "col": col,
+                              "crs": crs, "bounds": [round(v, 2) for v in bounds]})
+    if cells:
+        lons, lats = transform_coords(crs, "EPSG:4326",
+                                      [(c["bounds"][0] + c["bounds"][2]) / 2 for c in cells],
+                                      [(c["bounds"][1] + c["bounds"][3]) / 2 for c in cells])
+        for cell, lon, lat in zip(cells, lons, lats):
+            cell["lonlat"] = [round(lon, 6), round(lat, 6)]
+    return cells
+
+
+class Manifest:
+    """Resumable JSON job manifest; every state change is written atomically."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.jobs = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.jobs = json.load(f)["jobs"]
+            for job in self.jobs.values():
+                if job["status"] == "running":
+                    # Interrupted mid-inference on a previous run
+                    job["status"] = "pending"
+
+    def add(self, cells, dates):
+        """Add a job per (cell, date) that is not in the manifest yet."""
+        added = 0
+        for date in dates:
+            for cell in cells:
+                job_id = f"{date}_{cell['id']}"
+                if job_id not in self.jobs:
+                    self.jobs[job_id] = {"cell": cell["id"], "lonlat": cell["lonlat"],
+                                         "bounds": cell["bounds"], "crs": cell["crs"],
+                                         "date": date, "status": "pending", "attempts": 0,
+                                         "error": None, "outputs": []}
+                    added += 1
+        self.save()
+        return added
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            self.jobs[job_id].update(fields)
+            self._write()
+
+    def save(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"jobs": self.jobs}, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def next_job(self, max_attempts=MAX_ATTEMPTS):
+        """First pending job, then failed jobs that still have retries left."""
+        with self._lock:
+            for job_id, job in self.jobs.items():
+                if job["status"] == "pending":
+                    return job_id
+            for job_id, job in self.jobs.items():
+                if job["status"] == "failed" and job["attempts"] < max_attempts:
+                    return job_id
+        return None
+
+    def counts(self):
+        counts = {}
+        for job in self.jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
+
+
+def snapshot_tifs(root):
+    """{path: (size, mtime)} of every GeoTIFF under root."""
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if name.lower().endswith((".tif", ".tiff")):
+                path = os.path.join(dirpath, name)
+                st = os.stat(path)
+                files[path] = (st.st_size, st.st_mtime)
+    return files
+
+
+def run_jobs(manifest, infer, output_dir, postprocess=None, max_attempts=MAX_ATTEMPTS):
+    """Drain the manifest queue.
+
+    infer(lonlat, date) runs inference for one cell (s2dr4.inferutils.test);
+    it may return the list of output paths (e.g. on a cache hit), otherwise
+    outputs are found by diffing the output directory.
+    postprocess(job_id, job, outputs) runs on a background thread while the
+    next cell's inference is already running, so the GPU never waits on it.
+    Since it may rewrite its files (e.g. as COGs) during that diff, every
+    path is credited to the first job that produced it and left out of the
+    diffs of other jobs.
+    """
+    post = ThreadPoolExecutor(max_workers=1)
+    pending = []
+    claimed = {}  # output path -> job id
+
+    def finish(job_id, outputs, seconds):
+        job = manifest.jobs[job_id]
+        if not outputs:
+            manifest.update(job_id, status="failed", error="inference produced no GeoTIFFs")
+            return
+        try:
+            if postprocess is not None:
+                postprocess(job_id, job, outputs)
+        except Exception as e:
+            manifest.update(job_id, status="failed", error=f"postprocess: {type(e).__name__}: {e}")
+            return
+        manifest.update(job_id, status="done", error=None, seconds=round(seconds, 1),
+                        outputs=[os.path.relpath(p, output_dir) for p in sorted(outputs)])
+
+    try:
+        while True:
+            job_id = manifest.next_job(max_attempts)
+            if job_id is None:
+                break
+            job = manifest.jobs[job_id]
+            manifest.update(job_id, status="running", attempts=job["attempts"] + 1)
+            print(f"  [{job_id}] lon/lat={tuple(job['lonlat'])} date={job['date']} "
+                  f"(attempt {job['attempts']})")
+            before = snapshot_tifs(output_dir)
+            t0 = time.perf_counter()
+            try:
+                produced = infer(tuple(job["lonlat"]), job["date"])
+            except KeyboardInterrupt:
+                manifest.update(job_id, status="pending", attempts=job["attempts"] - 1)
+                raise
+            except Exception as e:
+                manifest.update(job_id, status="failed", error=f"{type(e).__name__}: {e}")
+                print(f"  [{job_id}] FAILED: {type(e).__name__}: {e}")
+                continue
+            if produced is not None:
+                outputs = list(produced)
+            else:
+                after = snapshot_tifs(output_dir)
+                outputs = [p for p, sig in after.items()
+                           if before.get(p) != sig and claimed.get(p, job_id) == job_id]
+            for path in outputs:
+                claimed.setdefault(path, job_id)
+            pending.append(post.submit(finish, job_id, outputs, time.perf_counter() - t0))
+    finally:
+        post.shutdown(wait=True)
+    for future in pending:
+        future.result()
+    return manifest.counts()
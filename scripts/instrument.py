@@ -0,0 +1,271 @@
+"""
+Per-stage timing and memory instrumentation for the pipeline scripts.
+`with run.stage("name"):` records wall time, peak RSS and bytes read from
+files during the stage. rasterio reads are counted per file together with
+the array bytes they return (decoded_mb, not file I/O). A run is saved as
+one JSON file in Chrome trace-event format (open it in chrome://tracing or
+ui.perfetto.dev); the per-stage report sits under "otherData". The
+tracemalloc peak and a cProfile capture are optional, as both slow down
+the code being measured.
+"""
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 1024 * 1024
+
+# Open runs that count rasterio reads, and the read method they replaced
+_read_runs = ()
+_read_lock = threading.Lock()
+_original_read = None
+
+
+def _proc_status(key):
+    """A kB field of /proc/self/status in bytes (Linux), else None."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss():
+    """Peak resident set size in bytes since start (or the last reset)."""
+    hwm = _proc_status("VmHWM")
+    if hwm is not None or resource is None:
+        return hwm
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def current_rss():
+    return _proc_status("VmRSS")
+
+
+def _reset_peak_rss():
+    """Reset VmHWM to the current RSS (Linux >= 4.0); False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def bytes_read():
+    """Bytes this process has read through read syscalls (Linux), else None."""
+    try:
+        with open("/proc/self/io", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _count_reads(run):
+    """Add run to the runs that count every rasterio read, patching
+    DatasetReader.read for the first one."""
+    global _read_runs, _original_read
+    try:
+        from rasterio.io import DatasetReader
+    except ImportError:
+        return
+    with _read_lock:
+        if _original_read is None:
+            original = _original_read = DatasetReader.read
+
+            @functools.wraps(original)
+            def read(ds, *args, **kwargs):
+                data = original(ds, *args, **kwargs)
+                for r in _read_runs:
+                    with r._lock:
+                        rec = r.files.setdefault(ds.name, {"reads": 0, "decoded_mb": 0.0})
+                        rec["reads"] += 1
+                        rec["decoded_mb"] += getattr(data, "nbytes", 0) / MB
+                return data
+
+            DatasetReader.read = read
+        _read_runs += (run,)
+
+
+def _stop_counting_reads(run):
+    """Remove run; restore the original DatasetReader.read after the last one."""
+    global _read_runs, _original_read
+    with _read_lock:
+        _read_runs = tuple(r for r in _read_runs if r is not run)
+        if not _read_runs and _original_read is not None:
+            from rasterio.io import DatasetReader
+            DatasetReader.read = _original_read
+            _original_read = None
+
+
+class Run:
+    """Stage timers and memory high-water marks for one script run.
+
+    Peaks are process-wide: a stage's peak is the highest RSS / traced
+    allocation seen while it was open, including nested and concurrent
+    stages on other threads. close() (or leaving a `with Run(...)` block)
+    stops counting reads; the last open run restores rasterio's read.
+    """
+
+    def __init__(self, name, trace_memory=False, profile=False):
+        self.name = name
+        self.argv = sys.argv[1:]
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._active = []
+        self.stages = []
+        self.files = {}
+        self._can_reset_rss = _reset_peak_rss()
+        self._started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        self._profiler = None
+        if profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._closed = False
+        _count_reads(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop counting reads and stop tracemalloc if this run started it."""
+        if self._closed:
+            return
+        self._closed = True
+        _stop_counting_reads(self)
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._started_tracing:
+            tracemalloc.stop()
+
+    def _fold_peaks(self):
+        """Credit the current high-water marks to every open stage."""
+        rss = peak_rss()
+        traced = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        for stage in self._active:
+            if rss is not None:
+                stage["peak_rss_mb"] = max(stage["peak_rss_mb"] or 0, rss / MB)
+            if traced is not None:
+                stage["py_peak_mb"] = max(stage["py_peak_mb"] or 0, traced / MB)
+
+    def _reset_peaks(self):
+        self._fold_peaks()
+        if self._can_reset_rss:
+            _reset_peak_rss()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name, **info):
+        """Time a block and record its memory and I/O."""
+        stage = {"name": name, "thread": threading.current_thread().name,
+                 "tid": threading.get_ident(), "start_s": None, "seconds": None,
+                 "peak_rss_mb": None, "py_peak_mb": None, "read_mb": None, **info}
+        with self._lock:
+            self._reset_peaks()
+            self._active.append(stage)
+        read0 = bytes_read()
+        t0 = time.perf_counter()
+        stage["start_s"] = t0 - self._t0
+        try:
+            yield stage
+        finally:
+            stage["seconds"] = time.perf_counter() - t0
+            read1 = bytes_read()
+            if read0 is not None and read1 is not None:
+                stage["read_mb"] = (read1 - read0) / MB
+            rss = current_rss()
+            stage["rss_end_mb"] = rss / MB if rss is not None else None
+            with self._lock:
+                self._fold_peaks()
+                self._active.remove(stage)
+                self.stages.append(stage)
+
+    def report(self):
+        with self._lock:
+            self._fold_peaks()
+            stages = sorted(self.stages, key=lambda s: s["start_s"])
+        rss = peak_rss()
+        return {
+            "run": self.name,
+            "argv": self.argv,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "total_s": time.perf_counter() - self._t0,
+            # Process-lifetime peak is only known when VmHWM was never reset
+            "peak_rss_mb": max([s["peak_rss_mb"] or 0 for s in stages]
+                               + [rss / MB if rss is not None else 0]),
+            "stages": stages,
+            "files": self.files,
+        }
+
+    def trace_events(self, report):
+        """Chrome trace events: one complete ("X") event per stage, plus RSS counters."""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid,
+                   "args": {"name": self.name}}]
+        for s in report["stages"]:
+            args = {k: v for k, v in s.items()
+                    if k not in ("name", "thread", "tid", "start_s", "seconds")}
+            events.append({"name": s["name"], "ph": "X", "pid": pid, "tid": s["tid"],
+                           "ts": s["start_s"] * 1e6, "dur": s["seconds"] * 1e6,
+                           "args": args})
+            if s["peak_rss_mb"] is not None:
+                events.append({"name": "peak RSS (MB)", "ph": "C", "pid": pid,
+                               "ts": s["start_s"] * 1e6,
+                               "args": {"MB": round(s["peak_rss_mb"], 1)}})
+        return events
+
+    def save(self, report_dir, top=25):
+        """Write <report_dir>/<name>_<time>.trace.json (and .prof with profiling).
+        Returns the report path."""
+        if self._profiler is not None:
+            self._profiler.disable()
+        report = self.report()
+        os.makedirs(report_dir, exist_ok=True)
+        stem = os.path.join(report_dir, f"{self.name}_{time.strftime('%Y%m%d-%H%M%S')}")
+        if self._profiler is not None:
+            self._profiler.dump_stats(stem + ".prof")
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(top)
+            report["profile"] = {"path": stem + ".prof", "top": out.getvalue()}
+        path = stem + ".trace.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace_events(report), "displayTimeUnit": "ms",
+                       "otherData": report}, f, indent=1)
+        return path
+
+    def summary(self):
+        """Human-readable stage table."""
+        report = self.report()
+        lines = [f"  {'Stage':<32} {'Time s':>8} {'Peak RSS MB':>12} {'Py peak MB':>11} {'Read MB':>9}"]
+        fmt = lambda v, w: f"{v:{w}.1f}" if v is not None else f"{'-':>{w}}"
+        for s in report["stages"]:
+            lines.append(f"  {s['name'][:32]:<32} {s['seconds']:8.2f} {fmt(s['peak_rss_mb'], 12)} "
+                         f"{fmt(s['py_peak_mb'], 11)} {fmt(s['read_mb'], 9)}")
+        lines.append(f"  {'Total':<32} {report['total_s']:8.2f} {fmt(report['peak_rss_mb'], 12)}")
+        return "\n".join(lines)
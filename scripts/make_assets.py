@@ -0,0 +1,97 @@
+"""
+Render the showcase assets for one or many SR products: hero / false color /
+NDVI side-by-side panels, a zoom inset and before/after fade and wipe
+animations (GIF, plus MP4 with --mp4 when ffmpeg is installed).
+Each product's layers are composited once and reused by all of its outputs;
+products render in parallel, one folder each.
+Run: python make_assets.py
+     python make_assets.py ~/s2dr4_output --output-dir ~/s2dr4_assets --mp4
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from render_assets import (ANIMATION_SIZE, CROP_M, FADE_STEPS, FFMPEG, FRAME_MS, PANEL_SIZE,
+                           ZOOM_M, render_assets)
+from s2dr4_tools.stretch import StretchCache
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE = os.path.dirname(SCRIPT_DIR)
+ORIG_10BANDS = os.path.join(BASE, "Data", "S2_Khartoum_khartoum_center_20260204_10bands.tif")
+SR_TCI = os.path.join(BASE, "S2DR4_Khartoum_1m", "SD", "T36PVC", "T36PVC-9a3aee44d",
+                      "S2L3Ax10_T36PVC-9a3aee44d-20260131_TCI.tif")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render comparison panels and animations.")
+    parser.add_argument("paths", nargs="*", default=[SR_TCI],
+                        help="_TCI GeoTIFFs or directories to search (default: the Khartoum run)")
+    parser.add_argument("--original", default=ORIG_10BANDS, help="original 10 m stack (default: %(default)s)")
+    parser.add_argument("--output-dir", default=os.path.join(BASE, "assets"),
+                        help="one sub-folder per product (default: %(default)s)")
+    parser.add_argument("--center", type=float, nargs=2, metavar=("X", "Y"),
+                        help="crop center in the SR CRS (default: the middle of each product)")
+    parser.add_argument("--crop-m", type=float, default=CROP_M, help="animation crop size in m")
+    parser.add_argument("--zoom-m", type=float, default=ZOOM_M, help="zoom inset size in m")
+    parser.add_argument("--panel-size", type=int, default=PANEL_SIZE, help="side-by-side panel size in px")
+    parser.add_argument("--animation-size", type=int, default=ANIMATION_SIZE)
+    parser.add_argument("--steps", type=int, default=FADE_STEPS, help="animation frames each way")
+    parser.add_argument("--frame-ms", type=int, default=FRAME_MS)
+    parser.add_argument("--mp4", action="store_true", help="also write MP4 animations (needs ffmpeg)")
+    parser.add_argument("--stretch", metavar="JSON", help="shared per-band stretch cut points")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="products rendered in parallel")
+    args = parser.parse_args(argv)
+    if args.mp4 and FFMPEG is None:
+        parser.error("--mp4 needs ffmpeg on PATH")
+
+    sources = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            for dirpath, _, names in os.walk(path):
+                sources += [os.path.join(dirpath, n) for n in sorted(names) if n.endswith("_TCI.tif")]
+        else:
+            sources.append(path)
+    if not sources:
+        print("No _TCI GeoTIFFs found")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"Rendering assets for {len(sources)} product(s)...")
+    print("=" * 60)
+
+    def render(src):
+        stem = os.path.basename(src)[:-len("_TCI.tif")]
+        out = os.path.join(args.output_dir, stem)
+        stretch = StretchCache.load(args.stretch) if args.stretch else None
+        return out, render_assets(args.original, src, out, center=args.center, crop_m=args.crop_m,
+                                  zoom_m=args.zoom_m, panel_size=args.panel_size,
+                                  animation_size=args.animation_size, steps=args.steps,
+                                  duration=args.frame_ms, mp4=args.mp4, stretch=stretch)
+
+    t0 = time.perf_counter()
+    failures = 0
+    # GDAL reads, Pillow resizes and encodes release the GIL, so threads overlap
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for src, future in zip(sources, [pool.submit(render, s) for s in sources]):
+            print(f"\n  {src}")
+            try:
+                out, timings = future.result()
+            except (OSError, ValueError, RuntimeError) as e:
+                print(f"  ERROR: {e}")
+                failures += 1
+                continue
+            for name, secs in timings.items():
+                print(f"    {name:<28} {secs:6.2f} s")
+            print(f"  Output: {out}")
+
+    print("\n" + "=" * 60)
+    print(f"{len(sources) - failures}/{len(sources)} rendered in {time.perf_counter() - t0:.1f} s")
+    print("=" * 60)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Windowed mosaic stitcher for S2DR4 SR tiles.
+Streams overlapping tiles window by window onto one output grid, feathers
+the seams with distance-to-edge weights, and writes a Cloud-Optimized
+GeoTIFF. Only one output window (plus the source reads for it) is held in
+memory at a time, so city-wide 1 m mosaics build on a modest worker.
+"""
+import math
+import os
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.transform import from_origin
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, from_bounds
+
+from cog import COG_COMPRESS, to_cog
+from s2dr4_tools.validity import block_validity, load_mask
+
+FEATHER_PX = 64
+WINDOW_SIZE = 1024
+BLOCK_SIZE = 512
+
+
+def union_grid(paths):
+    """Union grid of all sources in the first source's CRS and resolution."""
+    with rasterio.open(paths[0]) as ds:
+        crs, res = ds.crs, abs(ds.transform.a)
+        count, dtype, descriptions = ds.count, ds.dtypes[0], ds.descriptions
+    left, bottom, right, top = math.inf, math.inf, -math.inf, -math.inf
+    for path in paths:
+        with rasterio.open(path) as ds:
+            if ds.count != count:
+                raise ValueError(f"{path}: {ds.count} bands, expected {count}")
+            b = ds.bounds if ds.crs == crs else transform_bounds(ds.crs, crs, *ds.bounds)
+        left, bottom = min(left, b[0]), min(bottom, b[1])
+        right, top = max(right, b[2]), max(top, b[3])
+    # Snap to the pixel grid so every aligned tile lands on whole pixels
+    left, top = math.floor(left / res) * res, math.ceil(top / res) * res
+    width = int(math.ceil((right - left) / res))
+    height = int(math.ceil((top - bottom) / res))
+    return {"crs": crs, "transform": from_origin(left, top, res, res), "width": width,
+            "height": height, "count": count, "dtype": dtype, "descriptions": descriptions}
+
+
+def _feather_weights(window, footprint, feather):
+    """Weights for window pixels: ramp 0 -> 1 over `feather` px from the tile edge."""
+    rows = np.arange(window.row_off, window.row_off + window.height) + 0.5
+    cols = np.arange(window.col_off, window.col_off + window.width) + 0.5
+    row_d = np.minimum(rows - footprint.row_off, footprint.row_off + footprint.height - rows)
+    col_d = np.minimum(cols - footprint.col_off, footprint.col_off + footprint.width - cols)
+    weights = np.minimum.outer(row_d, col_d).astype(np.float32)
+    weights /= max(feather, 1)
+    return np.clip(weights, 0, 1, out=weights)
+
+
+def _intersect(a, b):
+    col0, row0 = max(a.col_off, b.col_off), max(a.row_off, b.row_off)
+    col1 = min(a.col_off + a.width, b.col_off + b.width)
+    row1 = min(a.row_off + a.height, b.row_off + b.height)
+    if col1 <= col0 or row1 <= row0:
+        return None
+    return Window(col0, row0, col1 - col0, row1 - row0)
+
+
+def build_mosaic(paths, output, feather=FEATHER_PX, compress=COG_COMPRESS, progress=None):
+    """Mosaic SR tiles (same product) into one COG at output.
+
+    A pixel is invalid in a source when any band is NaN or all bands are 0
+    (read from the source's validity mask where its grid matches the output).
+    Overlaps are blended with feathered weights; uncovered pixels are NaN for
+    float products and 0 otherwise.
+    """
+    grid = union_grid(paths)
+    out_window = Window(0, 0, grid["width"], grid["height"])
+    is_float = np.issubdtype(np.dtype(grid["dtype"]), np.floating)
+    nodata = np.nan if is_float else 0
+
+    sources = []
+    for path in paths:
+        ds = rasterio.open(path)
+        src, mask = ds, None
+        if ds.crs != grid["crs"]:
+            # Cells from a neighbouring UTM zone are warped on the fly
+            src = WarpedVRT(ds, crs=grid["crs"], resampling=Resampling.nearest)
+        fp = from_bounds(*src.bounds, transform=grid["transform"]).round_offsets().round_lengths()
+        fp = _intersect(fp, out_window)
+        if fp is not None:
+            if src is ds:
+                mask = load_mask(path)
+            sources.append((src, ds, fp, mask))
+
+    tmp = output + ".tmp.tif"
+    profile = {"driver": "GTiff", "width": grid["width"], "height": grid["height"],
+               "count": grid["count"], "dtype": grid["dtype"], "crs": grid["crs"],
+               "transform": grid["transform"], "nodata": nodata, "tiled": True,
+               "blockxsize": BLOCK_SIZE, "blockysize": BLOCK_SIZE, "compress": "LZW",
+               "BIGTIFF": "IF_SAFER"}
+    try:
+        with rasterio.open(tmp, "w", **profile) as dst:
+            for i, desc in enumerate(grid["descriptions"], start=1):
+                if desc:
+                    dst.set_band_description(i, desc)
+            n_rows = -(-grid["height"] // WINDOW_SIZE)
+            for r in range(n_rows):
+                for col in range(0, grid["width"], WINDOW_SIZE):
+                    row = r * WINDOW_SIZE
+                    win = Window(col, row, min(WINDOW_SIZE, grid["width"] - col),
+                                 min(WINDOW_SIZE, grid["height"] - row))
+                    dst.write(_blend_window(win, sources, grid, feather, is_float, nodata),
+                              window=win)
+                if progress:
+                    progress(r + 1, n_rows)
+    finally:
+        for src, ds, _, _ in sources:
+            if src is not ds:
+                src.close()
+            ds.close()
+
+    try:
+        to_cog(tmp, output, compress=compress, blocksize=BLOCK_SIZE)
+    finally:
+        os.remove(tmp)
+    return grid
+
+
+def _blend_window(win, sources, grid, feather, is_float, nodata):
+    count, dtype = grid["count"], grid["dtype"]
+    acc = np.zeros((count, int(win.height), int(win.width)), dtype=np.float32)
+    weight_sum = np.zeros((int(win.height), int(win.width)), dtype=np.float32)
+    for src, _, fp, mask in sources:
+        part = _intersect(win, fp)
+        if part is None:
+            continue
+        # Source window for the part, relative to the source's own grid
+        src_win = from_bounds(*rasterio.windows.bounds(part, grid["transform"]),
+                              transform=src.transform).round_offsets().round_lengths()
+        data = src.read(window=src_win, out_shape=(count, int(part.height), int(part.width)),
+                        resampling=Resampling.nearest).astype(np.float32)
+        if mask is not None and (src_win.height, src_win.width) == (part.height, part.width):
+            valid = mask.read(src_win)
+        else:
+            valid = block_validity(data)
+        w = _feather_weights(part, fp, feather)
+        w[~valid] = 0
+        np.nan_to_num(data, copy=False)
+        rs = slice(int(part.row_off - win.row_off), int(part.row_off - win.row_off + part.height))
+        cs = slice(int(part.col_off - win.col_off), int(part.col_off - win.col_off + part.width))
+        acc[:, rs, cs] += data * w
+        weight_sum[rs, cs] += w
+    covered = weight_sum > 0
+    np.divide(acc, weight_sum, out=acc, where=covered)
+    if not is_float:
+        np.rint(acc, out=acc)
+        np.clip(acc, np.iinfo(dtype).min, np.iinfo(dtype).max, out=acc)
+    acc[:, ~covered] = nodata
+    return acc.astype(dtype, copy=False)
@@ -0,0 +1,64 @@
+"""
+Stitch adjacent S2DR4 runs into one Cloud-Optimized GeoTIFF per product and date.
+Finds every S2L3Ax10_<tile>-<id>-<date>_<product>.tif under the input
+directory through the raster catalog and mosaics each date's tiles window by
+window with feathered seams; dates are never blended into one mosaic.
+Run: python mosaic_sr.py --input-dir ~/s2dr4_output --product MS [--date 20260131]
+"""
+import os
+import sys
+import time
+import argparse
+from collections import defaultdict
+
+from mosaic import FEATHER_PX, build_mosaic
+from raster_catalog import CATALOG_PATH, RasterCatalog
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mosaic S2DR4 SR tiles into one COG per date.")
+    parser.add_argument("--input-dir", default=os.path.expanduser("~/s2dr4_output"))
+    parser.add_argument("--product", default="MS", choices=["MS", "TCI", "IRP", "NDVI"])
+    parser.add_argument("--date", help="only tiles for this date (YYYYMMDD; default: every date)")
+    parser.add_argument("--feather", type=int, default=FEATHER_PX, help="seam blend width in px")
+    parser.add_argument("--output", help="with a single date; default: <input-dir>/mosaic_<date>_<product>.tif")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="raster catalog (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    with RasterCatalog(args.catalog) as catalog:
+        catalog.refresh([args.input_dir], stats=False)
+        try:
+            rows = catalog.query(product=args.product, date=args.date, under=args.input_dir)
+        except ValueError as e:
+            parser.error(str(e))
+    by_date = defaultdict(list)
+    for r in rows:
+        if r["date"]:
+            by_date[r["date"].replace("-", "")].append(r["path"])
+    if not by_date:
+        print(f"No {args.product} tiles found under {args.input_dir}")
+        sys.exit(1)
+    if args.output and len(by_date) > 1:
+        parser.error(f"--output needs a single date; found {', '.join(sorted(by_date))} (use --date)")
+
+    for date, tiles in sorted(by_date.items()):
+        output = args.output or os.path.join(args.input_dir, f"mosaic_{date}_{args.product}.tif")
+
+        print("=" * 60)
+        print(f"Mosaicking {len(tiles)} {args.product} tiles of {date}...")
+        print("=" * 60)
+        for path in tiles:
+            print(f"  {os.path.relpath(path, args.input_dir)}")
+
+        t0 = time.perf_counter()
+        grid = build_mosaic(tiles, output, feather=args.feather,
+                            progress=lambda done, total: print(f"\r  Row strips: {done}/{total}", end=""))
+        print(f"\n  Output: {output}")
+        print(f"  Size:   {grid['width']} x {grid['height']} px, {grid['count']} bands, "
+              f"{os.path.getsize(output) / (1024 * 1024):.1f} MB")
+        print(f"  Time:   {time.perf_counter() - t0:.1f} s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Incremental, parallel sync of inference outputs to a slow destination
+(e.g. the /mnt/d drvfs mount from WSL2).
+Files whose size, mtime or checksum show no change since the last sync are
+skipped; changed files are copied concurrently in large chunks to a temp
+name and renamed into place, so partial copies never appear. Outputs can
+optionally be recompressed locally first, so fewer bytes cross the link.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SYNC_MANIFEST = ".sync_manifest.json"
+CHUNK_SIZE = 16 * 1024 * 1024
+SYNC_WORKERS = 4
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _copy_chunked(src, dst):
+    """Copy src to dst via a temp name in dst's directory; returns the sha256 of src."""
+    h = hashlib.sha256()
+    tmp = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.partial")
+    try:
+        with open(src, "rb") as fin, open(tmp, "wb") as fout:
+            for block in iter(lambda: fin.read(CHUNK_SIZE), b""):
+                h.update(block)
+                fout.write(block)
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return h.hexdigest()
+
+
+def _recompress(src, dst, compress):
+    """Rewrite a GeoTIFF tiled and compressed (runs on the fast local disk)."""
+    import rasterio
+    import rasterio.shutil
+    with rasterio.open(src) as ds:
+        is_float = ds.dtypes[0].startswith("float")
+    rasterio.shutil.copy(src, dst, driver="GTiff", tiled=True, blockxsize=512, blockysize=512,
+                         compress=compress, predictor=3 if is_float else 2, BIGTIFF="IF_SAFER")
+
+
+def sync_outputs(src_dir, dst_dir, suffixes=(".tif",), workers=SYNC_WORKERS, compress=None,
+                 recursive=False, log=print):
+    """Sync matching files from src_dir to dst_dir.
+
+    compress (e.g. "DEFLATE" or "ZSTD") recompresses GeoTIFFs before they
+    cross the link. Returns {"copied": [...], "skipped": [...]} of relative paths.
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    manifest_path = os.path.join(dst_dir, SYNC_MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    lock = threading.Lock()
+
+    rels = []
+    for dirpath, dirnames, names in os.walk(src_dir):
+        rels += [os.path.relpath(os.path.join(dirpath, n), src_dir)
+                 for n in names if n.lower().endswith(suffixes)]
+        if not recursive:
+            break
+
+    def sync_one(rel):
+        src, dst = os.path.join(src_dir, rel), os.path.join(dst_dir, rel)
+        st = os.stat(src)
+        rec = manifest.get(rel)
+        if (rec and rec.get("compress") == compress and os.path.exists(dst)
+                and os.path.getsize(dst) == rec["dst_size"] and rec["src_size"] == st.st_size):
+            if rec["src_mtime"] == st.st_mtime:
+                return rel, False
+            # Touched but same size: only the checksum can tell
+            if _sha256(src) == rec["src_sha256"]:
+                with lock:
+                    rec["src_mtime"] = st.st_mtime
+                return rel, False
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if compress:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                local = os.path.join(tmpdir, os.path.basename(rel))
+                _recompress(src, local, compress)
+                _copy_chunked(local, dst)
+            src_sha = _sha256(src)
+        else:
+            src_sha = _copy_chunked(src, dst)
+        with lock:
+            manifest[rel] = {"src_size": st.st_size, "src_mtime": st.st_mtime,
+                             "src_sha256": src_sha, "dst_size": os.path.getsize(dst),
+                             "compress": compress}
+        return rel, True
+
+    result = {"copied": [], "skipped": []}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for rel, copied in pool.map(sync_one, sorted(rels)):
+                result["copied" if copied else "skipped"].append(rel)
+                size_mb = os.path.getsize(os.path.join(dst_dir, rel)) / (1024 * 1024)
+                log(f"  {'Copied' if copied else 'Unchanged'}: {rel} ({size_mb:.1f} MB)")
+    finally:
+        tmp = manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, manifest_path)
+    return result
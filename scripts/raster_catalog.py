@@ -0,0 +1,260 @@
+"""
+Persistent SQLite catalog of the GeoTIFFs under the data directories.
+Each raster is recorded with its size, mtime, CRS, bounds (native and
+lon/lat), resolution, band descriptions, streaming per-band statistics and,
+for S2DR4 outputs, the tile / scene id / date / product parsed from the
+S2L3Ax10_<tile>-<id>-<date>_<product>.tif name. refresh() rescans only files
+whose size or mtime changed, across a process pool; query() finds rasters by
+lon/lat bbox, date and product instead of by hardcoded path.
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+CATALOG_PATH = os.path.expanduser("~/.cache/s2dr4_catalog.sqlite")
+CATALOG_WORKERS = os.cpu_count()
+SUFFIXES = (".tif", ".tiff")
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+SR_NAME = re.compile(r"S2L3Ax10_(?P<tile>[^-]+)-(?P<id>[^-]+)-(?P<date>\d{8})_(?P<product>[A-Z]+)\.tif$")
+NAME_DATE = re.compile(r"(?<!\d)(\d{8})(?!\d)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rasters (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    scanned REAL NOT NULL,
+    error TEXT,
+    width INTEGER, height INTEGER, count INTEGER, dtype TEXT, crs TEXT,
+    res_x REAL, res_y REAL,
+    left REAL, bottom REAL, right REAL, top REAL,
+    min_lon REAL, min_lat REAL, max_lon REAL, max_lat REAL,
+    descriptions TEXT,
+    product TEXT, tile TEXT, scene_id TEXT, date TEXT
+);
+CREATE INDEX IF NOT EXISTS rasters_product_date ON rasters (product, date);
+CREATE INDEX IF NOT EXISTS rasters_date ON rasters (date);
+CREATE INDEX IF NOT EXISTS rasters_lon ON rasters (min_lon, max_lon);
+CREATE TABLE IF NOT EXISTS bands (
+    path TEXT NOT NULL REFERENCES rasters (path) ON DELETE CASCADE,
+    band INTEGER NOT NULL,
+    name TEXT,
+    valid INTEGER, nodata INTEGER,
+    min REAL, max REAL, mean REAL, std REAL,
+    percentiles TEXT,
+    PRIMARY KEY (path, band)
+);
+"""
+
+
+def parse_name(path):
+    """{product, tile, scene_id, date} from a raster file name.
+    S2DR4 names give all four; otherwise only an embedded YYYYMMDD date."""
+    name = os.path.basename(path)
+    m = SR_NAME.match(name)
+    if m:
+        return {"product": m["product"], "tile": m["tile"], "scene_id": m["id"],
+                "date": _iso_date(m["date"])}
+    m = NAME_DATE.search(name)
+    return {"product": None, "tile": None, "scene_id": None,
+            "date": _iso_date(m[1]) if m else None}
+
+
+def _iso_date(text):
+    """'20260131' or '2026-01-31' -> '2026-01-31'."""
+    digits = text.replace("-", "")
+    if len(digits) != 8 or not digits.isdigit():
+        raise ValueError(f"invalid date: {text!r}")
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+
+
+def scan_raster(path, stats=True):
+    """Metadata and per-band statistics of one raster (runs in a worker process).
+    Returns (raster row, [band rows])."""
+    import rasterio
+    from rasterio.warp import transform_bounds
+
+    from s2dr4_tools import BandStats, dataset_stats
+    from s2dr4_tools.validity import cached_mask, compute_mask, save_mask
+
+    st = os.stat(path)
+    row = {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "scanned": time.time(),
+           "error": None, **parse_name(path)}
+    try:
+        with rasterio.open(path) as ds:
+            b = ds.bounds
+            row.update(width=ds.width, height=ds.height, count=ds.count, dtype=ds.dtypes[0],
+                       crs=ds.crs.to_string() if ds.crs else None,
+                       res_x=abs(ds.transform.a), res_y=abs(ds.transform.e),
+                       left=b.left, bottom=b.bottom, right=b.right, top=b.top,
+                       descriptions=json.dumps(ds.descriptions))
+            if ds.crs:
+                row["min_lon"], row["min_lat"], row["max_lon"], row["max_lat"] = \
+                    transform_bounds(ds.crs, "EPSG:4326", *b)
+            bands = []
+            if stats:
+                # Stats over the validity mask; a mask that is not cached yet is
+                # built from the same block reads and saved as a sidecar for reuse
+                mask = cached_mask(path)
+                if mask is None:
+                    band_stats = [BandStats() for _ in range(ds.count)]
+                    save_mask(path, compute_mask(ds, band_stats), (st.st_size, st.st_mtime_ns))
+                else:
+                    band_stats = dataset_stats(ds, mask=mask)
+                for i, s in enumerate(band_stats, start=1):
+                    valid = s.count > 0
+                    bands.append({
+                        "path": path, "band": i, "name": ds.descriptions[i - 1],
+                        "valid": s.count, "nodata": s.nan_count,
+                        "min": s.min if valid else None, "max": s.max if valid else None,
+                        "mean": s.mean if valid else None, "std": s.std if valid else None,
+                        "percentiles": json.dumps(dict(zip(
+                            map(str, PERCENTILES), s.percentile(PERCENTILES).tolist())))
+                        if valid else None,
+                    })
+    except Exception as e:  # unreadable files are recorded, not retried until they change
+        row["error"] = f"{type(e).__name__}: {e}"
+        bands = []
+    return row, bands
+
+
+def _insert(conn, table, row):
+    cols = ", ".join(row)
+    marks = ", ".join("?" * len(row))
+    conn.execute(f"INSERT OR REPLACE INTO {table} ({cols}) VALUES ({marks})", list(row.values()))
+
+
+def _decode(row):
+    rec = dict(row)
+    for key in ("descriptions", "percentiles"):
+        if rec.get(key) is not None:
+            rec[key] = json.loads(rec[key])
+    return rec
+
+
+class RasterCatalog:
+    """SQLite-backed catalog; one connection, used from the owning thread."""
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def refresh(self, roots, workers=CATALOG_WORKERS, stats=True, progress=None):
+        """Bring the catalog up to date with the rasters under roots (dirs or files).
+        Only new files and files whose size or mtime changed are rescanned.
+        Returns {"scanned": [...], "removed": [...], "unchanged": n}."""
+        found = {}
+        for root in roots:
+            root = os.path.abspath(root)
+            if os.path.isfile(root):
+                found[root] = os.stat(root)
+                continue
+            for dirpath, _, names in os.walk(root):
+                for name in sorted(names):
+                    if name.lower().endswith(SUFFIXES):
+                        path = os.path.join(dirpath, name)
+                        found[path] = os.stat(path)
+
+        known = {}
+        for root in roots:
+            root = os.path.abspath(root)
+            prefix = root if os.path.isfile(root) else os.path.join(root, "")
+            for r in self.conn.execute(
+                    "SELECT path, size, mtime_ns FROM rasters WHERE path = ? OR substr(path, 1, ?) = ?",
+                    (root, len(prefix), prefix)):
+                known[r["path"]] = (r["size"], r["mtime_ns"])
+        if stats:
+            # Rows cataloged without stats are rescanned once stats are wanted
+            no_stats = {r["path"] for r in self.conn.execute(
+                "SELECT path FROM rasters r WHERE error IS NULL AND NOT EXISTS "
+                "(SELECT 1 FROM bands b WHERE b.path = r.path)")}
+        else:
+            no_stats = set()
+
+        changed = [p for p, st in found.items()
+                   if known.get(p) != (st.st_size, st.st_mtime_ns) or p in no_stats]
+        removed = [p for p in known if p not in found]
+
+        with self.conn:
+            for path in removed:
+                self.conn.execute("DELETE FROM rasters WHERE path = ?", (path,))
+        if changed:
+            with ProcessPoolExecutor(min(workers, len(changed))) as pool:
+                results = pool.map(scan_raster, changed, [stats] * len(changed))
+                for done, (row, bands) in enumerate(results, start=1):
+                    with self.conn:
+                        self.conn.execute("DELETE FROM bands WHERE path = ?", (row["path"],))
+                        _insert(self.conn, "rasters", row)
+                        for band in bands:
+                            _insert(self.conn, "bands", band)
+                    if progress:
+                        progress(done, len(changed))
+        return {"scanned": changed, "removed": removed, "unchanged": len(found) - len(changed)}
+
+    def query(self, bbox=None, date=None, start=None, end=None, product=None, tile=None,
+              under=None):
+        """Rasters matching every given filter, ordered by path.
+
+        bbox is (min_lon, min_lat, max_lon, max_lat) and matches intersecting
+        rasters; date/start/end accept YYYYMMDD or YYYY-MM-DD; product may be a
+        name or a list of names; under limits results to one or more directories.
+        """
+        where, params = ["error IS NULL"], []
+        if bbox is not None:
+            where.append("min_lon <= ? AND max_lon >= ? AND min_lat <= ? AND max_lat >= ?")
+            params += [bbox[2], bbox[0], bbox[3], bbox[1]]
+        if date is not None:
+            where.append("date = ?")
+            params.append(_iso_date(date))
+        if start is not None:
+            where.append("date >= ?")
+            params.append(_iso_date(start))
+        if end is not None:
+            where.append("date <= ?")
+            params.append(_iso_date(end))
+        if product is not None:
+            products = [product] if isinstance(product, str) else list(product)
+            where.append(f"product IN ({', '.join('?' * len(products))})")
+            params += products
+        if tile is not None:
+            where.append("tile = ?")
+            params.append(tile)
+        if under is not None:
+            dirs = [under] if isinstance(under, str) else list(under)
+            clauses = []
+            for d in dirs:
+                d = os.path.abspath(d)
+                prefix = d if os.path.isfile(d) else os.path.join(d, "")
+                clauses.append("substr(path, 1, ?) = ?")
+                params += [len(prefix), prefix]
+            where.append(f"({' OR '.join(clauses)})")
+        sql = f"SELECT * FROM rasters WHERE {' AND '.join(where)} ORDER BY path"
+        return [_decode(r) for r in self.conn.execute(sql, params)]
+
+    def get(self, path):
+        row = self.conn.execute("SELECT * FROM rasters WHERE path = ?",
+                                (os.path.abspath(path),)).fetchone()
+        return _decode(row) if row else None
+
+    def bands(self, path):
+        """Per-band statistics of a cataloged raster (empty if scanned without stats)."""
+        return [_decode(r) for r in self.conn.execute(
+            "SELECT * FROM bands WHERE path = ? ORDER BY band", (os.path.abspath(path),))]
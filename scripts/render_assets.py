@@ -0,0 +1,269 @@
+"""
+Showcase assets from the comparison layers: side-by-side panels, a zoom
+inset and before/after wipe and fade animations of one SR product.
+The layers are composited once (s2dr4_tools.CompositeBuilder) on two grids,
+a display-size overview for the panels and a native-resolution crop for the
+zoom and the animations, and every output is cut from them. Animation
+frames are generated lazily and streamed to the encoder one at a time: GIF
+through Pillow's frame writer, MP4 through an ffmpeg pipe when ffmpeg is on
+PATH.
+"""
+import os
+import shutil
+import subprocess
+import time
+from functools import lru_cache
+
+import numpy as np
+import rasterio
+from PIL import GifImagePlugin, Image, ImageDraw, ImageFont
+
+from s2dr4_tools import FALLBACK_BANDS, CompositeBuilder, find_rgbn, get_info
+from s2dr4_tools.stretch import StretchCache
+
+PANEL_SIZE = 900
+DIVIDER_PX = 2
+CROP_M = 500
+ZOOM_M = 400
+ZOOM_SIZE = 600
+ANIMATION_SIZE = 400
+FADE_STEPS = 12
+FRAME_MS = 80
+JPEG_QUALITY = 90
+
+ORIG_COLOR = (255, 170, 60)
+SR_COLOR = (110, 230, 160)
+TEXT_COLOR = (235, 235, 235)
+DIVIDER_COLOR = (20, 20, 20)
+
+FFMPEG = shutil.which("ffmpeg")
+
+SR_PRODUCTS = {"rgb_sr": "TCI", "fc_sr": "IRP", "ndvi_sr": "NDVI"}
+PANELS = {
+    "hero_comparison.jpg": ("rgb", "Original 10m", "S2DR4 Super-Resolved 1m"),
+    "falsecolor_comparison.jpg": ("fc", "Original 10m (NIR-R-G)", "S2DR4 1m (NIR-R-G)"),
+    "ndvi_comparison.jpg": ("ndvi", "Original 10m NDVI", "S2DR4 1m NDVI"),
+}
+
+
+# ── Drawing ──
+
+@lru_cache(maxsize=None)
+def _font(size):
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:  # Pillow < 10.1 has only the fixed bitmap font
+        return ImageFont.load_default()
+
+
+def draw_label(img, text, color, corner, size=18, margin=6):
+    """Draw text on a translucent dark box at a corner ("tl", "tr") or edge
+    ("top", "bottom") of img, in place."""
+    font = _font(size)
+    draw = ImageDraw.Draw(img)
+    x0, y0, x1, y1 = draw.textbbox((0, 0), text, font=font)
+    w, h = x1 - x0 + 2 * margin, y1 - y0 + 2 * margin
+    left = {"tl": 2, "tr": img.width - w - 2}.get(corner, (img.width - w) // 2)
+    top = img.height - h - 8 if corner == "bottom" else 2 if corner in ("tl", "tr") else 8
+    box = (left, top, left + w, top + h)
+    shade = Image.new("L", (w, h), 0)
+    ImageDraw.Draw(shade).rounded_rectangle((0, 0, w - 1, h - 1), radius=5, fill=170)
+    img.paste(DIVIDER_COLOR, box, shade)
+    draw.text((left + margin - x0, top + margin - y0), text, font=font, fill=color)
+    return img
+
+
+def side_by_side(left, right, left_label=None, right_label=None, divider=DIVIDER_PX):
+    """Two equal-size images separated by a thin dark divider, labelled in
+    their outer top corners."""
+    w, h = left.size
+    out = Image.new("RGB", (2 * w + divider, h), DIVIDER_COLOR)
+    out.paste(left, (0, 0))
+    out.paste(right, (w + divider, 0))
+    if left_label:
+        draw_label(out, left_label, ORIG_COLOR, "tl")
+    if right_label:
+        draw_label(out, right_label, SR_COLOR, "tr")
+    return out
+
+
+# ── Frames (generated lazily, one at a time) ──
+
+def fade_frames(before, after, steps=FADE_STEPS, labels=("Original 10m", "S2DR4 1m"),
+                caption=None):
+    """Cross-fade before -> after -> before in 2 * steps + 1 frames."""
+    for i in range(2 * steps + 1):
+        t = i / steps if i <= steps else 2 - i / steps
+        frame = Image.blend(before, after, t)
+        after_side = t >= 0.5
+        draw_label(frame, labels[after_side], SR_COLOR if after_side else ORIG_COLOR, "top")
+        if caption:
+            draw_label(frame, caption, TEXT_COLOR, "bottom", size=13)
+        yield frame
+
+
+def wipe_frames(before, after, steps=FADE_STEPS, labels=("10m", "1m"), caption=None):
+    """A divider sweeping across and back: after is revealed on its left,
+    before shows on its right. 2 * steps + 1 frames."""
+    w, h = before.size
+    for i in range(2 * steps + 1):
+        t = i / steps if i <= steps else 2 - i / steps
+        x = round(t * w)
+        frame = before.copy()
+        if x:
+            frame.paste(after.crop((0, 0, x, h)), (0, 0))
+        ImageDraw.Draw(frame).line([(x, 0), (x, h)], fill=(255, 255, 255), width=2)
+        draw_label(frame, labels[0], ORIG_COLOR, "tr")
+        draw_label(frame, labels[1], SR_COLOR, "tl")
+        if caption:
+            draw_label(frame, caption, TEXT_COLOR, "bottom", size=13)
+        yield frame
+
+
+# ── Streaming encoders ──
+
+def write_gif(path, frames, duration=FRAME_MS, loop=0):
+    """Encode RGB frames to an animated GIF as they arrive, each with its own
+    adaptive palette; only the current frame is held in memory.
+    Returns the number of frames."""
+    n = 0
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        for frame in frames:
+            frame = frame.quantize(256, method=Image.Quantize.FASTOCTREE)
+            if n == 0:
+                header, _ = GifImagePlugin.getheader(frame, info={"loop": loop,
+                                                                  "duration": duration})
+                f.write(b"".join(header))
+            f.write(b"".join(GifImagePlugin.getdata(frame, duration=duration,
+                                                    include_color_table=True)))
+            n += 1
+        f.write(b";")
+    os.replace(tmp, path)
+    return n
+
+
+def write_mp4(path, frames, duration=FRAME_MS, crf=20):
+    """Pipe RGB frames to ffmpeg (H.264, yuv420p) as they arrive.
+    Returns the number of frames."""
+    if FFMPEG is None:
+        raise RuntimeError("ffmpeg is not on PATH; MP4 output needs it")
+    n, proc = 0, None
+    try:
+        for frame in frames:
+            if proc is None:
+                w, h = frame.size
+                proc = subprocess.Popen(
+                    [FFMPEG, "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                     "-s", f"{w}x{h}", "-framerate", f"{1000 / duration:g}", "-i", "-",
+                     "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-c:v", "libx264",
+                     "-pix_fmt", "yuv420p", "-crf", str(crf), "-movflags", "+faststart", path],
+                    stdin=subprocess.PIPE)
+            proc.stdin.write(frame.convert("RGB").tobytes())
+            n += 1
+    finally:
+        if proc is not None:
+            proc.stdin.close()
+            if proc.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed writing {path}")
+    return n
+
+
+def write_animation(path, frames, duration=FRAME_MS):
+    """Stream frames to a .gif or .mp4 by extension. Returns the frame count."""
+    if path.lower().endswith(".mp4"):
+        return write_mp4(path, frames, duration)
+    return write_gif(path, frames, duration)
+
+
+# ── Asset set ──
+
+def sr_products(tci_path):
+    """{layer: path} of the SR products next to a _TCI GeoTIFF (missing ones left out)."""
+    products = {}
+    for layer, product in SR_PRODUCTS.items():
+        path = tci_path[:-len("_TCI.tif")] + f"_{product}.tif"
+        if os.path.exists(path):
+            products[layer] = path
+    return products
+
+
+def _crop(size, center, px, res, origin):
+    """Window (start, stop) of px pixels around center along one axis, kept on the grid."""
+    px = min(px, size)
+    mid = size // 2 if center is None else round((center - origin) / res)
+    start = min(max(mid - px // 2, 0), size - px)
+    return start, start + px
+
+
+def render_assets(orig_path, tci_path, output_dir, center=None, crop_m=CROP_M, zoom_m=ZOOM_M,
+                  panel_size=PANEL_SIZE, animation_size=ANIMATION_SIZE, steps=FADE_STEPS,
+                  duration=FRAME_MS, mp4=False, stretch=None):
+    """Write the panels, zoom inset and animations of one SR product to output_dir.
+    center is an (x, y) point in the SR CRS for the crop (default: the middle).
+    Returns {file name: seconds}."""
+    timings = {}
+    os.makedirs(output_dir, exist_ok=True)
+    bounds, crs, res, width, height = get_info(tci_path)
+    with rasterio.open(orig_path) as ds:
+        bands = find_rgbn(ds.descriptions) or FALLBACK_BANDS
+    stretch = stretch if stretch is not None else StretchCache()
+    sr_layers = sr_products(tci_path)
+
+    # Overview grid: every layer at panel size, cut points fitted on it
+    t0 = time.perf_counter()
+    scale = min(1.0, panel_size / max(width, height))
+    ow, oh = max(1, int(width * scale)), max(1, int(height * scale))
+    overview = CompositeBuilder(orig_path, sr_layers, bounds, crs, ow, oh, bands, stretch)
+    overview.fit_stretch(ow, oh)
+    layers = {name: np.zeros((oh, ow, 3), dtype=np.uint8)
+              for name in ("rgb_orig", "fc_orig", "ndvi_orig", *sr_layers)}
+    overview.build(layers)
+    panels = {name: Image.fromarray(img) for name, img in layers.items()}
+
+    # Native-resolution crop shared by the zoom inset and the animations
+    detail = CompositeBuilder(orig_path, sr_layers, bounds, crs, width, height, bands, stretch)
+    cx, cy = center if center is not None else (None, None)
+    crop_px = round(max(crop_m, zoom_m) / res)
+    cols = _crop(width, cx, crop_px, res, bounds.left)
+    rows = _crop(height, cy, crop_px, -res, bounds.top)
+    crop = {name: np.zeros((rows[1] - rows[0], cols[1] - cols[0], 3), dtype=np.uint8)
+            for name in ("rgb_orig", "rgb_sr")}
+    detail.build(crop, rows=rows, cols=cols)
+    before, after = Image.fromarray(crop["rgb_orig"]), Image.fromarray(crop["rgb_sr"])
+    timings["composites"] = time.perf_counter() - t0
+
+    def centered(img, size_m):
+        px = min(round(size_m / res), img.width, img.height)
+        left, top = (img.width - px) // 2, (img.height - px) // 2
+        return img.crop((left, top, left + px, top + px))
+
+    def save(name, fn):
+        t = time.perf_counter()
+        fn(os.path.join(output_dir, name))
+        timings[name] = time.perf_counter() - t
+
+    for name, (kind, left_label, right_label) in PANELS.items():
+        if f"{kind}_sr" in panels:
+            save(name, lambda path, kind=kind, labels=(left_label, right_label):
+                 side_by_side(panels[f"{kind}_orig"], panels[f"{kind}_sr"], *labels)
+                 .save(path, quality=JPEG_QUALITY))
+
+    zoom_size = (ZOOM_SIZE, ZOOM_SIZE)
+    save("zoom_comparison.jpg", lambda path: side_by_side(
+        centered(before, zoom_m).resize(zoom_size, Image.NEAREST),
+        centered(after, zoom_m).resize(zoom_size, Image.LANCZOS),
+        "10m (nearest)", "1m (S2DR4)").save(path, quality=JPEG_QUALITY))
+
+    # Nearest keeps the 10 m pixels blocky; the SR side is filtered down
+    anim_size = (animation_size, animation_size)
+    a_before = centered(before, crop_m).resize(anim_size, Image.NEAREST)
+    a_after = centered(after, crop_m).resize(anim_size, Image.LANCZOS)
+    caption = f"{crop_m:g} x {crop_m:g} m crop"
+    extensions = [".gif", ".mp4"] if mp4 else [".gif"]
+    for ext in extensions:
+        save(f"before_after{ext}", lambda path: write_animation(
+            path, fade_frames(a_before, a_after, steps, caption=caption), duration))
+        save(f"before_after_wipe{ext}", lambda path: write_animation(
+            path, wipe_frames(a_before, a_after, steps, caption=caption), duration))
+    return timings
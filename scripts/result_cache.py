@@ -0,0 +1,194 @@
+"""
+Content-addressed cache of S2DR4 inference results.
+Entries are keyed by normalized AOI, requested date, resolved scene date and
+s2dr4 version; a hit links the cached GeoTIFFs into the output directory
+instead of re-running fetch -> preprocess -> inference. The cache is
+size-bounded (LRU eviction) and checks file size and mtime before reuse,
+re-verifying the checksum of any file whose mtime changed.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+CACHE_DIR = os.path.expanduser("~/.cache/s2dr4_results")
+MAX_CACHE_BYTES = 50 * 1024 ** 3
+SR_DATE = re.compile(r"S2L3Ax10_[^-]+-[^-]+-(\d{8})_[A-Z]+\.tif$")
+
+
+def s2dr4_version():
+    try:
+        from importlib.metadata import version
+        return version("s2dr4")
+    except Exception:
+        return "unknown"
+
+
+def _key(**fields):
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:24]
+
+
+def _request_key(lonlat, date, version):
+    # 5 decimals of a degree is ~1 m: the same AOI typed twice maps to one key
+    return _key(lonlat=[round(float(v), 5) for v in lonlat], date=date, version=version)
+
+
+def file_sha256(path, chunk=4 * 1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _link(src, dst):
+    """Hardlink src to dst, falling back to a symlink across filesystems."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.lexists(dst):
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            return
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        os.symlink(src, dst)
+
+
+def _link_or_copy(src, dst):
+    """Store src in the cache without duplicating bytes when possible."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class ResultCache:
+    """Size-bounded LRU cache of inference outputs under root.
+
+    Files are shared with the output directory by hardlink where possible, so
+    an output overwritten in place also changes the cached copy; the size /
+    mtime / checksum check on lookup catches that and drops the entry.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, verify=True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.verify = verify
+        self._index_path = os.path.join(root, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._index = {"requests": {}, "entries": {}}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding="utf-8") as f:
+                self._index = json.load(f)
+
+    def lookup(self, lonlat, date, version):
+        """Return the cached entry for a request, or None on a miss.
+        Entries that fail the integrity check are dropped. The check runs
+        outside the lock, so parallel workers do not queue behind it."""
+        with self._lock:
+            entry_key = self._index["requests"].get(_request_key(lonlat, date, version))
+            entry = self._index["entries"].get(entry_key)
+            if entry is None:
+                return None
+            files = {rel: dict(meta) for rel, meta in entry["files"].items()}
+        mtimes = self._check(entry_key, files)
+        with self._lock:
+            if self._index["entries"].get(entry_key) is not entry:
+                return None  # dropped or replaced meanwhile
+            if mtimes is None:
+                self._drop(entry_key)
+                self._save()
+                return None
+            for rel, mtime_ns in mtimes.items():
+                entry["files"][rel]["mtime_ns"] = mtime_ns
+            entry["last_used"] = time.time()
+            self._save()
+            return dict(entry, key=entry_key)
+
+    def materialize(self, entry, output_dir):
+        """Link an entry's files into output_dir; returns the output paths."""
+        paths = []
+        for rel in entry["files"]:
+            dst = os.path.join(output_dir, rel)
+            _link(self._object_path(entry["key"], rel), dst)
+            paths.append(dst)
+        return paths
+
+    def store(self, lonlat, date, version, output_dir, outputs):
+        """Add freshly produced outputs (paths under output_dir) to the cache."""
+        rels = sorted(os.path.relpath(p, output_dir) for p in outputs)
+        scene_dates = sorted({m.group(1) for m in map(SR_DATE.search, rels) if m})
+        entry_key = _key(lonlat=[round(float(v), 5) for v in lonlat], date=date,
+                         scene_date=scene_dates[-1] if scene_dates else None, version=version)
+        with self._lock:
+            self._index["requests"][_request_key(lonlat, date, version)] = entry_key
+            entry = self._index["entries"].get(entry_key)
+            mtimes = None if entry is None else self._check(entry_key, entry["files"])
+            if mtimes is None:
+                files = {}
+                for rel in rels:
+                    obj = self._object_path(entry_key, rel)
+                    src = os.path.join(output_dir, rel)
+                    _link_or_copy(src, obj)
+                    st = os.stat(obj)
+                    files[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                  "sha256": file_sha256(obj)}
+                entry = {"scene_date": scene_dates[-1] if scene_dates else None,
+                         "version": version, "files": files,
+                         "bytes": sum(f["size"] for f in files.values())}
+                self._index["entries"][entry_key] = entry
+            else:
+                for rel, mtime_ns in mtimes.items():
+                    entry["files"][rel]["mtime_ns"] = mtime_ns
+            entry["last_used"] = time.time()
+            self._evict()
+            self._save()
+        return dict(entry, key=entry_key)
+
+    def _object_path(self, entry_key, rel):
+        return os.path.join(self.root, "objects", entry_key, rel)
+
+    def _check(self, entry_key, files):
+        """None if a file of the entry is missing or changed, else {rel: mtime_ns}
+        to record for files that were re-hashed. Only files whose mtime moved
+        since they were stored are hashed again."""
+        mtimes = {}
+        for rel, meta in files.items():
+            try:
+                st = os.stat(self._object_path(entry_key, rel))
+            except OSError:
+                return None
+            if st.st_size != meta["size"]:
+                return None
+            if self.verify and st.st_mtime_ns != meta.get("mtime_ns"):
+                if file_sha256(self._object_path(entry_key, rel)) != meta["sha256"]:
+                    return None
+                mtimes[rel] = st.st_mtime_ns
+        return mtimes
+
+    def _drop(self, entry_key):
+        self._index["entries"].pop(entry_key, None)
+        self._index["requests"] = {r: e for r, e in self._index["requests"].items() if e != entry_key}
+        shutil.rmtree(os.path.join(self.root, "objects", entry_key), ignore_errors=True)
+
+    def _evict(self):
+        entries = self._index["entries"]
+        total = sum(e["bytes"] for e in entries.values())
+        for entry_key in sorted(entries, key=lambda k: entries[k].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            total -= entries[entry_key]["bytes"]
+            self._drop(entry_key)
+
+    def _save(self):
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=1)
+        os.replace(tmp, self._index_path)
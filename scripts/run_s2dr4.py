@@ -6,32 +6,18 @@ Run inside WSL2 with the s2dr4_env activated:
 """
 import os
 import sys
-import shutil
+
+from cog import convert_to_cog
+from inference_batch import snapshot_tifs
+from instrument import Run
+from output_sync import sync_outputs
+from result_cache import ResultCache, s2dr4_version
 
 # Output directory — results saved here
 OUTPUT_DIR = os.path.expanduser("~/s2dr4_output")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # S2DR4 expects output at /content/output (Google Colab convention)
-# Create a symlink so it works locally
 COLAB_OUTPUT = "/content/output"
-if not os.path.exists("/content"):
-    os.makedirs("/content", exist_ok=True)
-if os.path.islink(COLAB_OUTPUT):
-    os.unlink(COLAB_OUTPUT)
-if not os.path.exists(COLAB_OUTPUT):
-    os.symlink(OUTPUT_DIR, COLAB_OUTPUT)
-
-print("=" * 60)
-print("S2DR4 Super-Resolution Inference")
-print("=" * 60)
-
-# Import S2DR4
-try:
-    import s2dr4.inferutils
-except ImportError:
-    print("ERROR: s2dr4 not installed. Run setup_wsl.sh first.")
-    sys.exit(1)
 
 # ─── Configuration ───────────────────────────────────────────
 # Khartoum center coordinates (lon, lat) — NOTE: X, Y format!
@@ -41,40 +27,105 @@ LONLAT = (32.53, 15.50)
 # Target date — matching your data filename date
 DATE = "2026-02-04"
 
-print(f"  Location:  Khartoum, Sudan")
-print(f"  Lon/Lat:   {LONLAT}")
-print(f"  Date:      {DATE}")
-print(f"  Output:    {OUTPUT_DIR}")
-print(f"  Area:      4 x 4 km")
-print(f"  Target:    1 m/px (10x super-resolution)")
-print()
-
-# ─── Run Inference ───────────────────────────────────────────
-print("Starting S2DR4 inference...")
-print("This will:")
-print("  1. Fetch Sentinel-2 data from Copernicus for this location/date")
-print("  2. Preprocess multiple nearby dates for the model")
-print("  3. Run deep learning super-resolution (10m → 1m)")
-print("  4. Generate output GeoTIFFs")
-print()
-
-s2dr4.inferutils.test(LONLAT, DATE)
-
-# ─── Copy results to Windows-accessible folder ──────────────
+# Reuse results already computed for this lon/lat + date + s2dr4 version
+USE_CACHE = True
+
+# Rewrite outputs as Cloud-Optimized GeoTIFFs with overviews (None to keep as-is)
+COG_COMPRESS = "ZSTD"
+
+# Per-stage timing / peak-memory trace (plus a cProfile when PROFILE is set)
+REPORT_DIR = os.path.join(OUTPUT_DIR, "reports")
+PROFILE = False
+
+# ─── Sync results to Windows-accessible folder ──────────────
 WIN_OUTPUT = "/mnt/d/Udemy_Cour/Gamma Earth S2DR4/output"
-os.makedirs(WIN_OUTPUT, exist_ok=True)
-
-print(f"\nCopying results to Windows folder: D:\\Udemy_Cour\\Gamma Earth S2DR4\\output")
-for f in os.listdir(OUTPUT_DIR):
-    if f.endswith(".tif"):
-        src = os.path.join(OUTPUT_DIR, f)
-        dst = os.path.join(WIN_OUTPUT, f)
-        shutil.copy2(src, dst)
-        size_mb = os.path.getsize(dst) / (1024 * 1024)
-        print(f"  Copied: {f} ({size_mb:.1f} MB)")
-
-print("\n" + "=" * 60)
-print("DONE! Super-resolved 1m GeoTIFFs are in:")
-print(f"  WSL:     {OUTPUT_DIR}")
-print(f"  Windows: D:\\Udemy_Cour\\Gamma Earth S2DR4\\output")
-print("=" * 60)
+# Recompress GeoTIFFs before they cross the slow drvfs bridge ("DEFLATE", "ZSTD" or None)
+SYNC_COMPRESS = None
+
+
+def link_colab_output():
+    """Create OUTPUT_DIR and point /content/output at it, so S2DR4 writes there."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs("/content", exist_ok=True)
+    if os.path.islink(COLAB_OUTPUT):
+        os.unlink(COLAB_OUTPUT)
+    if not os.path.exists(COLAB_OUTPUT):
+        os.symlink(OUTPUT_DIR, COLAB_OUTPUT)
+
+
+def main():
+    link_colab_output()
+
+    print("=" * 60)
+    print("S2DR4 Super-Resolution Inference")
+    print("=" * 60)
+
+    # Import S2DR4
+    try:
+        import s2dr4.inferutils
+    except ImportError:
+        print("ERROR: s2dr4 not installed. Run setup_wsl.sh first.")
+        sys.exit(1)
+
+    run = Run("run_s2dr4", profile=PROFILE)
+
+    print(f"  Location:  Khartoum, Sudan")
+    print(f"  Lon/Lat:   {LONLAT}")
+    print(f"  Date:      {DATE}")
+    print(f"  Output:    {OUTPUT_DIR}")
+    print(f"  Area:      4 x 4 km")
+    print(f"  Target:    1 m/px (10x super-resolution)")
+    print()
+
+    # ─── Run Inference (or reuse a cached result) ────────────────
+    with run.stage("cache lookup"):
+        cache = ResultCache()
+        version = s2dr4_version()
+        entry = cache.lookup(LONLAT, DATE, version) if USE_CACHE else None
+
+    if entry:
+        print(f"Cache hit: scene {entry['scene_date']}, s2dr4 {version} — skipping inference")
+        for path in cache.materialize(entry, OUTPUT_DIR):
+            print(f"  Linked: {os.path.relpath(path, OUTPUT_DIR)}")
+    else:
+        print("Starting S2DR4 inference...")
+        print("This will:")
+        print("  1. Fetch Sentinel-2 data from Copernicus for this location/date")
+        print("  2. Preprocess multiple nearby dates for the model")
+        print("  3. Run deep learning super-resolution (10m → 1m)")
+        print("  4. Generate output GeoTIFFs")
+        print()
+
+        before = snapshot_tifs(OUTPUT_DIR)
+        with run.stage("inference"):
+            s2dr4.inferutils.test(LONLAT, DATE)
+        after = snapshot_tifs(OUTPUT_DIR)
+        outputs = [p for p, sig in after.items() if before.get(p) != sig]
+        if COG_COMPRESS and outputs:
+            print("\nConverting outputs to Cloud-Optimized GeoTIFF...")
+            with run.stage("cog"):
+                convert_to_cog(outputs, compress=COG_COMPRESS)
+        if USE_CACHE and outputs:
+            with run.stage("cache store"):
+                cache.store(LONLAT, DATE, version, OUTPUT_DIR, outputs)
+            print(f"\nCached {len(outputs)} outputs in {cache.root}")
+
+    print(f"\nSyncing results to Windows folder: D:\\Udemy_Cour\\Gamma Earth S2DR4\\output")
+    with run.stage("sync"):
+        synced = sync_outputs(OUTPUT_DIR, WIN_OUTPUT, compress=SYNC_COMPRESS)
+    print(f"  {len(synced['copied'])} copied, {len(synced['skipped'])} unchanged")
+
+    print("\nRun report:")
+    print(run.summary())
+    print(f"  Trace: {run.save(REPORT_DIR)}")
+    run.close()
+
+    print("\n" + "=" * 60)
+    print("DONE! Super-resolved 1m GeoTIFFs are in:")
+    print(f"  WSL:     {OUTPUT_DIR}")
+    print(f"  Windows: D:\\Udemy_Cour\\Gamma Earth S2DR4\\output")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
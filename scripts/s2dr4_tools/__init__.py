@@ -0,0 +1,46 @@
+"""
+Importable imagery helpers shared by the pipeline scripts.
+Names are resolved on first use (PEP 562), so `import s2dr4_tools` does not
+load rasterio, numpy or PIL and has no side effects. A long-running worker
+imports once and then calls the helpers with no per-call startup:
+
+    from s2dr4_tools import get_info, read_within_bounds, raster_stats
+"""
+import importlib
+
+_EXPORTS = {
+    "get_info": ".raster",
+    "read_full": ".raster",
+    "read_within_bounds": ".raster",
+    "read_valid_within_bounds": ".raster",
+    "MAX_DIM": ".render",
+    "JPEG_QUALITY": ".render",
+    "float_to_uint8": ".render",
+    "ndvi_colormap": ".render",
+    "upsample_nearest": ".render",
+    "encode_image": ".render",
+    "LAYERS": ".composite",
+    "FALLBACK_BANDS": ".composite",
+    "find_rgbn": ".composite",
+    "CompositeBuilder": ".composite",
+    "BandStats": ".stats",
+    "dataset_stats": ".stats",
+    "raster_stats": ".stats",
+    "ValidityMask": ".validity",
+    "load_mask": ".validity",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,35 @@
+"""
+Read-once band cache for composite building.
+Bands are keyed by (path, band, target grid). Missing bands are fetched
+together in a single reader call, so overlapping composites (RGB, false
+color, NDVI) never re-open the file or resample the same band twice.
+"""
+
+
+class BandCache:
+    """Caches bands resampled onto a target grid and hands out views.
+
+    reader is called as reader(path, target_bounds, target_w, target_h, bands=[...])
+    and must return a (len(bands), target_h, target_w) array, e.g.
+    read_within_bounds in create_comparison.py.
+    """
+
+    def __init__(self, reader):
+        self._reader = reader
+        self._bands = {}
+
+    def bands(self, path, band_indexes, target_bounds, target_w, target_h):
+        """Return one 2D array per requested band (1-based indexes).
+        The arrays are views into the cached reads — treat them as read-only.
+        """
+        grid = (tuple(target_bounds), target_w, target_h)
+        missing = list(dict.fromkeys(b for b in band_indexes
+                                     if (path, b, grid) not in self._bands))
+        if missing:
+            data = self._reader(path, target_bounds, target_w, target_h, bands=missing)
+            for b, arr in zip(missing, data):
+                self._bands[(path, b, grid)] = arr
+        return [self._bands[(path, b, grid)] for b in band_indexes]
+
+    def clear(self):
+        self._bands.clear()
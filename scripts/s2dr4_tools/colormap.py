@@ -0,0 +1,80 @@
+"""
+Lookup-table colormap engine.
+A palette is defined by piecewise-linear color stops and baked into a
+quantized LUT once; applying it is a single np.take per chunk into a
+preallocated uint8 (H, W, 3) buffer, with NaN mapped in the same pass.
+"""
+import numpy as np
+
+LUT_SIZE = 4096
+CHUNK_PIXELS = 1 << 18
+
+
+class Colormap:
+    """Quantized LUT colormap over [vmin, vmax].
+
+    stops is a list of (value, (r, g, b)) pairs in data units, sorted by value.
+    Values outside [vmin, vmax] clamp to the end colors; NaN gets nan_color.
+    """
+
+    def __init__(self, stops, vmin=-1.0, vmax=1.0, size=LUT_SIZE, nan_color=(0, 0, 0)):
+        positions = np.array([p for p, _ in stops], dtype=np.float64)
+        colors = np.array([c for _, c in stops], dtype=np.float64)
+        if np.any(np.diff(positions) < 0):
+            raise ValueError("colormap stops must be sorted by value")
+        self.vmin = float(vmin)
+        self.vmax = float(vmax)
+        self.size = size
+        self._scale = size / (self.vmax - self.vmin)
+        # Sample each LUT entry at its bin center; the extra last entry is NaN
+        centers = self.vmin + (np.arange(size) + 0.5) / self._scale
+        lut = np.empty((size + 1, 3), dtype=np.uint8)
+        for c in range(3):
+            lut[:size, c] = np.rint(np.interp(centers, positions, colors[:, c]))
+        lut[size] = nan_color
+        self.lut = lut
+
+    def apply(self, values, out=None):
+        """Map a 2D array to an (H, W, 3) uint8 image, optionally into out."""
+        values = np.asarray(values)
+        if out is None:
+            out = np.empty(values.shape + (3,), dtype=np.uint8)
+        elif out.shape != values.shape + (3,):
+            raise ValueError(f"out has shape {out.shape}, expected {values.shape + (3,)}")
+        # A strided out (e.g. a window of a larger image) cannot be flattened
+        # in place: fill a contiguous buffer and copy it through
+        target = out if out.flags.c_contiguous else np.empty(out.shape, dtype=np.uint8)
+        flat = values.reshape(-1)
+        flat_out = target.reshape(-1, 3)
+        # Work in fixed-size chunks so temporaries stay cache-sized
+        idx_f = np.empty(min(CHUNK_PIXELS, flat.size), dtype=np.float32)
+        for start in range(0, flat.size, CHUNK_PIXELS):
+            chunk = flat[start:start + CHUNK_PIXELS]
+            buf = idx_f[:chunk.size]
+            np.subtract(chunk, self.vmin, out=buf)
+            buf *= self._scale
+            np.clip(buf, 0, self.size - 1, out=buf)  # NaN survives the clip...
+            np.nan_to_num(buf, copy=False, nan=self.size)  # ...and lands on the NaN entry
+            np.take(self.lut, buf.astype(np.intp), axis=0, out=flat_out[start:start + chunk.size])
+        if target is not out:
+            out[...] = target
+        return out
+
+
+# NDVI: bare soil brown -> yellow at 0 -> green -> dark green
+NDVI_COLORMAP = Colormap([
+    (-1.0, (140, 90, 50)),
+    (-0.4, (140, 90, 50)),
+    (0.0, (220, 200, 80)),
+    (0.4, (50, 160, 30)),
+    (1.0, (10, 130, 40)),
+])
+
+# NDWI / MNDWI: dry land brown -> pale at 0 -> open water blue
+NDWI_COLORMAP = Colormap([
+    (-1.0, (120, 80, 40)),
+    (-0.2, (200, 180, 140)),
+    (0.0, (235, 235, 225)),
+    (0.3, (70, 150, 220)),
+    (1.0, (10, 40, 140)),
+])
@@ -0,0 +1,113 @@
+"""
+The six comparison layers (true color, false color and NDVI, each for the
+original 10 m stack and the SR products) composited over windows of one
+reference grid spanning the SR extent. The original bands are read onto the
+grid once per window and shared by its composites; the SR products are read
+decimated to the grid.
+"""
+from contextlib import nullcontext
+from functools import partial
+
+import numpy as np
+from rasterio.coords import BoundingBox
+
+from .band_cache import BandCache
+from .grid_align import clear_grid_maps
+from .raster import read_full, read_valid_within_bounds, read_within_bounds
+from .render import float_to_uint8, ndvi_colormap
+from .spectral import INDICES, evaluate
+from .stretch import StretchCache
+
+LAYERS = ["rgb_orig", "rgb_sr", "fc_orig", "fc_sr", "ndvi_orig", "ndvi_sr"]
+ORIG_LAYERS = ("rgb_orig", "fc_orig", "ndvi_orig")
+BAND_CANDIDATES = {"B2": ["B2", "B02", "Blue"], "B3": ["B3", "B03", "Green"],
+                   "B4": ["B4", "B04", "Red"], "B8": ["B8", "B08", "NIR"]}
+FALLBACK_BANDS = (1, 2, 3, 7)
+
+
+def find_rgbn(descriptions):
+    """1-based (B2, B3, B4, B8) indexes from band descriptions; None if any is missing."""
+    band_map = {name.strip(): i + 1 for i, name in enumerate(descriptions) if name}
+    found = []
+    for candidates in BAND_CANDIDATES.values():
+        found.append(next((band_map[c] for c in candidates if c in band_map), None))
+    return None if None in found else tuple(found)
+
+
+class CompositeBuilder:
+    """Builds comparison layers over row/column windows of a width x height
+    grid over bounds (in crs, the SR CRS).
+
+    sr_layers maps "rgb_sr" / "fc_sr" / "ndvi_sr" to the SR GeoTIFFs and
+    bands holds the original's (B2, B3, B4, B8) indexes. The stretch cache
+    should hold cut points fitted to the whole grid (fit_stretch) so every
+    window renders alike. opener(path) is a context manager yielding what
+    the reads take: by default the path itself, or e.g. DatasetPool.dataset
+    to reuse open handles.
+    """
+
+    def __init__(self, orig_path, sr_layers, bounds, crs, width, height,
+                 bands=FALLBACK_BANDS, stretch=None, opener=None):
+        self.orig_path = orig_path
+        self.sr_layers = sr_layers
+        self.bounds = bounds
+        self.crs = crs
+        self.width = width
+        self.height = height
+        self.bands = list(bands)
+        self.stretch = stretch if stretch is not None else StretchCache()
+        self.opener = opener or nullcontext
+        self.band_cache = BandCache(partial(read_within_bounds, target_crs=crs))
+
+    def window_bounds(self, rows, cols=None):
+        """Bounds of grid rows (start, stop) and cols (default: all)."""
+        (row0, row1), (col0, col1) = rows, cols or (0, self.width)
+        b = self.bounds
+        res_x, res_y = (b.right - b.left) / self.width, (b.top - b.bottom) / self.height
+        return BoundingBox(b.left if col0 == 0 else b.left + col0 * res_x,
+                           b.bottom if row1 == self.height else b.top - row1 * res_y,
+                           b.right if col1 == self.width else b.left + col1 * res_x,
+                           b.top - row0 * res_y)
+
+    def fit_stretch(self, width, height):
+        """Fit the original bands' cut points on a width x height view of the whole grid."""
+        with self.opener(self.orig_path) as orig:
+            valid = read_valid_within_bounds(orig, self.bounds, width, height, target_crs=self.crs)
+            bands = self.band_cache.bands(orig, self.bands, self.bounds, width, height)
+        for b, band in zip(self.bands, bands):
+            self.stretch.get(self.orig_path, b, band, valid=valid)
+
+    def build(self, out, rows=None, cols=None):
+        """Composite a window of the grid into out[layer] ((rows, cols, 3) uint8).
+        Only the layers present in out are built."""
+        rows, cols = rows or (0, self.height), cols or (0, self.width)
+        h, w = rows[1] - rows[0], cols[1] - cols[0]
+        if any(layer in out for layer in ORIG_LAYERS):
+            bounds = self.window_bounds(rows, cols)
+            b2_idx, b3_idx, b4_idx, b8_idx = self.bands
+            with self.opener(self.orig_path) as orig:
+                b2, b3, b4, b8 = self.band_cache.bands(orig, self.bands, bounds, w, h)
+                valid = read_valid_within_bounds(orig, bounds, w, h, target_crs=self.crs)
+            for layer, composite in (("rgb_orig", [(b4_idx, b4), (b3_idx, b3), (b2_idx, b2)]),
+                                     ("fc_orig", [(b8_idx, b8), (b4_idx, b4), (b3_idx, b3)])):
+                if layer not in out:
+                    continue
+                for i, (b, band) in enumerate(composite):
+                    params = self.stretch.get(self.orig_path, b, band, valid=valid)
+                    float_to_uint8(band, params=params, out=out[layer][..., i], valid=valid)
+            if "ndvi_orig" in out:
+                ndvi = evaluate(INDICES["NDVI"], {"B8": b8, "B4": b4})
+                ndvi[~valid] = np.nan
+                ndvi_colormap(ndvi, out=out["ndvi_orig"])
+
+        full_width = cols == (0, self.width)
+        for layer, path in self.sr_layers.items():
+            if layer in out:
+                with self.opener(path) as src:
+                    data, _, _ = read_full(src, target_w=self.width, target_h=self.height,
+                                           rows=rows, cols=None if full_width else cols)
+                np.copyto(out[layer], np.moveaxis(data[:3], 0, -1))
+
+        # Window grids are never revisited
+        self.band_cache.clear()
+        clear_grid_maps()
@@ -0,0 +1,186 @@
+"""
+Source -> target pixel index maps for placing rasters on a common grid.
+The map for a (source grid, target grid) pair is computed once from the
+affine transforms (reprojecting target pixel centers when the CRSs differ)
+and cached; every band is then gathered with a single np.take into a
+preallocated output. Sampling is nearest pixel center, so all layers built
+on one target grid line up exactly, whatever the sub-pixel offset or CRS
+of their sources.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from rasterio.warp import transform as transform_coords
+from rasterio.windows import Window
+
+LATTICE_STEP = 16
+MAX_CACHED_MAPS = 8
+
+
+def _lattice(n, step):
+    idx = np.arange(0, n, step)
+    return idx if idx[-1] == n - 1 else np.append(idx, n - 1)
+
+
+def _interp_axis(values, lattice, n, axis):
+    """Linearly interpolate values sampled at lattice positions to 0..n-1 along axis."""
+    full = np.arange(n)
+    i1 = np.clip(np.searchsorted(lattice, full), 1, len(lattice) - 1)
+    i0 = i1 - 1
+    w = ((full - lattice[i0]) / np.maximum(lattice[i1] - lattice[i0], 1)).astype(np.float32)
+    a, b = np.take(values, i0, axis=axis), np.take(values, i1, axis=axis)
+    w = w if axis == 1 else w[:, None]
+    return a + (b - a) * w
+
+
+def _source_coords(src_transform, src_crs, dst_transform, dst_crs, dst_width, dst_height):
+    """Fractional source (row, col) of every target pixel center.
+    Returns 1D arrays when the mapping is separable (same CRS, no rotation),
+    else 2D (dst_height, dst_width) arrays."""
+    if src_crs is None or dst_crs is None or src_crs == dst_crs:
+        m = ~src_transform * dst_transform
+        cols = np.arange(dst_width) + 0.5
+        rows = np.arange(dst_height) + 0.5
+        if m.b == 0 and m.d == 0:
+            return rows * m.e + m.f, cols * m.a + m.c
+        rows, cols = rows[:, None], cols[None, :]
+        return m.d * cols + m.e * rows + m.f, m.a * cols + m.b * rows + m.c
+
+    # Reproject a coarse lattice of target centers and interpolate between them,
+    # like GDAL's approximate transformer; exact enough for UTM <-> UTM/geographic
+    lr, lc = _lattice(dst_height, LATTICE_STEP), _lattice(dst_width, LATTICE_STEP)
+    cc, rr = np.meshgrid(lc + 0.5, lr + 0.5)
+    xs = dst_transform.a * cc + dst_transform.b * rr + dst_transform.c
+    ys = dst_transform.d * cc + dst_transform.e * rr + dst_transform.f
+    sx, sy = transform_coords(dst_crs, src_crs, xs.ravel().tolist(), ys.ravel().tolist())
+    inv = ~src_transform
+    sx, sy = np.asarray(sx).reshape(xs.shape), np.asarray(sy).reshape(xs.shape)
+    # Points that failed to reproject fall outside the source
+    bad = ~(np.isfinite(sx) & np.isfinite(sy))
+    sx[bad], sy[bad] = -1e12, -1e12
+    col_l = (inv.a * sx + inv.b * sy + inv.c).astype(np.float32)
+    row_l = (inv.d * sx + inv.e * sy + inv.f).astype(np.float32)
+    row_f = _interp_axis(_interp_axis(row_l, lc, dst_width, 1), lr, dst_height, 0)
+    col_f = _interp_axis(_interp_axis(col_l, lc, dst_width, 1), lr, dst_height, 0)
+    return row_f, col_f
+
+
+class GridMap:
+    """Nearest-neighbour index map from a source raster grid onto a target grid.
+
+    window is the smallest source window covering the target; it is read at
+    read_shape, decimated by an integer factor when the target is coarser than
+    the source, so no more pixels are decoded than the target can show.
+    """
+
+    def __init__(self, src_transform, src_crs, src_width, src_height,
+                 dst_transform, dst_crs, dst_width, dst_height):
+        self.shape = (dst_height, dst_width)
+        row_f, col_f = _source_coords(src_transform, src_crs, dst_transform, dst_crs,
+                                      dst_width, dst_height)
+        with np.errstate(invalid="ignore"):
+            rows, cols = np.floor(row_f), np.floor(col_f)
+            valid_r = (rows >= 0) & (rows < src_height)
+            valid_c = (cols >= 0) & (cols < src_width)
+        if row_f.ndim == 1:
+            valid_r, valid_c = valid_r[:, None], valid_c[None, :]
+        valid = valid_r & valid_c
+
+        self.window = None
+        if not valid.any():
+            return
+        if row_f.ndim == 1:
+            r_ok, c_ok = rows[valid_r[:, 0]], cols[valid_c[0]]
+        else:
+            r_ok, c_ok = rows[valid], cols[valid]
+        r0, r1 = int(r_ok.min()), int(r_ok.max()) + 1
+        c0, c1 = int(c_ok.min()), int(c_ok.max()) + 1
+        self.window = Window(c0, r0, c1 - c0, r1 - r0)
+
+        # Source pixels per target pixel (by area) -> integer decimation factor
+        n_valid = int(valid.sum())
+        self.decimation = max(1, int(math.sqrt((c1 - c0) * (r1 - r0) / n_valid)))
+        f = self.decimation
+        read_h, read_w = math.ceil((r1 - r0) / f), math.ceil((c1 - c0) / f)
+        self.read_shape = (read_h, read_w)
+
+        # The decimated read spans the window exactly, so its step is f only
+        # when f divides the window size
+        self.step = ((r1 - r0) / read_h, (c1 - c0) / read_w)
+
+        dtype = np.int32 if read_h * read_w < 2 ** 31 else np.intp
+        with np.errstate(invalid="ignore"):
+            ri = np.clip((row_f - r0) // self.step[0], 0, read_h - 1).astype(dtype)
+            ci = np.clip((col_f - c0) // self.step[1], 0, read_w - 1).astype(dtype)
+        if row_f.ndim == 1:
+            ri, ci = ri[:, None], ci[None, :]
+        self.index = (ri * read_w + ci).ravel()
+        self.outside = None if valid.all() else np.flatnonzero(~valid.ravel())
+
+    def gather(self, data, out, fill=0):
+        """Gather (C, *read_shape) source data into out (C, *shape)."""
+        flat = data.reshape(data.shape[0], -1)
+        np.take(flat, self.index, axis=1, out=out.reshape(out.shape[0], -1))
+        if self.outside is not None:
+            out.reshape(out.shape[0], -1)[:, self.outside] = fill
+        return out
+
+    def read_mask(self, mask):
+        """Resample a validity.ValidityMask of the source grid onto the target
+        grid; target pixels outside the source are invalid."""
+        out = np.zeros((1,) + self.shape, dtype=bool)
+        if self.window is None:
+            return out[0]
+        # Sample the pixels GDAL's nearest decimated read picks for the data:
+        # floor((i + 0.5) * step) within the window
+        full = mask.read(self.window)
+        rows, cols = (np.minimum(((np.arange(n) + 0.5) * step).astype(np.intp), size - 1)
+                      for n, step, size in zip(self.read_shape, self.step, full.shape))
+        return self.gather(full[np.ix_(rows, cols)][None], out, fill=False)[0]
+
+    def read(self, ds, bands, out=None, fill=0):
+        """Read bands of an open dataset onto the target grid in one pass."""
+        if out is None:
+            out = np.empty((len(bands),) + self.shape, dtype=ds.dtypes[bands[0] - 1])
+        if self.window is None:
+            out[:] = fill
+            return out
+        data = ds.read(bands, window=self.window, out_shape=(len(bands),) + self.read_shape)
+        return self.gather(data, out, fill)
+
+
+_maps = OrderedDict()
+_maps_lock = threading.Lock()
+
+
+def grid_map(src_transform, src_crs, src_width, src_height,
+             dst_transform, dst_crs, dst_width, dst_height):
+    """Cached GridMap for a (source grid, target grid) pair."""
+    key = (tuple(src_transform), str(src_crs), src_width, src_height,
+           tuple(dst_transform), str(dst_crs), dst_width, dst_height)
+    with _maps_lock:
+        if key in _maps:
+            _maps.move_to_end(key)
+            return _maps[key]
+    gmap = GridMap(src_transform, src_crs, src_width, src_height,
+                   dst_transform, dst_crs, dst_width, dst_height)
+    with _maps_lock:
+        _maps[key] = gmap
+        while len(_maps) > MAX_CACHED_MAPS:
+            _maps.popitem(last=False)
+    return gmap
+
+
+def clear_grid_maps():
+    """Drop cached maps, e.g. after strips whose grids will not be reused."""
+    with _maps_lock:
+        _maps.clear()
+
+
+def read_aligned(ds, bands, dst_transform, dst_crs, dst_width, dst_height, fill=0):
+    """Read bands of ds onto a target grid; pixels outside the source are fill."""
+    gmap = grid_map(ds.transform, ds.crs, ds.width, ds.height,
+                    dst_transform, dst_crs, dst_width, dst_height)
+    return gmap.read(ds, bands, fill=fill)
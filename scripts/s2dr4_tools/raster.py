@@ -0,0 +1,81 @@
+"""
+Raster reads for the comparison layers: extents, decimated full reads and
+reads aligned onto a target grid. Each read takes a path (opened and closed
+per call) or an already open dataset, e.g. one kept in a DatasetPool.
+"""
+import os
+from contextlib import nullcontext
+
+import rasterio
+from affine import Affine
+from rasterio.enums import Resampling
+from rasterio.transform import from_bounds as transform_from_bounds
+from rasterio.windows import Window
+
+from .grid_align import grid_map, read_aligned
+from .validity import load_mask
+
+
+def _dataset(src):
+    """Context manager yielding an open dataset for a path or open dataset;
+    only datasets opened here are closed on exit."""
+    if isinstance(src, (str, os.PathLike)):
+        return rasterio.open(src)
+    return nullcontext(src)
+
+
+def get_info(path):
+    with rasterio.open(path) as ds:
+        return ds.bounds, ds.crs, abs(ds.transform.a), ds.width, ds.height
+
+
+def read_full(path, bands=None, target_w=None, target_h=None, resampling=Resampling.average,
+              rows=None, cols=None):
+    """Read full raster, optionally decimated to target_w x target_h.
+    rows=(start, stop) / cols=(start, stop) read only that window of the
+    (decimated) grid.
+    GDAL serves a reduced size from the nearest overview when there is one.
+    """
+    with _dataset(path) as ds:
+        if bands is None:
+            bands = list(range(1, ds.count + 1))
+        target_w, target_h = target_w or ds.width, target_h or ds.height
+        if rows is None and cols is None and (target_w, target_h) == (ds.width, ds.height):
+            return ds.read(bands), ds.bounds, ds.transform
+        start, stop = rows or (0, target_h)
+        scale_x, scale_y = ds.width / target_w, ds.height / target_h
+        if cols is None:
+            col0, width = 0, target_w
+            window = Window(0, start * scale_y, ds.width, (stop - start) * scale_y)
+        else:
+            col0, width = cols[0], cols[1] - cols[0]
+            window = Window(col0 * scale_x, start * scale_y, width * scale_x,
+                            (stop - start) * scale_y)
+        data = ds.read(bands, window=window, out_shape=(len(bands), stop - start, width),
+                       resampling=resampling)
+        transform = ds.transform * Affine.scale(scale_x, scale_y) * Affine.translation(col0, start)
+        return data, ds.bounds, transform
+
+
+def read_within_bounds(path, target_bounds, target_w, target_h, bands=None, target_crs=None):
+    """Read raster data onto the target_w x target_h grid over target_bounds
+    (in target_crs, default the source CRS), reprojecting if needed.
+    Pixels outside the source extent are filled with 0 (black).
+    Returns (C, target_h, target_w) uint8 or float array.
+    """
+    with _dataset(path) as ds:
+        if bands is None:
+            bands = list(range(1, ds.count + 1))
+        transform = transform_from_bounds(*target_bounds, target_w, target_h)
+        return read_aligned(ds, bands, transform, target_crs or ds.crs, target_w, target_h)
+
+
+def read_valid_within_bounds(path, target_bounds, target_w, target_h, target_crs=None):
+    """The raster's validity mask (validity.load_mask) on the same grid as
+    read_within_bounds. Returns (target_h, target_w) bool; outside the source is False."""
+    with _dataset(path) as ds:
+        gmap = grid_map(ds.transform, ds.crs, ds.width, ds.height,
+                        transform_from_bounds(*target_bounds, target_w, target_h),
+                        target_crs or ds.crs, target_w, target_h)
+        name = ds.name
+    return gmap.read_mask(load_mask(name))
@@ -0,0 +1,49 @@
+"""
+uint8 rendering of bands for the viewers: stretch, NDVI colorization and
+encoding to base64 images.
+"""
+import base64
+import io
+
+import numpy as np
+from PIL import Image
+
+from .colormap import NDVI_COLORMAP
+from .image_codecs import save_image
+from .stretch import apply_stretch, compute_stretch
+
+MAX_DIM = 2048
+JPEG_QUALITY = 88
+
+
+def float_to_uint8(arr, percentile_low=2, percentile_high=98, params=None, out=None, valid=None):
+    """Percentile-stretch a band to uint8; pass params to reuse cut points and
+    a boolean validity mask to skip the per-band NaN / zero checks."""
+    if params is None:
+        params = compute_stretch(arr, percentile_low, percentile_high, valid=valid)
+    if params is None:
+        if out is None:
+            return np.zeros_like(arr, dtype=np.uint8)
+        out[...] = 0
+        return out
+    return apply_stretch(arr, params, out=out, valid=valid)
+
+
+def ndvi_colormap(ndvi, out=None):
+    """Colorize NDVI through the precomputed LUT. Returns (H, W, 3) uint8."""
+    return NDVI_COLORMAP.apply(ndvi, out=out)
+
+
+def upsample_nearest(img, factor):
+    w, h = img.size
+    return img.resize((w * factor, h * factor), Image.NEAREST)
+
+
+def encode_image(img, max_dim=MAX_DIM, quality=JPEG_QUALITY, codec="jpeg"):
+    w, h = img.size
+    if max(w, h) > max_dim:
+        scale = max_dim / max(w, h)
+        img = img.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
+    buf = io.BytesIO()
+    save_image(img, buf, codec, quality)
+    return base64.b64encode(buf.getvalue()).decode("ascii")
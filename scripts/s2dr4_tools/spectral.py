@@ -0,0 +1,144 @@
+"""
+Blockwise spectral-index engine for the 10-band S2DR4 _MS product.
+Indices are arithmetic expressions over named bands (B2 ... B12). Every
+index is evaluated from one read of the bands it needs, block by block in
+float32 across a thread pool, and each is written to its own tiled GeoTIFF.
+Expressions assume reflectance in 0-1 (pass scale=1e-4 for 0-10000 DN).
+"""
+import ast
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import rasterio
+
+from .validity import load_mask
+
+MS_BANDS = ("B2", "B3", "B4", "B5", "B6", "B7", "B8", "B8A", "B11", "B12")
+BLOCK_SIZE = 512
+INDEX_WORKERS = os.cpu_count()
+
+INDICES = {
+    "NDVI": "(B8 - B4) / (B8 + B4)",
+    "NDWI": "(B3 - B8) / (B3 + B8)",
+    "MNDWI": "(B3 - B11) / (B3 + B11)",
+    "NDBI": "(B11 - B8) / (B11 + B8)",
+    "NDRE": "(B8A - B5) / (B8A + B5)",
+    "SAVI": "1.5 * (B8 - B4) / (B8 + B4 + 0.5)",
+    "EVI": "2.5 * (B8 - B4) / (B8 + 6 * B4 - 7.5 * B2 + 1)",
+    "NBR": "(B8 - B12) / (B8 + B12)",
+}
+
+FUNCTIONS = {"sqrt": np.sqrt, "abs": np.abs, "min": np.minimum, "max": np.maximum}
+_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load, ast.Call,
+          ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd)
+
+
+def compile_index(expr, bands=MS_BANDS):
+    """Validate an index expression; returns (code, band names it uses).
+    Only arithmetic, numbers, band names and FUNCTIONS are allowed."""
+    tree = ast.parse(expr, mode="eval")
+    used = []
+    for node in ast.walk(tree):
+        if not isinstance(node, _NODES):
+            raise ValueError(f"{expr!r}: {type(node).__name__} is not allowed")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f"{expr!r}: only numeric constants are allowed")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name)
+                                               and node.func.id in FUNCTIONS):
+            raise ValueError(f"{expr!r}: calls are limited to {', '.join(FUNCTIONS)}")
+        if isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+            if node.id not in bands:
+                raise ValueError(f"{expr!r}: unknown band {node.id!r}")
+            if node.id not in used:
+                used.append(node.id)
+    return compile(tree, f"<index {expr}>", "eval"), used
+
+
+def evaluate(expr, band_arrays):
+    """Evaluate an expression (string or compiled) over {band name: array}.
+    Result is float32; divisions by zero and other undefined values are NaN."""
+    code = compile_index(expr, tuple(band_arrays))[0] if isinstance(expr, str) else expr
+    namespace = {name: np.asarray(arr, dtype=np.float32) for name, arr in band_arrays.items()}
+    namespace.update(FUNCTIONS)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        result = np.asarray(eval(code, {"__builtins__": {}}, namespace), dtype=np.float32)
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def band_names(ds):
+    """Band name -> 1-based index, from the band descriptions or the _MS layout."""
+    names = [d.strip() if d else None for d in ds.descriptions]
+    if all(names):
+        return {name: i for i, name in enumerate(names, start=1)}
+    if ds.count == len(MS_BANDS):
+        return {name: i for i, name in enumerate(MS_BANDS, start=1)}
+    raise ValueError(f"{ds.name}: {ds.count} unnamed bands; cannot map them to B2..B12")
+
+
+def compute_indices(src_path, indices, output_dir, workers=INDEX_WORKERS, scale=1.0,
+                    compress="DEFLATE", block_size=BLOCK_SIZE, progress=None):
+    """Write each {name: expression} index of src_path to <output_dir>/<stem>.idx_<name>.tif
+    (a name that is never taken for an S2DR4 _<PRODUCT>.tif).
+
+    A pixel is nodata (NaN) where the source's validity mask is unset (any
+    band NaN or all bands 0); the mask is built once and kept as a sidecar.
+    Returns {name: output path}.
+    """
+    with rasterio.open(src_path) as src:
+        bmap = band_names(src)
+        profile = {"driver": "GTiff", "width": src.width, "height": src.height, "count": 1,
+                   "dtype": "float32", "crs": src.crs, "transform": src.transform,
+                   "nodata": np.nan, "tiled": True, "blockxsize": block_size,
+                   "blockysize": block_size, "compress": compress, "predictor": 3,
+                   "BIGTIFF": "IF_SAFER"}
+    compiled = {name: compile_index(expr, tuple(bmap)) for name, expr in indices.items()}
+    needed = list(dict.fromkeys(b for _, used in compiled.values() for b in used))
+    read_indexes = [bmap[b] for b in needed]
+    mask = load_mask(src_path)
+
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    stem = stem[:-3] if stem.endswith("_MS") else stem
+    paths = {name: os.path.join(output_dir, f"{stem}.idx_{name}.tif") for name in indices}
+    outputs = {name: rasterio.open(path, "w", **profile) for name, path in paths.items()}
+    for name, dst in outputs.items():
+        dst.set_band_description(1, name)
+
+    local = threading.local()
+    write_lock = threading.Lock()
+    handles = []
+
+    def reader():
+        # One read handle per worker thread: GDAL datasets are not thread-safe
+        if not hasattr(local, "ds"):
+            local.ds = rasterio.open(src_path)
+            handles.append(local.ds)
+        return local.ds
+
+    def process(window):
+        data = reader().read(read_indexes, window=window).astype(np.float32, copy=False)
+        invalid = ~mask.read(window)
+        if scale != 1.0:
+            data *= np.float32(scale)
+        arrays = dict(zip(needed, data))
+        for name, (code, _) in compiled.items():
+            result = evaluate(code, arrays)
+            result[invalid] = np.nan
+            with write_lock:
+                outputs[name].write(result, 1, window=window)
+
+    try:
+        windows = [win for _, win in next(iter(outputs.values())).block_windows(1)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for done, _ in enumerate(pool.map(process, windows), start=1):
+                if progress:
+                    progress(done, len(windows))
+    finally:
+        for ds in handles:
+            ds.close()
+        for dst in outputs.values():
+            dst.close()
+    return paths
@@ -0,0 +1,166 @@
+"""
+Streaming, block-windowed raster statistics.
+Walks a raster's internal blocks once and keeps per-band accumulators with
+bounded memory, so 1m SR products never have to be read whole.
+Used by inspect_data.py and compare_results.py.
+"""
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+HIST_BINS = 4096
+MIN_WINDOW_PIXELS = 1 << 20
+
+
+def iter_block_windows(ds, min_pixels=MIN_WINDOW_PIXELS):
+    """Yield windows aligned to the raster's internal blocks.
+    Full-width strips (striped GeoTIFFs) are grouped so each read covers at
+    least min_pixels instead of a single row.
+    """
+    block_h, block_w = ds.block_shapes[0]
+    if block_w < ds.width:
+        for _, window in ds.block_windows(1):
+            yield window
+        return
+    rows = max(block_h, (min_pixels // ds.width) // block_h * block_h)
+    for row in range(0, ds.height, rows):
+        yield Window(0, row, ds.width, min(rows, ds.height - row))
+
+
+class BandStats:
+    """Mergeable single-pass statistics for one band.
+
+    Count, NaN count, min, max and the Welford mean/variance are exact.
+    Percentiles are approximate: they come from a fixed number of histogram
+    bins whose range grows (by merging adjacent bins) as new values arrive.
+    """
+
+    def __init__(self, bins=HIST_BINS):
+        if bins % 2:
+            raise ValueError("bins must be even")
+        self.bins = bins
+        self.count = 0
+        self.nan_count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._hist = np.zeros(bins, dtype=np.int64)
+        self._lo = None
+        self._width = None
+
+    @property
+    def var(self):
+        return self._m2 / self.count if self.count else np.nan
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.var))
+
+    def update(self, values, valid=None):
+        """Fold an array of pixel values (any shape) into the accumulator.
+        With a validity mask of the same shape, masked-out pixels are counted
+        as nodata (nan_count) and NaN is not searched for."""
+        values = np.asarray(values).ravel()
+        if valid is not None:
+            valid = np.asarray(valid).ravel()
+            self.nan_count += int(valid.size - np.count_nonzero(valid))
+            values = values[valid]
+        elif np.issubdtype(values.dtype, np.floating):
+            nan = np.isnan(values)
+            n_nan = int(np.count_nonzero(nan))
+            if n_nan:
+                self.nan_count += n_nan
+                values = values[~nan]
+        if values.size == 0:
+            return
+        values = values.astype(np.float64, copy=False)
+        mean = float(values.mean())
+        dev = values - mean
+        self._combine(values.size, mean, float(dev @ dev),
+                      float(values.min()), float(values.max()))
+        self._add_to_hist(values)
+
+    def merge(self, other):
+        """Fold another accumulator (other blocks, files or workers) into this one."""
+        self.nan_count += other.nan_count
+        if other.count == 0:
+            return self
+        self._combine(other.count, other.mean, other._m2, other.min, other.max)
+        nz = np.flatnonzero(other._hist)
+        centers = other._lo + (nz + 0.5) * other._width
+        self._add_to_hist(centers, weights=other._hist[nz])
+        return self
+
+    def percentile(self, q):
+        """Approximate percentile(s), q in [0, 100], interpolated within bins."""
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+        cdf = np.cumsum(self._hist)
+        target = q / 100 * self.count
+        i = np.clip(np.searchsorted(cdf, target, side="left"), 0, self.bins - 1)
+        in_bin = self._hist[i]
+        frac = (target - (cdf[i] - in_bin)) / np.maximum(in_bin, 1)
+        result = np.clip(self._lo + (i + frac) * self._width, self.min, self.max)
+        return result if result.ndim else float(result)
+
+    def _combine(self, n, mean, m2, vmin, vmax):
+        # Chan et al. parallel update of the Welford accumulators
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, vmin)
+        self.max = max(self.max, vmax)
+
+    def _cover(self, vmin, vmax):
+        """Grow the histogram range until it covers [vmin, vmax]."""
+        if self._lo is None:
+            span = vmax - vmin
+            self._lo = vmin
+            self._width = span / self.bins if span > 0 else max(abs(vmin), 1.0) * 1e-6
+            return
+        half = self.bins // 2
+        while vmin < self._lo:
+            # Extend left: merged old bins land in the upper half
+            merged = self._hist.reshape(-1, 2).sum(axis=1)
+            self._hist[:half] = 0
+            self._hist[half:] = merged
+            self._lo -= self.bins * self._width
+            self._width *= 2
+        while vmax > self._lo + self.bins * self._width:
+            # Extend right: merged old bins land in the lower half
+            merged = self._hist.reshape(-1, 2).sum(axis=1)
+            self._hist[half:] = 0
+            self._hist[:half] = merged
+            self._width *= 2
+
+    def _add_to_hist(self, values, weights=None):
+        self._cover(float(values.min()), float(values.max()))
+        idx = ((values - self._lo) / self._width).astype(np.int64)
+        np.clip(idx, 0, self.bins - 1, out=idx)
+        counts = np.bincount(idx, weights=weights, minlength=self.bins)
+        self._hist += counts.astype(np.int64, copy=False)
+
+
+def dataset_stats(ds, bands=None, bins=HIST_BINS, mask=None):
+    """Compute BandStats for each band (1-based indexes) of an open dataset
+    in one block-wise pass. With a ValidityMask (validity.load_mask) only
+    valid pixels are counted; otherwise only NaN is excluded."""
+    if bands is None:
+        bands = list(range(1, ds.count + 1))
+    stats = [BandStats(bins) for _ in bands]
+    for window in iter_block_windows(ds):
+        block = ds.read(bands, window=window)
+        valid = mask.read(window) if mask is not None else None
+        for st, band in zip(stats, block):
+            st.update(band, valid)
+    return stats
+
+
+def raster_stats(path, bands=None, bins=HIST_BINS, mask=None):
+    """Open path and compute its per-band BandStats."""
+    with rasterio.open(path) as ds:
+        return dataset_stats(ds, bands, bins, mask)
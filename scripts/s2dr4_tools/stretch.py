@@ -0,0 +1,123 @@
+"""
+Percentile stretch to uint8 with cached, shareable cut points.
+Cut points come from a strided sample of an in-memory band, or from one
+streaming histogram pass over a raster file, instead of sorting every
+valid pixel. A StretchCache computes them once per (file, band) and can
+save/load a shared per-band set so tiles and dates render consistently.
+"""
+import json
+from collections import namedtuple
+
+import numpy as np
+import rasterio
+
+from .stats import BandStats, iter_block_windows
+
+MAX_SAMPLES = 1 << 20
+
+StretchParams = namedtuple("StretchParams", ["low", "high"])
+
+
+def _params(low, high):
+    low, high = float(low), float(high)
+    if high <= low:
+        high = low + 1
+    return StretchParams(low, high)
+
+
+def compute_stretch(arr, percentile_low=2, percentile_high=98, max_samples=MAX_SAMPLES,
+                    valid=None):
+    """Cut points from a strided sample of the valid pixels: those set in the
+    boolean mask valid if given, else the non-NaN, non-zero ones.
+    Returns None if the band has no valid pixels.
+    """
+    flat = arr.reshape(-1)
+    step = max(1, flat.size // max_samples)
+    sample = flat[::step]
+    if valid is not None:
+        valid = sample[valid.reshape(-1)[::step]]
+    else:
+        valid = sample[(~np.isnan(sample)) & (sample != 0)]
+    if valid.size == 0:
+        return None
+    low, high = np.percentile(valid, [percentile_low, percentile_high])
+    return _params(low, high)
+
+
+def raster_stretch(path, bands, percentile_low=2, percentile_high=98, mask=None):
+    """Cut points for each band (1-based) of a raster file from one streaming
+    histogram pass over its blocks. Returns {band: StretchParams or None}.
+    With a ValidityMask only its valid pixels are sampled.
+    """
+    with rasterio.open(path) as ds:
+        stats = [BandStats() for _ in bands]
+        for window in iter_block_windows(ds):
+            valid = mask.read(window) if mask is not None else None
+            for st, block in zip(stats, ds.read(bands, window=window)):
+                if valid is not None:
+                    st.update(block, valid)
+                else:
+                    st.update(block[block != 0])
+    result = {}
+    for band, st in zip(bands, stats):
+        result[band] = (_params(*st.percentile([percentile_low, percentile_high]))
+                        if st.count else None)
+    return result
+
+
+def apply_stretch(arr, params, out=None, valid=None):
+    """Stretch arr to uint8 with one float32 working buffer.
+    Pixels outside the boolean mask valid, or NaN and 0 without one, stay black.
+    """
+    low, high = params
+    buf = np.subtract(arr, low, dtype=np.float32)
+    buf *= 255 / (high - low)
+    np.clip(buf, 0, 255, out=buf)
+    if valid is not None:
+        buf[~valid] = 0
+    else:
+        np.nan_to_num(buf, copy=False, nan=0)
+        if low < 0:
+            # Zero only maps to black by itself when low >= 0
+            buf[arr == 0] = 0
+    if out is None:
+        out = np.empty(arr.shape, dtype=np.uint8)
+    np.copyto(out, buf, casting="unsafe")
+    return out
+
+
+class StretchCache:
+    """Stretch cut points per (file, band).
+
+    shared maps band -> StretchParams and, when set, overrides per-file
+    computation for that band, so every file (tile, date) uses the same
+    cut points without rescanning the data.
+    """
+
+    def __init__(self, shared=None):
+        self.shared = dict(shared or {})
+        self._params = {}
+
+    def get(self, path, band, arr, percentile_low=2, percentile_high=98, valid=None):
+        if band in self.shared:
+            return self.shared[band]
+        key = (path, band, percentile_low, percentile_high)
+        if key not in self._params:
+            self._params[key] = compute_stretch(arr, percentile_low, percentile_high,
+                                                valid=valid)
+        return self._params[key]
+
+    def save(self, json_path):
+        """Write the computed (or shared) cut points as a shared per-band set."""
+        shared = dict(self.shared)
+        for (_, band, _, _), params in self._params.items():
+            if params is not None:
+                shared.setdefault(band, params)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({str(b): list(p) for b, p in sorted(shared.items())}, f, indent=2)
+
+    @classmethod
+    def load(cls, json_path):
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls({int(b): _params(*p) for b, p in data.items()})
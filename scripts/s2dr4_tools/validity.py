@@ -0,0 +1,177 @@
+"""
+Bit-packed per-pixel validity masks, computed once per raster and shared.
+A pixel is valid when no band is NaN and not every band is 0 (or the
+dataset's nodata value) — the rule the stretch, index, stats and mosaic code
+all used to re-derive band by band. The mask is built in one block-wise pass,
+stored with np.packbits as a <raster>.valid.npz sidecar (or under
+~/.cache/s2dr4_masks when the raster's folder is not writable), and reused
+until the raster's size or mtime changes.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import rasterio
+
+from .stats import iter_block_windows
+
+MASK_SUFFIX = ".valid.npz"
+MASK_CACHE_DIR = os.path.expanduser("~/.cache/s2dr4_masks")
+MAX_LOADED_MASKS = 16
+
+
+def block_validity(data, nodata=None):
+    """Validity of a (bands, rows, cols) block: no band NaN, not all bands 0/nodata."""
+    empty = np.all(data == 0, axis=0)
+    if nodata is not None and nodata != 0 and not np.isnan(nodata):
+        empty |= np.all(data == nodata, axis=0)
+    if np.issubdtype(data.dtype, np.floating):
+        empty |= np.isnan(data).any(axis=0)
+    return ~empty
+
+
+class ValidityMask:
+    """A packed (height, ceil(width / 8)) validity bitmap for one raster grid."""
+
+    def __init__(self, bits, width, height):
+        self.bits = bits
+        self.width = width
+        self.height = height
+
+    @property
+    def shape(self):
+        return self.height, self.width
+
+    def count(self):
+        """Number of valid pixels."""
+        return int(np.unpackbits(self.bits, axis=1, count=self.width).sum(dtype=np.int64))
+
+    def read(self, window=None):
+        """Boolean validity for a window (whole grid by default).
+        Parts of the window outside the grid are invalid."""
+        if window is None:
+            return np.unpackbits(self.bits, axis=1, count=self.width).view(bool)
+        r0, c0 = int(window.row_off), int(window.col_off)
+        h, w = int(window.height), int(window.width)
+        out = np.zeros((h, w), dtype=bool)
+        rr0, rr1 = max(r0, 0), min(r0 + h, self.height)
+        cc0, cc1 = max(c0, 0), min(c0 + w, self.width)
+        if rr1 <= rr0 or cc1 <= cc0:
+            return out
+        # Unpack only the bytes that hold the window's columns
+        b0, b1 = cc0 // 8, -(-cc1 // 8)
+        rows = np.unpackbits(self.bits[rr0:rr1, b0:b1], axis=1).view(bool)
+        out[rr0 - r0:rr1 - r0, cc0 - c0:cc1 - c0] = rows[:, cc0 - b0 * 8:cc1 - b0 * 8]
+        return out
+
+
+def compute_mask(ds, stats=None):
+    """Build the validity mask of an open dataset in one block-wise pass.
+    With stats (one BandStats per band), each band's valid pixels are
+    accumulated from the same block reads."""
+    bits = np.zeros((ds.height, -(-ds.width // 8)), dtype=np.uint8)
+    full = np.zeros((0, ds.width), dtype=bool)
+    for window in iter_block_windows(ds):
+        data = ds.read(window=window)
+        valid = block_validity(data, ds.nodata)
+        if stats is not None:
+            for st, band in zip(stats, data):
+                st.update(band, valid)
+        r0, c0 = int(window.row_off), int(window.col_off)
+        h, w = valid.shape
+        if c0 == 0 and w == ds.width:
+            bits[r0:r0 + h] = np.packbits(valid, axis=1)
+            continue
+        # Tiled rasters: collect a full-width row of blocks, then pack it
+        if full.shape[0] != h:
+            full = np.zeros((h, ds.width), dtype=bool)
+        full[:, c0:c0 + w] = valid
+        if c0 + w == ds.width:
+            bits[r0:r0 + h] = np.packbits(full, axis=1)
+    return ValidityMask(bits, ds.width, ds.height)
+
+
+def mask_path(path):
+    """Sidecar path for a raster: next to it, or in MASK_CACHE_DIR if not writable."""
+    path = os.path.abspath(path)
+    if os.access(os.path.dirname(path), os.W_OK):
+        return path + MASK_SUFFIX
+    digest = hashlib.sha1(path.encode()).hexdigest()[:16]
+    return os.path.join(MASK_CACHE_DIR, f"{os.path.basename(path)}.{digest}{MASK_SUFFIX}")
+
+
+def _signature(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _read_sidecar(sidecar, signature):
+    try:
+        with np.load(sidecar) as z:
+            if (int(z["size"]), int(z["mtime_ns"])) != signature:
+                return None
+            return ValidityMask(z["bits"], int(z["width"]), int(z["height"]))
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _write_sidecar(sidecar, mask, signature):
+    os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+    # Unique per writer: threads and processes may save the same mask at once
+    tmp = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+    np.savez(tmp, bits=mask.bits, width=mask.width, height=mask.height,
+             size=signature[0], mtime_ns=signature[1])
+    os.replace(tmp, sidecar)
+
+
+_loaded = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def cached_mask(path):
+    """The raster's mask from memory or its sidecar, or None if neither is current."""
+    path = os.path.abspath(path)
+    signature = _signature(path)
+    with _loaded_lock:
+        entry = _loaded.get(path)
+        if entry and entry[0] == signature:
+            _loaded.move_to_end(path)
+            return entry[1]
+    mask = _read_sidecar(mask_path(path), signature)
+    if mask is not None:
+        _remember(path, signature, mask)
+    return mask
+
+
+def save_mask(path, mask, signature=None, save=True):
+    """Keep a freshly computed mask in memory and (with save) in its sidecar.
+    signature is the raster's (size, mtime_ns) from before it was read."""
+    path = os.path.abspath(path)
+    signature = signature or _signature(path)
+    if save:
+        try:
+            _write_sidecar(mask_path(path), mask, signature)
+        except OSError:
+            pass  # read-only medium: keep the in-memory copy only
+    _remember(path, signature, mask)
+
+
+def _remember(path, signature, mask):
+    with _loaded_lock:
+        _loaded[path] = (signature, mask)
+        while len(_loaded) > MAX_LOADED_MASKS:
+            _loaded.popitem(last=False)
+
+
+def load_mask(path, save=True):
+    """Validity mask of a raster: from memory, from its sidecar, or computed
+    (and saved) when neither is current."""
+    mask = cached_mask(path)
+    if mask is None:
+        signature = _signature(path)
+        with rasterio.open(path) as ds:
+            mask = compute_mask(ds)
+        save_mask(path, mask, signature, save=save)
+    return mask
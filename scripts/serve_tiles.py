@@ -0,0 +1,112 @@
+"""
+Serve the 10m vs 1m comparison of every SR product in the catalog as XYZ
+tiles rendered on demand, so any AOI can be browsed at full 1m detail
+without building comparison.html or a tile pyramid first.
+Each _TCI product (with its _IRP / _NDVI siblings) is paired with the
+original 10 m stack that overlaps it closest in date, unless --original is
+given.
+Run: python serve_tiles.py
+     python serve_tiles.py ~/s2dr4_output Data --port 8080 --cache-dir ~/.cache/s2dr4_tiles
+"""
+import os
+import sys
+import argparse
+import webbrowser
+
+from raster_catalog import CATALOG_PATH, RasterCatalog
+from render_assets import sr_products
+from s2dr4_tools import JPEG_QUALITY
+from s2dr4_tools.image_codecs import CODECS, check_codec
+from s2dr4_tools.stretch import StretchCache
+from tile_server import (MAX_IDLE_DATASETS, TILE_CACHE_BYTES, DatasetPool, TileCache, TileServer,
+                         TileSource, match_original)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE = os.path.dirname(SCRIPT_DIR)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="On-demand tile server for the comparison viewer.")
+    parser.add_argument("inputs", nargs="*", default=[BASE],
+                        help="directories with SR products and original stacks (default: %(default)s)")
+    parser.add_argument("--original", help="original 10 m stack for every product "
+                                           "(default: matched from the catalog)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--codec", choices=sorted(CODECS), default="jpeg")
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY)
+    parser.add_argument("--stretch", metavar="JSON", help="shared per-band stretch cut points")
+    parser.add_argument("--cache-mb", type=int, default=TILE_CACHE_BYTES >> 20,
+                        help="in-memory tile cache size (default: %(default)s MB)")
+    parser.add_argument("--cache-dir", help="also keep rendered tiles on disk here")
+    parser.add_argument("--max-open", type=int, default=MAX_IDLE_DATASETS,
+                        help="idle dataset handles kept open (default: %(default)s)")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="raster catalog (default: %(default)s)")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    parser.add_argument("--no-browser", action="store_true",
+                        help="do not open the index in the default browser")
+    args = parser.parse_args(argv)
+    try:
+        check_codec(args.codec)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print("=" * 60)
+    print("Comparison tile server")
+    print("=" * 60)
+
+    with RasterCatalog(args.catalog) as catalog:
+        catalog.refresh(args.inputs, stats=False)
+        products = catalog.query(product="TCI", under=args.inputs)
+        originals = [] if args.original else catalog.query(under=args.inputs)
+
+    pool = DatasetPool(max_idle=args.max_open)
+    stretch = StretchCache.load(args.stretch) if args.stretch else None
+    sources = []
+    for rec in products:
+        name = os.path.basename(rec["path"])[:-len("_TCI.tif")]
+        if args.original:
+            orig_path, orig_date = args.original, None
+        else:
+            orig = match_original(rec, originals)
+            if orig is None:
+                print(f"  {name}: no overlapping original stack, skipped")
+                continue
+            orig_path, orig_date = orig["path"], orig["date"]
+        dates = " / ".join(d for d in (orig_date, rec["date"]) if d)
+        sources.append(TileSource(name, orig_path, sr_products(rec["path"]), pool, codec=args.codec,
+                                  quality=args.quality, stretch=stretch, dates=dates))
+        print(f"  {name}: {sources[-1].width} x {sources[-1].height} px, zoom 0-{sources[-1].max_zoom}")
+        print(f"    original: {orig_path}")
+    if not sources:
+        print("No _TCI products found")
+        sys.exit(1)
+
+    try:
+        server = TileServer((args.host, args.port), sources, pool,
+                            cache=TileCache(args.cache_mb << 20, args.cache_dir), verbose=args.verbose)
+    except OSError as e:
+        print(f"  ERROR: cannot listen on {args.host}:{args.port}: {e}")
+        sys.exit(1)
+    url = f"http://{args.host}:{server.server_address[1]}/"
+    print(f"\n  Serving {len(sources)} AOI(s) at {url}")
+    if args.cache_dir:
+        print(f"  Disk tile cache: {args.cache_dir}")
+    print("  Ctrl+C to stop")
+    print("=" * 60)
+    if not args.no_browser:
+        webbrowser.open(url if len(sources) > 1 else f"{url}{sources[0].name}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
+        stats = server.stats()
+        print(f"\n  {stats['rendered']} tiles rendered, {stats['cache']['hits']} memory hits, "
+              f"{stats['cache']['disk_hits']} disk hits, {stats['shared']} shared")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Stack S2DR4 runs of one AOI into a time-series cube and query it.
+append adds every date found under the inputs that the cube does not hold
+yet (only those dates are read); profile prints a pixel's or a bbox's values
+over time; rolling writes a rolling temporal statistic as a tiled GeoTIFF.
+Run: python sr_timeseries.py append cubes/khartoum ~/s2dr4_output
+     python sr_timeseries.py profile cubes/khartoum --lonlat 32.53 15.59 --band NDVI
+     python sr_timeseries.py rolling cubes/khartoum --band NDVI --size 3 --stat mean
+"""
+import os
+import sys
+import time
+import argparse
+from collections import defaultdict
+
+import numpy as np
+import rasterio
+from rasterio.errors import WindowError
+from rasterio.warp import transform as transform_coords
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, from_bounds
+
+from raster_catalog import CATALOG_PATH, RasterCatalog
+from timeseries import (CUBE_CHUNK, CUBE_WORKERS, NDVI_BAND, ROLLING_STATS, TimeSeriesCube,
+                        iso_date)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-date SR time-series cube.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("append", help="add new dates from SR output folders")
+    p.add_argument("cube", help="cube directory (created on first append)")
+    p.add_argument("inputs", nargs="+", help="directories holding S2L3Ax10_*_MS.tif products")
+    p.add_argument("--date", nargs="+", help="only these dates (YYYYMMDD)")
+    p.add_argument("--chunk", type=int, default=CUBE_CHUNK, help="chunk size in px for a new cube")
+    p.add_argument("--workers", type=int, default=CUBE_WORKERS)
+    p.add_argument("--overwrite", action="store_true", help="re-read dates already in the cube")
+    p.add_argument("--catalog", default=CATALOG_PATH, help="raster catalog (default: %(default)s)")
+
+    p = commands.add_parser("info", help="grid, bands and dates of a cube")
+    p.add_argument("cube")
+
+    p = commands.add_parser("profile", help="values of a pixel or bbox over time")
+    p.add_argument("cube")
+    where = p.add_mutually_exclusive_group(required=True)
+    where.add_argument("--lonlat", type=float, nargs=2, metavar=("LON", "LAT"))
+    where.add_argument("--xy", type=float, nargs=2, metavar=("X", "Y"), help="point in the cube CRS")
+    where.add_argument("--bbox", type=float, nargs=4, metavar=("LON_MIN", "LAT_MIN", "LON_MAX", "LAT_MAX"),
+                       help="statistic over a field instead of one pixel")
+    p.add_argument("--band", nargs="+", default=[NDVI_BAND])
+    p.add_argument("--stat", choices=sorted(ROLLING_STATS), default="mean", help="with --bbox")
+
+    p = commands.add_parser("rolling", help="rolling temporal statistic as a GeoTIFF")
+    p.add_argument("cube")
+    p.add_argument("--band", default=NDVI_BAND)
+    p.add_argument("--size", type=int, default=3, help="dates per window")
+    p.add_argument("--stat", choices=sorted(ROLLING_STATS), default="mean")
+    p.add_argument("--output", help="default: <cube>/rolling_<stat><size>_<band>.tif")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+
+    if args.command == "append":
+        with RasterCatalog(args.catalog) as catalog:
+            catalog.refresh(args.inputs, stats=False)
+            rows = catalog.query(product=["MS", "NDVI"], under=args.inputs)
+        by_date = defaultdict(lambda: {"MS": [], "NDVI": []})
+        for r in rows:
+            if r["date"]:
+                by_date[r["date"]][r["product"]].append(r["path"])
+        try:
+            wanted = {iso_date(d) for d in args.date} if args.date else None
+        except ValueError as e:
+            parser.error(str(e))
+        dates = sorted(d for d, products in by_date.items()
+                       if products["MS"] and (wanted is None or d in wanted))
+        if not dates:
+            print("No _MS products found")
+            sys.exit(1)
+
+        cube = TimeSeriesCube.for_products(args.cube, by_date[dates[0]]["MS"], chunk=args.chunk)
+        print(f"Time-series cube: {args.cube}")
+        print(f"  {cube.width} x {cube.height} px, {len(cube.bands)} bands, "
+              f"{len(cube.dates)} dates stored")
+        print("=" * 60)
+        added = 0
+        for date in dates:
+            products = by_date[date]
+            t0 = time.perf_counter()
+            if cube.append(date, products["MS"], products["NDVI"], workers=args.workers,
+                           overwrite=args.overwrite):
+                added += 1
+                print(f"  {date}: {len(products['MS'])} _MS product(s) appended in "
+                      f"{time.perf_counter() - t0:.1f} s")
+            else:
+                print(f"  {date}: already stored")
+        print(f"\n  {added} date(s) added, {len(cube.dates)} in the cube")
+
+    elif args.command == "info":
+        cube = TimeSeriesCube(args.cube)
+        print(f"Time-series cube: {args.cube}")
+        print("=" * 60)
+        res = abs(cube.transform.a)
+        print(f"  Grid:  {cube.width} x {cube.height} px at {res:g} m, {cube.crs.to_string()}")
+        print(f"  Chunk: {cube.chunk} x {cube.chunk} px")
+        print(f"  Bands: {', '.join(cube.bands)}")
+        print(f"  Dates: {len(cube.dates)}")
+        for date in cube.dates:
+            sources = cube.meta["dates"][date]["sources"]
+            print(f"    {date}  {len(sources)} product(s)")
+
+    elif args.command == "profile":
+        cube = TimeSeriesCube(args.cube)
+        print(f"Time-series cube: {args.cube}")
+        print("=" * 60)
+        try:
+            if args.bbox:
+                bounds = transform_bounds("EPSG:4326", cube.crs, *args.bbox)
+                window = from_bounds(*bounds, transform=cube.transform).round_offsets().round_lengths()
+                window = window.intersection(Window(0, 0, cube.width, cube.height))
+                print(f"  {args.stat} over {window.width} x {window.height} px")
+                values = np.stack([cube.region(window, band, args.stat) for band in args.band], axis=1)
+            else:
+                x, y = args.xy or [v[0] for v in transform_coords("EPSG:4326", cube.crs,
+                                                                  [args.lonlat[0]], [args.lonlat[1]])]
+                row, col = cube.index(x, y)
+                print(f"  Pixel row {row}, col {col}")
+                values = cube.pixel(x, y, args.band)
+        except (ValueError, WindowError) as e:
+            parser.error(str(e))
+        print(f"\n  {'Date':<10} " + " ".join(f"{b:>9}" for b in args.band))
+        for date, row_values in zip(cube.dates, values):
+            print(f"  {date:<10} " + " ".join(f"{v:>9.4f}" for v in row_values))
+
+    elif args.command == "rolling":
+        cube = TimeSeriesCube(args.cube)
+        output = args.output or os.path.join(args.cube, f"rolling_{args.stat}{args.size}_{args.band}.tif")
+        print(f"Rolling {args.stat} of {args.band} over {args.size} dates: {output}")
+        print("=" * 60)
+        if args.band not in cube.bands:
+            parser.error(f"unknown band {args.band}; the cube has {', '.join(cube.bands)}")
+        if not 1 <= args.size <= len(cube.dates):
+            parser.error(f"--size must be 1..{len(cube.dates)} for this cube")
+        ends = cube.dates[args.size - 1:]
+        profile = {"driver": "GTiff", "width": cube.width, "height": cube.height, "count": len(ends),
+                   "dtype": "float32", "crs": cube.crs, "transform": cube.transform, "nodata": np.nan,
+                   "tiled": True, "blockxsize": 256, "blockysize": 256, "compress": "deflate",
+                   "predictor": 3, "BIGTIFF": "IF_SAFER"}
+        t0 = time.perf_counter()
+        with rasterio.open(output, "w", **profile) as dst:
+            for i, date in enumerate(ends, start=1):
+                dst.set_band_description(i, f"{args.stat}{args.size} to {date}")
+            for window, result in cube.rolling(args.band, args.size, args.stat):
+                dst.write(result, window=window)
+                print(f"\r  Rows: {int(window.row_off + window.height)}/{cube.height}", end="")
+        print(f"\n  {len(ends)} band(s), {time.perf_counter() - t0:.1f} s")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Deterministic synthetic scenes in the same layout as the real data:
+a 10-band float32 Sentinel-2 stack at 10 m with NaN borders (Data/), and the
+S2DR4 _MS (10-band float32) and _TCI / _IRP / _NDVI (3-band uint8) products
+at 1 m (S2DR4_Khartoum_1m/...), all in UTM 36N. The same seed always gives
+byte-identical rasters, so benchmark runs are comparable over time.
+"""
+import os
+
+import numpy as np
+import rasterio
+from PIL import Image
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+from s2dr4_tools.colormap import NDVI_COLORMAP
+from s2dr4_tools.stretch import apply_stretch
+
+CRS = "EPSG:32636"
+ORIGIN = (451000.0, 1715500.0)
+BANDS = ("B2", "B3", "B4", "B5", "B6", "B7", "B8", "B8A", "B11", "B12")
+ORIG_NAME = os.path.join("Data", "S2_Khartoum_khartoum_center_20260204_10bands.tif")
+SR_DIR = os.path.join("S2DR4_Khartoum_1m", "SD", "T36PVC", "T36PVC-9a3aee44d")
+SR_NAME = "S2L3Ax10_T36PVC-9a3aee44d-20260131_{}.tif"
+FEATURE_M = 64
+ORIG_MARGIN_M = 300
+NAN_BORDER_PX = 8
+
+# Reflectance per band: base + vegetation * a + soil * b (roughly Khartoum-like:
+# bright soil and built-up, sparse vegetation along the Nile)
+_SPECTRA = {
+    "B2": (0.08, -0.03, 0.10), "B3": (0.10, -0.01, 0.13), "B4": (0.12, -0.08, 0.18),
+    "B5": (0.15, -0.02, 0.20), "B6": (0.18, 0.12, 0.20), "B7": (0.19, 0.18, 0.21),
+    "B8": (0.20, 0.25, 0.21), "B8A": (0.21, 0.24, 0.22), "B11": (0.28, -0.10, 0.15),
+    "B12": (0.22, -0.12, 0.12),
+}
+
+
+def _latent_fields(extent_m, seed):
+    """Low-resolution vegetation/soil fields over the extent (one value per FEATURE_M)."""
+    rng = np.random.default_rng(seed)
+    n = int(np.ceil(extent_m / FEATURE_M)) + 2
+    veg = np.clip(rng.normal(0.0, 1.0, (n, n)), 0, None).astype(np.float32) ** 2 / 4
+    soil = rng.random((n, n), dtype=np.float32)
+    return np.clip(veg, 0, 1), soil
+
+
+def _sample(field, x0, y0, width, height, res):
+    """Bilinear sample of a latent field on a width x height grid at (x0, y0), res m."""
+    n = field.shape[0]
+    # Crop the field cells under the grid, then let PIL interpolate
+    c0, r0 = int(x0 // FEATURE_M), int(y0 // FEATURE_M)
+    c1 = min(n, int(np.ceil((x0 + width * res) / FEATURE_M)) + 1)
+    r1 = min(n, int(np.ceil((y0 + height * res) / FEATURE_M)) + 1)
+    img = Image.fromarray(np.ascontiguousarray(field[r0:r1, c0:c1]))
+    box = ((x0 - c0 * FEATURE_M) / FEATURE_M, (y0 - r0 * FEATURE_M) / FEATURE_M,
+           (x0 + width * res - c0 * FEATURE_M) / FEATURE_M,
+           (y0 + height * res - r0 * FEATURE_M) / FEATURE_M)
+    return np.asarray(img.resize((width, height), Image.BILINEAR, box=box))
+
+
+def _bands(fields, x0, y0, width, height, res, seed):
+    veg = _sample(fields[0], x0, y0, width, height, res)
+    soil = _sample(fields[1], x0, y0, width, height, res)
+    rng = np.random.default_rng(seed)
+    for name in BANDS:
+        base, a, b = _SPECTRA[name]
+        band = base + a * veg + b * soil
+        band += rng.normal(0, 0.01, band.shape).astype(np.float32)
+        yield name, np.clip(band, 0.001, 1).astype(np.float32)
+
+
+def _profile(width, height, count, dtype, transform):
+    return {"driver": "GTiff", "width": width, "height": height, "count": count,
+            "dtype": dtype, "crs": CRS, "transform": transform, "tiled": True,
+            "blockxsize": 256, "blockysize": 256, "compress": "DEFLATE"}
+
+
+def make_scene(root, size_km=1.0, seed=0, products=("MS", "TCI", "IRP", "NDVI")):
+    """Write a synthetic scene whose SR extent is size_km x size_km under root.
+    Returns {"orig": path, "MS": path, "TCI": path, ...}. Existing files are kept,
+    so a scene is generated once per (root, size, seed)."""
+    sr_px = int(round(size_km * 1000))
+    extent_m = sr_px + 2 * ORIG_MARGIN_M
+    fields = _latent_fields(extent_m, seed)
+    paths = {"orig": os.path.join(root, ORIG_NAME)}
+    paths.update({p: os.path.join(root, SR_DIR, SR_NAME.format(p)) for p in products})
+    if all(os.path.exists(p) for p in paths.values()):
+        return paths
+
+    # Original 10 m stack: SR extent plus a margin, NaN rows/cols at the swath edges
+    ow = oh = extent_m // 10
+    os.makedirs(os.path.dirname(paths["orig"]), exist_ok=True)
+    with rasterio.open(paths["orig"], "w", **_profile(
+            ow, oh, len(BANDS), "float32", from_origin(*ORIGIN, 10, 10))) as dst:
+        for i, (name, band) in enumerate(_bands(fields, 0, 0, ow, oh, 10, seed), 1):
+            band[:NAN_BORDER_PX] = np.nan
+            band[:, -NAN_BORDER_PX:] = np.nan
+            dst.write(band, i)
+            dst.set_band_description(i, name)
+
+    # SR products at 1 m, written in row strips so large scenes stay in memory bounds
+    os.makedirs(os.path.join(root, SR_DIR), exist_ok=True)
+    sr_transform = from_origin(ORIGIN[0] + ORIG_MARGIN_M, ORIGIN[1] - ORIG_MARGIN_M, 1, 1)
+    counts = {"MS": (len(BANDS), "float32"), "TCI": (3, "uint8"), "IRP": (3, "uint8"),
+              "NDVI": (3, "uint8")}
+    outputs = {p: rasterio.open(paths[p], "w", **_profile(sr_px, sr_px, *counts[p], sr_transform))
+               for p in products}
+    try:
+        if "MS" in outputs:
+            for i, name in enumerate(BANDS, 1):
+                outputs["MS"].set_band_description(i, name)
+        strip = 512
+        for row in range(0, sr_px, strip):
+            rows = min(strip, sr_px - row)
+            window = Window(0, row, sr_px, rows)
+            bands = dict(_bands(fields, ORIG_MARGIN_M, ORIG_MARGIN_M + row,
+                                sr_px, rows, 1, seed + row + 1))
+            if "MS" in outputs:
+                outputs["MS"].write(np.stack([bands[n] for n in BANDS]), window=window)
+            for product, names in (("TCI", ("B4", "B3", "B2")), ("IRP", ("B8", "B4", "B3"))):
+                if product in outputs:
+                    outputs[product].write(np.stack([apply_stretch(bands[n], (0.0, 0.4))
+                                                     for n in names]), window=window)
+            if "NDVI" in outputs:
+                ndvi = (bands["B8"] - bands["B4"]) / (bands["B8"] + bands["B4"])
+                outputs["NDVI"].write(np.moveaxis(NDVI_COLORMAP.apply(ndvi), -1, 0),
+                                      window=window)
+    finally:
+        for dst in outputs.values():
+            dst.close()
+    return paths
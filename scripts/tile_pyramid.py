@@ -0,0 +1,129 @@
+"""
+Multi-level tile pyramid writer for the 10m vs 1m comparison viewer.
+Cuts an image into 256 px tiles in an XYZ layout (<out>/<z>/<x>/<y>.<ext>).
+Level max_zoom is full resolution; each lower level is a 2x2 box average of
+the previous one, down to level 0 which fits in a single tile. Images can be
+streamed in as row strips, so the full-resolution image never has to exist.
+"""
+import math
+import os
+
+import numpy as np
+from PIL import Image
+
+from s2dr4_tools.image_codecs import CODECS, save_image
+
+TILE_SIZE = 256
+
+
+def max_zoom_for(width, height, tile_size=TILE_SIZE):
+    """Number of halvings needed until the whole image fits in one tile."""
+    return max(0, math.ceil(math.log2(max(width, height) / tile_size)))
+
+
+def level_size(width, height, max_zoom, z):
+    """Pixel size of zoom level z (ceil division keeps edge pixels)."""
+    k = 2 ** (max_zoom - z)
+    return -(-width // k), -(-height // k)
+
+
+def _reduce2(rows):
+    """2x2 box average of an (H, W, C) uint8 array; odd edges average what exists."""
+    a = rows.astype(np.uint16)
+    if a.shape[0] % 2:
+        a = np.concatenate([a, a[-1:]])
+    if a.shape[1] % 2:
+        a = np.concatenate([a, a[:, -1:]], axis=1)
+    total = a[0::2, 0::2] + a[1::2, 0::2] + a[0::2, 1::2] + a[1::2, 1::2]
+    return ((total + 2) // 4).astype(np.uint8)
+
+
+class PyramidWriter:
+    """Streaming pyramid writer: feed full-width (rows, width, 3) uint8 strips
+    top to bottom, then close().
+
+    A level writes a row of tiles as soon as it has tile_size rows and hands a
+    2x2 box-reduced copy to the next level down, so only about one tile row
+    per level is ever held in memory, whatever the image size.
+    """
+
+    def __init__(self, out_dir, width, height, tile_size=TILE_SIZE, quality=88, codec="jpeg"):
+        self.out_dir = out_dir
+        self.width, self.height = width, height
+        self.tile_size = tile_size
+        self.quality, self.codec = quality, codec
+        self.max_zoom = max_zoom_for(width, height, tile_size)
+        self.tiles = 0
+        self.bytes = 0
+        self._levels = [{"z": z, "size": level_size(width, height, self.max_zoom, z),
+                         "buf": [], "buf_rows": 0, "row": 0, "carry": None, "received": 0}
+                        for z in range(self.max_zoom, -1, -1)]
+
+    def write(self, strip):
+        self._push(0, np.asarray(strip))
+
+    def _push(self, i, rows):
+        level = self._levels[i]
+        lw, lh = level["size"]
+        level["received"] += len(rows)
+        last = level["received"] >= lh
+        level["buf"].append(rows)
+        level["buf_rows"] += len(rows)
+        while level["buf_rows"] >= self.tile_size or (last and level["buf_rows"]):
+            block = np.concatenate(level["buf"]) if len(level["buf"]) > 1 else level["buf"][0]
+            n = min(self.tile_size, len(block))
+            self._write_tile_row(level, block[:n])
+            rest = block[n:]
+            level["buf"], level["buf_rows"] = ([rest], len(rest)) if len(rest) else ([], 0)
+
+        if i + 1 < len(self._levels):
+            # Rows pair up for the 2x2 reduction; an odd row waits for its partner
+            if level["carry"] is not None:
+                rows = np.concatenate([level["carry"], rows])
+                level["carry"] = None
+            if len(rows) % 2 and not last:
+                rows, level["carry"] = rows[:-1], rows[-1:]
+            if len(rows):
+                self._push(i + 1, _reduce2(rows))
+
+    def _write_tile_row(self, level, block):
+        z, (lw, _), ts = level["z"], level["size"], self.tile_size
+        y = level["row"] // ts
+        ext = CODECS[self.codec][2]
+        for x in range(-(-lw // ts)):
+            col_dir = os.path.join(self.out_dir, str(z), str(x))
+            os.makedirs(col_dir, exist_ok=True)
+            tile_path = os.path.join(col_dir, f"{y}.{ext}")
+            save_image(Image.fromarray(block[:, x * ts:(x + 1) * ts]), tile_path,
+                       self.codec, self.quality)
+            self.tiles += 1
+            self.bytes += os.path.getsize(tile_path)
+        level["row"] += len(block)
+
+    def close(self):
+        """Check every level is complete; returns the pyramid metadata the
+        viewer needs to address tiles."""
+        for level in self._levels:
+            if level["row"] != level["size"][1]:
+                raise ValueError(f"zoom {level['z']}: got {level['row']} of "
+                                 f"{level['size'][1]} rows")
+        return {
+            "width": self.width,
+            "height": self.height,
+            "tile_size": self.tile_size,
+            "max_zoom": self.max_zoom,
+            "format": CODECS[self.codec][2],
+            "tiles": self.tiles,
+            "bytes": self.bytes,
+        }
+
+
+def write_pyramid(img, out_dir, tile_size=TILE_SIZE, quality=88, codec="jpeg"):
+    """Write every zoom level of a PIL image (or (H, W, 3) uint8 array) as
+    tiles under out_dir. Edge tiles are cropped, not padded. Returns the
+    pyramid metadata the viewer needs to address tiles.
+    """
+    arr = np.asarray(img)
+    writer = PyramidWriter(out_dir, arr.shape[1], arr.shape[0], tile_size, quality, codec)
+    writer.write(arr)
+    return writer.close()
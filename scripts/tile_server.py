@@ -0,0 +1,399 @@
+"""
+On-demand XYZ tiles of the comparison layers, served over HTTP.
+Tiles use the tile_pyramid.py layout (256 px, level max_zoom is the full SR
+resolution, <layer>/<z>/<x>/<y>.<ext>) but each one is composited from the
+GeoTIFFs by s2dr4_tools.CompositeBuilder when first requested, with the
+stretch and NDVI colormap of create_comparison.py. Encoded tiles are kept in
+a byte-bounded in-memory LRU, optionally backed by a directory that outlives
+the server; concurrent requests for one tile render it once, and open
+dataset handles are pooled across requests.
+"""
+import hashlib
+import html
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+import rasterio
+from PIL import Image
+
+from s2dr4_tools import (FALLBACK_BANDS, JPEG_QUALITY, LAYERS, MAX_DIM, CompositeBuilder,
+                         find_rgbn, get_info)
+from s2dr4_tools.image_codecs import CODECS, save_image
+from s2dr4_tools.stretch import StretchCache
+from tile_pyramid import TILE_SIZE, level_size, max_zoom_for
+from viewer_page import comparison_page, tiled_viewer
+
+TILE_CACHE_BYTES = 256 << 20
+MAX_IDLE_DATASETS = 64
+TILE_MAX_AGE = 3600
+
+TILE_PATH = re.compile(r"^/(?P<aoi>[^/]+)/(?P<layer>\w+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.(?P<ext>\w+)$")
+
+
+class DatasetPool:
+    """Open rasterio datasets reused across requests.
+
+    A handle serves one thread at a time (GDAL handles are not thread-safe):
+    dataset(path) checks out an idle handle of path, opening a new one only
+    when all of them are busy, and returns it on exit. At most max_idle idle
+    handles stay open, the least recently used closed first.
+    """
+
+    def __init__(self, max_idle=MAX_IDLE_DATASETS):
+        self.max_idle = max_idle
+        self.opened = 0
+        self._idle = OrderedDict()  # id(ds) -> (path, ds)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def dataset(self, path):
+        path = os.path.abspath(path)
+        ds = None
+        with self._lock:
+            for key, (idle_path, _) in reversed(self._idle.items()):
+                if idle_path == path:
+                    ds = self._idle.pop(key)[1]
+                    break
+        if ds is None:
+            ds = rasterio.open(path)
+            with self._lock:
+                self.opened += 1
+        try:
+            yield ds
+        finally:
+            with self._lock:
+                self._idle[id(ds)] = (path, ds)
+                while len(self._idle) > self.max_idle:
+                    self._idle.popitem(last=False)[1][1].close()
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def close(self):
+        with self._lock:
+            for _, ds in self._idle.values():
+                ds.close()
+            self._idle.clear()
+
+
+class TileCache:
+    """LRU of encoded tiles bounded by their total bytes. With cache_dir, tiles
+    are also written to <cache_dir>/<source key>/<layer>/<z>/<x>/<y>.<ext> and
+    read back from there after an eviction or a restart."""
+
+    def __init__(self, max_bytes=TILE_CACHE_BYTES, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.bytes = 0
+        self.hits = self.disk_hits = self.misses = 0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        source, layer, z, x, y, ext = key
+        return os.path.join(self.cache_dir, source, layer, str(z), str(x), f"{y}.{ext}")
+
+    def get(self, key):
+        """(tile bytes, "memory" / "disk") or (None, None)."""
+        with self._lock:
+            data = self._tiles.get(key)
+            if data is not None:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return data, "memory"
+        if self.cache_dir:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+            except OSError:
+                pass
+            else:
+                self._remember(key, data)
+                with self._lock:
+                    self.disk_hits += 1
+                return data, "disk"
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def put(self, key, data):
+        self._remember(key, data)
+        if self.cache_dir:
+            path = self._path(key)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError:
+                pass  # full or read-only disk: keep the in-memory copy only
+
+    def _remember(self, key, data):
+        with self._lock:
+            old = self._tiles.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._tiles[key] = data
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes and len(self._tiles) > 1:
+                self.bytes -= len(self._tiles.popitem(last=False)[1])
+
+    def stats(self):
+        with self._lock:
+            return {"tiles": len(self._tiles), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+
+def match_original(product, candidates):
+    """The original stack for an SR product record among catalog records:
+    an intersecting non-S2DR4 raster with B2/B3/B4/B8, closest in date, then
+    largest overlap. None if there is none."""
+    def overlap(r):
+        w = min(r["max_lon"], product["max_lon"]) - max(r["min_lon"], product["min_lon"])
+        h = min(r["max_lat"], product["max_lat"]) - max(r["min_lat"], product["min_lat"])
+        return max(w, 0) * max(h, 0)
+
+    def days(r):
+        if not (r["date"] and product["date"]):
+            return float("inf")
+        return abs((np.datetime64(r["date"]) - np.datetime64(product["date"])).astype(int))
+
+    found = [r for r in candidates
+             if r["product"] is None and r["min_lon"] is not None and overlap(r) > 0
+             and find_rgbn(r["descriptions"] or []) is not None]
+    return min(found, key=lambda r: (days(r), -overlap(r)), default=None)
+
+
+class TileSource:
+    """The comparison layers of one SR product (sr_layers: "rgb_sr" /
+    "fc_sr" / "ndvi_sr" -> GeoTIFF, rgb_sr required) and its original 10 m
+    stack, tiled over the full SR grid."""
+
+    def __init__(self, name, orig_path, sr_layers, pool, codec="jpeg", quality=JPEG_QUALITY,
+                 stretch=None, dates=None):
+        self.name = name
+        self.orig_path = orig_path
+        self.sr_layers = sr_layers
+        self.pool = pool
+        self.codec, self.quality = codec, quality
+        self.ext = CODECS[codec][2]
+        self.dates = dates
+        self.bounds, self.crs, self.pixel_size_sr, self.width, self.height = \
+            get_info(sr_layers["rgb_sr"])
+        _, _, self.pixel_size_orig, _, _ = get_info(orig_path)
+        with rasterio.open(orig_path) as ds:
+            self.bands = find_rgbn(ds.descriptions) or FALLBACK_BANDS
+        self.max_zoom = max_zoom_for(self.width, self.height)
+        self.layers = [layer for layer in LAYERS
+                       if layer.endswith("_orig") or layer in sr_layers]
+        self.stretch = stretch or StretchCache()
+        self._fitted = False
+        self._fit_lock = threading.Lock()
+
+        # Cached tiles are only valid for these exact inputs
+        h = hashlib.sha1()
+        for path in [orig_path, *sorted(sr_layers.values())]:
+            st = os.stat(path)
+            h.update(f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}\n".encode())
+        h.update(f"{codec}|{quality}|{sorted(self.stretch.shared.items())}".encode())
+        self.key = f"{name}-{h.hexdigest()[:12]}"
+
+    @property
+    def pyramid(self):
+        return {"width": self.width, "height": self.height, "tile_size": TILE_SIZE,
+                "max_zoom": self.max_zoom, "format": self.ext}
+
+    def info(self):
+        return {"name": self.name, "original": self.orig_path, "sr": self.sr_layers,
+                "layers": self.layers, "dates": self.dates, "crs": self.crs.to_string(),
+                "bounds": list(self.bounds), **self.pyramid}
+
+    def fit_stretch(self):
+        """Fit the original's cut points once, on a display-size view of the
+        whole SR extent as create_comparison.py does, so every tile matches."""
+        with self._fit_lock:
+            if self._fitted:
+                return
+            scale = min(1.0, MAX_DIM / max(self.width, self.height))
+            self._builder(self.width, self.height).fit_stretch(int(self.width * scale),
+                                                               int(self.height * scale))
+            self._fitted = True
+
+    def _builder(self, width, height):
+        return CompositeBuilder(self.orig_path, self.sr_layers, self.bounds, self.crs, width,
+                                height, bands=self.bands, stretch=self.stretch,
+                                opener=self.pool.dataset)
+
+    def render(self, layer, z, x, y):
+        """Encoded tile bytes; KeyError for a tile outside the pyramid."""
+        if layer not in self.layers or not 0 <= z <= self.max_zoom:
+            raise KeyError(layer, z)
+        lw, lh = level_size(self.width, self.height, self.max_zoom, z)
+        col0, row0 = x * TILE_SIZE, y * TILE_SIZE
+        if col0 >= lw or row0 >= lh:
+            raise KeyError(z, x, y)
+        cols, rows = (col0, min(col0 + TILE_SIZE, lw)), (row0, min(row0 + TILE_SIZE, lh))
+        self.fit_stretch()
+        tile = np.empty((rows[1] - rows[0], cols[1] - cols[0], 3), dtype=np.uint8)
+        self._builder(lw, lh).build({layer: tile}, rows=rows, cols=cols)
+        buf = io.BytesIO()
+        save_image(Image.fromarray(tile), buf, codec=self.codec, quality=self.quality)
+        return buf.getvalue()
+
+    def page(self):
+        extent_m = (f"{self.bounds.right - self.bounds.left:.0f} x "
+                    f"{self.bounds.top - self.bounds.bottom:.0f}")
+        return comparison_page(*tiled_viewer(self.pyramid), self.pixel_size_orig,
+                               self.pixel_size_sr,
+                               int(round(self.pixel_size_orig / self.pixel_size_sr)), extent_m,
+                               self.width, self.height, dates=self.dates or "-", place=self.name)
+
+
+class TileServer(ThreadingHTTPServer):
+    """HTTP server for a set of TileSources:
+    /                                 index of the AOIs
+    /<aoi>/                           tiled comparison viewer
+    /<aoi>/<layer>/<z>/<x>/<y>.<ext>  tile
+    /aois.json, /stats.json           AOI metadata, cache and render statistics
+    """
+
+    daemon_threads = True
+    request_queue_size = 128  # browsers open many tile connections at once
+
+    def __init__(self, address, sources, pool, cache=None, verbose=False):
+        super().__init__(address, TileHandler)
+        self.sources = {s.name: s for s in sources}
+        self.pool = pool
+        self.cache = cache or TileCache()
+        self.verbose = verbose
+        self.rendered = 0
+        self.render_seconds = 0.0
+        self.shared = 0
+        self._in_flight = {}  # tile key -> Future of the request serving it
+        self._flight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def tile(self, source, layer, z, x, y):
+        """(tile bytes, "memory" / "disk" / "render" / "shared"). Concurrent
+        requests for one tile are served by the first of them, which looks it
+        up or renders it once; the others wait for its result ("shared")."""
+        key = (source.key, layer, z, x, y, source.ext)
+        with self._flight_lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            data = future.result()
+            with self._stats_lock:
+                self.shared += 1
+            return data, "shared"
+
+        try:
+            data, hit = self.cache.get(key)
+            if data is None:
+                t0 = time.perf_counter()
+                data, hit = source.render(layer, z, x, y), "render"
+                with self._stats_lock:
+                    self.rendered += 1
+                    self.render_seconds += time.perf_counter() - t0
+                self.cache.put(key, data)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(data)
+        finally:
+            # Only after the put, so a later request finds the tile in the cache
+            with self._flight_lock:
+                del self._in_flight[key]
+        return data, hit
+
+    def stats(self):
+        with self._stats_lock:
+            rendered, secs, shared = self.rendered, self.render_seconds, self.shared
+        return {"cache": self.cache.stats(), "rendered": rendered, "shared": shared,
+                "mean_render_ms": 1000 * secs / rendered if rendered else None,
+                "datasets": {"opened": self.pool.opened, "idle": self.pool.idle}}
+
+
+class TileHandler(BaseHTTPRequestHandler):
+    """Routes GET requests of a TileServer."""
+
+    def do_GET(self):
+        path = unquote(urlsplit(self.path).path)
+        server = self.server
+        m = TILE_PATH.match(path)
+        if m:
+            source = server.sources.get(m["aoi"])
+            if source is None or m["ext"] != source.ext:
+                return self.send_error(404)
+            try:
+                data, hit = server.tile(source, m["layer"], int(m["z"]), int(m["x"]), int(m["y"]))
+            except KeyError:
+                return self.send_error(404)
+            except (OSError, ValueError) as e:
+                return self.send_error(500, str(e))
+            return self._send(data, CODECS[source.codec][1], max_age=TILE_MAX_AGE,
+                              headers={"X-Tile-Cache": hit})
+        if path == "/":
+            return self._send(self._index().encode(), "text/html; charset=utf-8")
+        if path == "/aois.json":
+            return self._json([s.info() for s in server.sources.values()])
+        if path == "/stats.json":
+            return self._json(server.stats())
+        name = path.strip("/")
+        if name in server.sources:
+            if not path.endswith("/"):
+                # Tile URLs in the viewer are relative to the AOI folder
+                self.send_response(301)
+                self.send_header("Location", f"/{name}/")
+                self.send_header("Content-Length", "0")
+                return self.end_headers()
+            return self._send(server.sources[name].page().encode(), "text/html; charset=utf-8")
+        self.send_error(404)
+
+    def _index(self):
+        items = "\n".join(
+            f'  <li><a href="/{html.escape(s.name)}/">{html.escape(s.name)}</a> '
+            f'<span>{s.width} &times; {s.height} px, {html.escape(s.dates or "-")}</span></li>'
+            for s in self.server.sources.values())
+        return (f'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n'
+                f'<title>S2DR4 tile server</title>\n<style>\n'
+                f"  body {{ font-family: 'Segoe UI', system-ui, sans-serif; background: #0a0e17; "
+                f"color: #e0e6f0; padding: 24px; }}\n"
+                f"  a {{ color: #6ea8ff; }} span {{ color: #5a6478; }} li {{ line-height: 1.8; }}\n"
+                f"</style>\n</head>\n<body>\n<h3>10m vs 1m comparison AOIs</h3>\n<ul>\n"
+                f"{items}\n</ul>\n</body>\n</html>\n")
+
+    def _json(self, obj):
+        self._send(json.dumps(obj, indent=1).encode(), "application/json")
+
+    def _send(self, data, content_type, max_age=0, headers=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", f"public, max-age={max_age}" if max_age else "no-cache")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the viewer dropped a tile that scrolled out of view
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
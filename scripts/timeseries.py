@@ -0,0 +1,274 @@
+"""
+Multi-date time-series cube of the S2DR4 products of one AOI.
+Every date's _MS bands plus NDVI (from B8 / B4: the _NDVI product is a
+color rendering) are placed on one fixed 1 m grid and stored as a float32
+.npy per date in chunk-major order (y chunk, x chunk, band, row, col),
+memory-mapped on access, with the date index in cube.json. Appending a
+date reads and writes only that date, a few chunk rows at a time; a
+pixel's temporal profile touches one page per band and date, and rolling
+statistics stream chunk-row strips, so no whole scene is ever loaded.
+Invalid pixels (validity.load_mask) are NaN.
+"""
+import json
+import os
+import threading
+import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import rasterio
+from affine import Affine
+from numpy.lib.format import open_memmap
+from numpy.lib.stride_tricks import sliding_window_view
+from rasterio.crs import CRS
+from rasterio.windows import Window
+
+from mosaic import union_grid
+from s2dr4_tools.grid_align import grid_map
+from s2dr4_tools.spectral import INDICES, band_names, evaluate
+from s2dr4_tools.validity import load_mask
+
+CUBE_CHUNK = 256
+CUBE_WORKERS = min(4, os.cpu_count() or 1)
+META_NAME = "cube.json"
+NDVI_BAND = "NDVI"
+
+ROLLING_STATS = {"mean": np.nanmean, "median": np.nanmedian, "min": np.nanmin,
+                 "max": np.nanmax, "std": np.nanstd}
+
+
+def iso_date(text):
+    """'20260131' or '2026-01-31' -> '2026-01-31'."""
+    try:
+        return datetime.strptime(text.replace("-", ""), "%Y%m%d").date().isoformat()
+    except ValueError:
+        raise ValueError(f"invalid date: {text!r}") from None
+
+
+class TimeSeriesCube:
+    """A (time, band, y, x) cube on disk; open an existing one with
+    TimeSeriesCube(path), start one with create() or for_products()."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_NAME), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.crs = CRS.from_wkt(self.meta["crs"])
+        self.transform = Affine(*self.meta["transform"])
+        self.width, self.height = self.meta["width"], self.meta["height"]
+        self.bands = self.meta["bands"]
+        self.chunk = self.meta["chunk"]
+        self._arrays = {}
+
+    @classmethod
+    def create(cls, path, crs, transform, width, height, bands, chunk=CUBE_CHUNK):
+        if os.path.exists(os.path.join(path, META_NAME)):
+            raise ValueError(f"{path} already holds a cube")
+        os.makedirs(os.path.join(path, "dates"), exist_ok=True)
+        meta = {"crs": crs.to_wkt(), "transform": list(transform)[:6], "width": width,
+                "height": height, "bands": list(bands), "chunk": chunk, "dates": {}}
+        _write_meta(path, meta)
+        return cls(path)
+
+    @classmethod
+    def for_products(cls, path, ms_paths, chunk=CUBE_CHUNK):
+        """Open the cube at path, or create it over the union of ms_paths with
+        their bands plus NDVI."""
+        if os.path.exists(os.path.join(path, META_NAME)):
+            return cls(path)
+        grid = union_grid(ms_paths)
+        with rasterio.open(ms_paths[0]) as ds:
+            bands = list(band_names(ds))
+        return cls.create(path, grid["crs"], grid["transform"], grid["width"], grid["height"],
+                          bands + [NDVI_BAND], chunk)
+
+    @property
+    def dates(self):
+        return sorted(self.meta["dates"])
+
+    @property
+    def grid_shape(self):
+        """(y chunks, x chunks) of every date's array."""
+        return -(-self.height // self.chunk), -(-self.width // self.chunk)
+
+    def array(self, date):
+        """Read-only memmap of one date: (y chunks, x chunks, bands, chunk, chunk)."""
+        date = iso_date(date)
+        if date not in self._arrays:
+            entry = self.meta["dates"].get(date)
+            if entry is None:
+                raise KeyError(f"{date} is not in the cube")
+            self._arrays[date] = np.load(os.path.join(self.path, entry["file"]), mmap_mode="r")
+        return self._arrays[date]
+
+    # ── Append ──
+
+    def append(self, date, ms_paths, ndvi_paths=(), workers=CUBE_WORKERS, overwrite=False):
+        """Add one date from its _MS products, e.g. the cells of a batch run;
+        where products overlap the first valid one wins. Bands are matched by
+        name. NDVI comes from single-band ndvi_paths where given, else from
+        B8 / B4. Returns False if the date is already stored."""
+        date = iso_date(date)
+        if date in self.meta["dates"] and not overwrite:
+            return False
+        sources = []
+        for path in ms_paths:
+            with rasterio.open(path) as ds:
+                names = band_names(ds)
+            sources.append((path, {i: names[b] for i, b in enumerate(self.bands) if b in names}))
+        if NDVI_BAND in self.bands:
+            for path in ndvi_paths:
+                with rasterio.open(path) as ds:
+                    if ds.count == 1:
+                        sources.append((path, {self.bands.index(NDVI_BAND): 1}))
+
+        ny, nx = self.grid_shape
+        name = os.path.join("dates", f"{date}.npy")
+        final = os.path.join(self.path, name)
+        tmp = final + ".tmp.npy"
+        out = open_memmap(tmp, mode="w+", dtype=np.float32,
+                          shape=(ny, nx, len(self.bands), self.chunk, self.chunk))
+        local = threading.local()
+        handles = []
+
+        def build_strip(iy):
+            if not hasattr(local, "ds"):
+                local.ds = {}
+                handles.append(local.ds)
+            return self._build_strip(iy, sources, local.ds)
+
+        try:
+            # Strips are written in order; at most 2 x workers are built ahead of
+            # the writer, so memory stays bounded whatever the AOI size
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                in_flight = deque()
+                for iy in range(ny):
+                    in_flight.append(pool.submit(build_strip, iy))
+                    if len(in_flight) >= 2 * workers:
+                        done = iy - len(in_flight) + 1
+                        out[done] = in_flight.popleft().result()
+                for iy in range(ny - len(in_flight), ny):
+                    out[iy] = in_flight.popleft().result()
+            out.flush()
+        finally:
+            del out
+            for opened in handles:
+                for ds in opened.values():
+                    ds.close()
+        self._arrays.pop(date, None)
+        os.replace(tmp, final)
+        self.meta["dates"][date] = {"file": name,
+                                    "sources": [os.path.abspath(p) for p, _ in sources]}
+        _write_meta(self.path, self.meta)
+        return True
+
+    def _build_strip(self, iy, sources, opened):
+        """One chunk row of a date: (x chunks, bands, chunk, chunk) float32."""
+        c, nx = self.chunk, self.grid_shape[1]
+        r0 = iy * c
+        h = min(c, self.height - r0)
+        strip = np.full((len(self.bands), c, nx * c), np.nan, dtype=np.float32)
+        view = strip[:, :h, :self.width]
+        transform = self.transform * Affine.translation(0, r0)
+        for path, mapping in sources:
+            if not mapping:
+                continue
+            ds = opened.get(path)
+            if ds is None:
+                ds = opened[path] = rasterio.open(path)
+            gmap = grid_map(ds.transform, ds.crs, ds.width, ds.height,
+                            transform, self.crs, self.width, h)
+            if gmap.window is None:
+                continue
+            positions = list(mapping)
+            # Not yet filled by an earlier source, and valid in this one
+            take = np.isnan(view[positions[0]]) & gmap.read_mask(load_mask(path))
+            data = gmap.read(ds, list(mapping.values()))
+            for pos, band in zip(positions, data):
+                view[pos][take] = band[take]
+        if {NDVI_BAND, "B8", "B4"} <= set(self.bands):
+            ndvi = view[self.bands.index(NDVI_BAND)]
+            missing = np.isnan(ndvi)
+            computed = evaluate(INDICES["NDVI"], {"B8": view[self.bands.index("B8")],
+                                                  "B4": view[self.bands.index("B4")]})
+            ndvi[missing] = computed[missing]
+        return strip.reshape(len(self.bands), c, nx, c).transpose(2, 0, 1, 3)
+
+    # ── Reads ──
+
+    def _band_indexes(self, bands):
+        if bands is None:
+            return list(range(len(self.bands)))
+        try:
+            return [self.bands.index(b) for b in bands]
+        except ValueError:
+            raise ValueError(f"unknown band in {bands}; the cube has {self.bands}") from None
+
+    def read(self, window=None, bands=None, dates=None):
+        """(dates, bands, rows, cols) float32 for a pixel window (whole grid by
+        default), copying only the chunk parts the window covers."""
+        window = window or Window(0, 0, self.width, self.height)
+        r0, c0 = int(window.row_off), int(window.col_off)
+        r1, c1 = r0 + int(window.height), c0 + int(window.width)
+        if r0 < 0 or c0 < 0 or r1 > self.height or c1 > self.width:
+            raise ValueError(f"window {window} is outside the {self.width} x {self.height} grid")
+        idx = self._band_indexes(bands)
+        dates = self.dates if dates is None else [iso_date(d) for d in dates]
+        out = np.empty((len(dates), len(idx), r1 - r0, c1 - c0), dtype=np.float32)
+        c = self.chunk
+        for t, date in enumerate(dates):
+            arr = self.array(date)
+            for iy in range(r0 // c, -(-r1 // c)):
+                ry0, ry1 = max(r0, iy * c), min(r1, (iy + 1) * c)
+                for ix in range(c0 // c, -(-c1 // c)):
+                    rx0, rx1 = max(c0, ix * c), min(c1, (ix + 1) * c)
+                    out[t, :, ry0 - r0:ry1 - r0, rx0 - c0:rx1 - c0] = \
+                        arr[iy, ix, idx, ry0 - iy * c:ry1 - iy * c, rx0 - ix * c:rx1 - ix * c]
+        return out
+
+    def index(self, x, y):
+        """(row, col) of a point in the cube CRS."""
+        col, row = ~self.transform * (x, y)
+        row, col = int(np.floor(row)), int(np.floor(col))
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            raise ValueError(f"({x}, {y}) is outside the cube")
+        return row, col
+
+    def pixel(self, x, y, bands=None, dates=None):
+        """Temporal profile of the pixel at (x, y) in the cube CRS: (dates, bands)."""
+        row, col = self.index(x, y)
+        c, idx = self.chunk, self._band_indexes(bands)
+        dates = self.dates if dates is None else [iso_date(d) for d in dates]
+        return np.array([self.array(d)[row // c, col // c, idx, row % c, col % c]
+                         for d in dates], dtype=np.float32).reshape(len(dates), len(idx))
+
+    def region(self, window, band, stat="mean", dates=None):
+        """Per-date statistic of one band over a pixel window (NaN if it has no valid pixel)."""
+        data = self.read(window, [band], dates)[:, 0].reshape(len(dates or self.dates), -1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN dates
+            return ROLLING_STATS[stat](data, axis=1)
+
+    def rolling(self, band, size, stat="mean"):
+        """Rolling temporal statistic of one band over size consecutive dates.
+        Yields (window, (len(dates) - size + 1, rows, cols) float32) chunk row
+        by chunk row, so only one strip of every date is in memory."""
+        if not 1 <= size <= len(self.dates):
+            raise ValueError(f"rolling size {size} needs 1..{len(self.dates)} dates")
+        fn = ROLLING_STATS[stat]
+        for r0 in range(0, self.height, self.chunk):
+            window = Window(0, r0, self.width, min(self.chunk, self.height - r0))
+            data = self.read(window, [band])[:, 0]
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                result = fn(sliding_window_view(data, size, axis=0), axis=-1)
+            yield window, result.astype(np.float32, copy=False)
+
+
+def _write_meta(path, meta):
+    tmp = os.path.join(path, META_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, os.path.join(path, META_NAME))
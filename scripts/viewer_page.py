@@ -0,0 +1,466 @@
+"""
+HTML page of the 10m vs 1m comparison viewer: a drag slider over the
+original and SR layers with RGB / false color / NDVI tabs. The viewer is
+either static (six images inlined as data URIs) or tiled (canvas drawing
+256 px XYZ tiles fetched relative to the page, from a pyramid on disk or
+a tile server).
+"""
+import json
+
+
+def tiled_viewer(pyramid):
+    """(markup, script) drawing tiles <layer>/<z>/<x>/<y>.<format> described by
+    pyramid (width, height, tile_size, max_zoom, format)."""
+    viewer_markup = """<div class="compare-wrap" id="compareWrap">
+  <canvas id="view"></canvas>
+  <div class="slider-line" id="sliderLine"></div>
+  <div class="slider-handle" id="sliderHandle">
+    <svg viewBox="0 0 24 24"><path d="M8 5l-5 7 5 7V5zm8 0v14l5-7-5-7z"/></svg>
+  </div>
+</div>
+
+"""
+    viewer_script = f"""// Tile pyramid: <layer>/<z>/<x>/<y>.<format>, level max_zoom is full resolution
+const PYRAMID = {json.dumps(pyramid)};
+const MAX_SCALE = 4;        // screen px per 1m pixel at maximum zoom
+const CACHE_LIMIT = 512;    // decoded tiles kept in memory
+
+const wrap = document.getElementById('compareWrap');
+const canvas = document.getElementById('view');
+const ctx = canvas.getContext('2d');
+const sliderLine = document.getElementById('sliderLine');
+const sliderHandle = document.getElementById('sliderHandle');
+
+let mode = 'rgb';
+let sliderPos = 0.5;
+let dragging = false;
+let isPanning = false, panStart = {{x:0, y:0}};
+// view.scale: screen px per full-res px; view.x/y: screen position of the image origin
+let view = {{scale: 1, x: 0, y: 0}};
+let fitScale = 1;
+let drawPending = false;
+const tiles = new Map();
+
+function tileUrl(layer, z, x, y) {{ return `${{layer}}/${{z}}/${{x}}/${{y}}.${{PYRAMID.format}}`; }}
+
+function getTile(url) {{
+  let img = tiles.get(url);
+  if (img) {{
+    tiles.delete(url); tiles.set(url, img);   // mark as recently used
+    return img;
+  }}
+  img = new Image();
+  img.onload = requestDraw;
+  img.src = url;
+  tiles.set(url, img);
+  if (tiles.size > CACHE_LIMIT) tiles.delete(tiles.keys().next().value);
+  return img;
+}}
+
+function levelFor(scale) {{
+  // Coarsest level that still has at least one tile pixel per device pixel
+  const z = PYRAMID.max_zoom + Math.ceil(Math.log2(scale * (window.devicePixelRatio || 1)));
+  return Math.max(0, Math.min(PYRAMID.max_zoom, z));
+}}
+
+function drawLayer(layer, z, w, h) {{
+  const ts = PYRAMID.tile_size;
+  const k = Math.pow(2, PYRAMID.max_zoom - z);
+  const lw = Math.ceil(PYRAMID.width / k), lh = Math.ceil(PYRAMID.height / k);
+  const s = view.scale * k;   // screen px per level px
+  const x0 = Math.max(0, Math.floor(-view.x / s / ts));
+  const y0 = Math.max(0, Math.floor(-view.y / s / ts));
+  const x1 = Math.min(Math.ceil(lw / ts) - 1, Math.floor((w - view.x) / s / ts));
+  const y1 = Math.min(Math.ceil(lh / ts) - 1, Math.floor((h - view.y) / s / ts));
+  for (let ty = y0; ty <= y1; ty++) {{
+    for (let tx = x0; tx <= x1; tx++) {{
+      const img = getTile(tileUrl(layer, z, tx, ty));
+      if (img.complete && img.naturalWidth) {{
+        ctx.drawImage(img, view.x + tx * ts * s, view.y + ty * ts * s,
+                      img.naturalWidth * s, img.naturalHeight * s);
+      }}
+    }}
+  }}
+}}
+
+function drawSide(layer, z, w, h) {{
+  drawLayer(layer, 0, w, h);   // single-tile overview as placeholder while tiles load
+  if (z > 0) drawLayer(layer, z, w, h);
+}}
+
+function draw() {{
+  drawPending = false;
+  const w = wrap.clientWidth, h = wrap.clientHeight;
+  const z = levelFor(view.scale);
+  const split = sliderPos * w;
+  ctx.fillStyle = '#0a0e17';
+  ctx.fillRect(0, 0, w, h);
+  drawSide(mode + '_sr', z, w, h);
+  ctx.save();
+  ctx.beginPath(); ctx.rect(0, 0, split, h); ctx.clip();
+  ctx.fillRect(0, 0, split, h);
+  drawSide(mode + '_orig', z, w, h);
+  ctx.restore();
+}}
+
+function requestDraw() {{
+  if (!drawPending) {{ drawPending = true; requestAnimationFrame(draw); }}
+}}
+
+function resize() {{
+  const dpr = window.devicePixelRatio || 1;
+  canvas.width = wrap.clientWidth * dpr;
+  canvas.height = wrap.clientHeight * dpr;
+  canvas.style.width = wrap.clientWidth + 'px';
+  canvas.style.height = wrap.clientHeight + 'px';
+  ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+  fitScale = Math.min(wrap.clientWidth / PYRAMID.width, wrap.clientHeight / PYRAMID.height);
+  requestDraw();
+}}
+
+function resetView() {{
+  view.scale = fitScale;
+  view.x = (wrap.clientWidth - PYRAMID.width * fitScale) / 2;
+  view.y = (wrap.clientHeight - PYRAMID.height * fitScale) / 2;
+  requestDraw();
+}}
+
+function zoomAt(factor, cx, cy) {{
+  const ns = Math.max(fitScale, Math.min(MAX_SCALE, view.scale * factor));
+  if (ns === fitScale) {{ resetView(); return; }}
+  const f = ns / view.scale;
+  view.x = cx - (cx - view.x) * f;
+  view.y = cy - (cy - view.y) * f;
+  view.scale = ns;
+  requestDraw();
+}}
+
+function updateSlider() {{
+  const pct = (sliderPos * 100) + '%';
+  sliderLine.style.left = pct;
+  sliderHandle.style.left = pct;
+  requestDraw();
+}}
+
+// Slider drag
+sliderHandle.addEventListener('mousedown', e => {{ dragging = true; e.preventDefault(); e.stopPropagation(); }});
+sliderHandle.addEventListener('touchstart', e => {{ dragging = true; e.preventDefault(); }}, {{passive:false}});
+
+window.addEventListener('mousemove', e => {{
+  if (!dragging) return;
+  const r = wrap.getBoundingClientRect();
+  sliderPos = Math.max(0.02, Math.min(0.98, (e.clientX - r.left) / r.width));
+  updateSlider();
+}});
+window.addEventListener('touchmove', e => {{
+  if (!dragging) return;
+  const r = wrap.getBoundingClientRect();
+  sliderPos = Math.max(0.02, Math.min(0.98, (e.touches[0].clientX - r.left) / r.width));
+  updateSlider();
+}}, {{passive:false}});
+window.addEventListener('mouseup', () => {{ dragging = false; }});
+window.addEventListener('touchend', () => {{ dragging = false; }});
+
+// Pan
+canvas.addEventListener('mousedown', e => {{
+  if (view.scale <= fitScale) return;
+  isPanning = true;
+  panStart = {{x: e.clientX - view.x, y: e.clientY - view.y}};
+  canvas.style.cursor = 'grabbing';
+  e.preventDefault();
+}});
+window.addEventListener('mousemove', e => {{
+  if (!isPanning) return;
+  view.x = e.clientX - panStart.x;
+  view.y = e.clientY - panStart.y;
+  requestDraw();
+}});
+window.addEventListener('mouseup', () => {{ isPanning = false; canvas.style.cursor = ''; }});
+
+// Zoom around the cursor
+wrap.addEventListener('wheel', e => {{
+  e.preventDefault();
+  const r = wrap.getBoundingClientRect();
+  zoomAt(e.deltaY > 0 ? 0.9 : 1.1, e.clientX - r.left, e.clientY - r.top);
+}}, {{passive:false}});
+
+document.getElementById('zoomIn').onclick = () => zoomAt(1.4, wrap.clientWidth / 2, wrap.clientHeight / 2);
+document.getElementById('zoomOut').onclick = () => zoomAt(1 / 1.4, wrap.clientWidth / 2, wrap.clientHeight / 2);
+document.getElementById('zoomReset').onclick = resetView;
+window.addEventListener('resize', () => {{ resize(); resetView(); }});
+
+// Tabs
+function switchMode(m) {{
+  mode = m;
+  document.querySelectorAll('.tab').forEach(t => t.classList.toggle('active', t.dataset.mode === mode));
+  requestDraw();
+}}
+document.querySelectorAll('.tab').forEach(btn => btn.addEventListener('click', () => switchMode(btn.dataset.mode)));
+
+// Init
+resize();
+resetView();
+switchMode('rgb');
+updateSlider();
+"""
+    return viewer_markup, viewer_script
+
+
+def static_viewer(images, mime):
+    """(markup, script) showing the base64 images of every layer."""
+    viewer_markup = """<div class="compare-wrap" id="compareWrap">
+  <div class="compare-container" id="container">
+    <img class="img-right" id="imgRight" draggable="false" />
+    <div class="img-left-wrap" id="leftWrap">
+      <img id="imgLeft" draggable="false" />
+    </div>
+    <div class="slider-line" id="sliderLine"></div>
+    <div class="slider-handle" id="sliderHandle">
+      <svg viewBox="0 0 24 24"><path d="M8 5l-5 7 5 7V5zm8 0v14l5-7-5-7z"/></svg>
+    </div>
+  </div>
+</div>
+
+"""
+    viewer_script = f"""const DATA = {{
+  rgb_orig:  "data:{mime};base64,{images['rgb_orig']}",
+  rgb_sr:    "data:{mime};base64,{images['rgb_sr']}",
+  fc_orig:   "data:{mime};base64,{images['fc_orig']}",
+  fc_sr:     "data:{mime};base64,{images['fc_sr']}",
+  ndvi_orig: "data:{mime};base64,{images['ndvi_orig']}",
+  ndvi_sr:   "data:{mime};base64,{images['ndvi_sr']}"
+}};
+
+const container = document.getElementById('container');
+const leftWrap = document.getElementById('leftWrap');
+const imgLeft = document.getElementById('imgLeft');
+const imgRight = document.getElementById('imgRight');
+const sliderLine = document.getElementById('sliderLine');
+const sliderHandle = document.getElementById('sliderHandle');
+
+let sliderPos = 0.5;
+let dragging = false;
+let scale = 1, panX = 0, panY = 0;
+let isPanning = false, panStart = {{x:0, y:0}};
+
+function updateSlider() {{
+  const pct = (sliderPos * 100) + '%';
+  leftWrap.style.width = pct;
+  sliderLine.style.left = pct;
+  sliderHandle.style.left = pct;
+}}
+
+function updateTransform() {{
+  container.style.transform = `scale(${{scale}}) translate(${{panX}}px, ${{panY}}px)`;
+}}
+
+// Slider drag
+sliderHandle.addEventListener('mousedown', e => {{ dragging = true; e.preventDefault(); }});
+sliderHandle.addEventListener('touchstart', e => {{ dragging = true; e.preventDefault(); }}, {{passive:false}});
+
+window.addEventListener('mousemove', e => {{
+  if (!dragging) return;
+  const r = container.getBoundingClientRect();
+  sliderPos = Math.max(0.02, Math.min(0.98, (e.clientX - r.left) / r.width));
+  updateSlider();
+}});
+window.addEventListener('touchmove', e => {{
+  if (!dragging) return;
+  const r = container.getBoundingClientRect();
+  sliderPos = Math.max(0.02, Math.min(0.98, (e.touches[0].clientX - r.left) / r.width));
+  updateSlider();
+}}, {{passive:false}});
+window.addEventListener('mouseup', () => {{ dragging = false; }});
+window.addEventListener('touchend', () => {{ dragging = false; }});
+
+// Pan
+container.addEventListener('mousedown', e => {{
+  if (e.target === sliderHandle || e.target.closest('.slider-handle')) return;
+  if (scale <= 1) return;
+  isPanning = true;
+  panStart = {{x: e.clientX - panX * scale, y: e.clientY - panY * scale}};
+  container.style.cursor = 'grabbing';
+  e.preventDefault();
+}});
+window.addEventListener('mousemove', e => {{
+  if (!isPanning) return;
+  panX = (e.clientX - panStart.x) / scale;
+  panY = (e.clientY - panStart.y) / scale;
+  updateTransform();
+}});
+window.addEventListener('mouseup', () => {{ isPanning = false; container.style.cursor = ''; }});
+
+// Zoom
+container.addEventListener('wheel', e => {{
+  e.preventDefault();
+  scale = Math.max(1, Math.min(10, scale * (e.deltaY > 0 ? 0.9 : 1.1)));
+  if (scale === 1) {{ panX = 0; panY = 0; }}
+  updateTransform();
+}}, {{passive:false}});
+
+document.getElementById('zoomIn').onclick = () => {{ scale = Math.min(10, scale * 1.4); updateTransform(); }};
+document.getElementById('zoomOut').onclick = () => {{
+  scale = Math.max(1, scale / 1.4);
+  if (scale === 1) {{ panX = 0; panY = 0; }}
+  updateTransform();
+}};
+document.getElementById('zoomReset').onclick = () => {{ scale = 1; panX = 0; panY = 0; updateTransform(); }};
+
+// Tabs
+function switchMode(mode) {{
+  imgLeft.src = DATA[mode + '_orig'];
+  imgRight.src = DATA[mode + '_sr'];
+  document.querySelectorAll('.tab').forEach(t => t.classList.toggle('active', t.dataset.mode === mode));
+}}
+document.querySelectorAll('.tab').forEach(btn => btn.addEventListener('click', () => switchMode(btn.dataset.mode)));
+
+// Init
+switchMode('rgb');
+updateSlider();
+"""
+    return viewer_markup, viewer_script
+
+
+def comparison_page(viewer_markup, viewer_script, pixel_size_orig, pixel_size_sr, upsample_factor,
+                    extent_m, width, height, dates, place="Khartoum, Sudan"):
+    """The full HTML document around a static_viewer or tiled_viewer."""
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Khartoum Super-Resolution: 10m vs 1m</title>
+<style>
+  * {{ margin: 0; padding: 0; box-sizing: border-box; }}
+  body {{
+    font-family: 'Segoe UI', system-ui, -apple-system, sans-serif;
+    background: #0a0e17; color: #e0e6f0; overflow: hidden;
+    width: 100vw; height: 100vh;
+  }}
+
+  .compare-wrap {{
+    position: absolute; top: 0; left: 0; right: 0; bottom: 0;
+    display: flex; align-items: center; justify-content: center;
+    background: #0a0e17; overflow: hidden;
+  }}
+  .compare-container {{
+    position: relative;
+    width: 100vw; height: 100vh;
+    overflow: hidden;
+    transform-origin: center center;
+  }}
+  .compare-container img {{
+    position: absolute; top: 0; left: 0;
+    width: 100%; height: 100%;
+    object-fit: contain;
+    user-select: none; -webkit-user-drag: none;
+  }}
+  .img-left-wrap {{
+    position: absolute; top: 0; left: 0; bottom: 0;
+    width: 50%; overflow: hidden; z-index: 2;
+  }}
+  .img-left-wrap img {{
+    position: absolute; top: 0; left: 0;
+    width: 100vw; height: 100vh;
+    min-width: 100vw;
+    object-fit: contain;
+  }}
+  .img-right {{ z-index: 1; }}
+  #view {{ position: absolute; top: 0; left: 0; }}
+
+  .slider-line {{
+    position: absolute; top: 0; bottom: 0; width: 3px;
+    background: rgba(255,255,255,0.8); z-index: 10;
+    left: 50%; transform: translateX(-50%);
+    pointer-events: none;
+    box-shadow: 0 0 8px rgba(0,0,0,0.6);
+  }}
+  .slider-handle {{
+    position: absolute; top: 50%; left: 50%;
+    transform: translate(-50%, -50%);
+    width: 48px; height: 48px; border-radius: 50%; z-index: 11;
+    background: rgba(99,140,255,0.9); border: 3px solid #fff;
+    box-shadow: 0 0 24px rgba(99,140,255,0.5);
+    cursor: ew-resize; display: flex; align-items: center; justify-content: center;
+  }}
+  .slider-handle svg {{ width: 24px; height: 24px; fill: #fff; }}
+
+  .tabs {{
+    position: absolute; top: 16px; left: 50%; transform: translateX(-50%);
+    z-index: 100; display: flex; gap: 4px;
+    background: rgba(10,14,23,0.88); backdrop-filter: blur(12px);
+    padding: 5px; border-radius: 10px; border: 1px solid rgba(255,255,255,0.1);
+  }}
+  .tab {{
+    padding: 8px 22px; border: none; border-radius: 7px; cursor: pointer;
+    font-size: 13px; font-weight: 600; color: #8892a4;
+    background: transparent; transition: all 0.2s;
+  }}
+  .tab:hover {{ color: #c0c8d8; background: rgba(255,255,255,0.06); }}
+  .tab.active {{ color: #fff; background: rgba(99,140,255,0.3); }}
+
+  .label {{
+    position: absolute; top: 72px; z-index: 100;
+    padding: 6px 14px; border-radius: 6px; font-size: 12px; font-weight: 700;
+    letter-spacing: 0.6px; text-transform: uppercase;
+    background: rgba(10,14,23,0.82); backdrop-filter: blur(8px);
+    border: 1px solid rgba(255,255,255,0.1);
+  }}
+  .label-left {{ left: 16px; color: #f0a050; }}
+  .label-right {{ right: 16px; color: #50d0a0; }}
+
+  .info-panel {{
+    position: absolute; bottom: 20px; left: 16px; z-index: 100;
+    padding: 14px 18px; border-radius: 10px; font-size: 12px;
+    background: rgba(10,14,23,0.88); backdrop-filter: blur(12px);
+    border: 1px solid rgba(255,255,255,0.08); line-height: 1.8;
+    max-width: 340px;
+  }}
+  .info-panel h3 {{ font-size: 15px; margin-bottom: 8px; color: #fff; }}
+  .dim {{ color: #5a6478; }}
+  .val {{ color: #b0b8c8; }}
+  .hl {{ color: #6ea8ff; font-weight: 600; }}
+
+  .zoom-controls {{
+    position: absolute; bottom: 20px; right: 16px; z-index: 100;
+    display: flex; flex-direction: column; gap: 6px;
+  }}
+  .zoom-btn {{
+    width: 40px; height: 40px; border-radius: 8px; border: 1px solid rgba(255,255,255,0.12);
+    background: rgba(10,14,23,0.88); backdrop-filter: blur(8px);
+    color: #c0c8d8; font-size: 20px; cursor: pointer; display: flex;
+    align-items: center; justify-content: center; transition: all 0.15s;
+  }}
+  .zoom-btn:hover {{ background: rgba(99,140,255,0.2); color: #fff; }}
+</style>
+</head>
+<body>
+
+{viewer_markup}<div class="tabs" id="tabs">
+  <button class="tab active" data-mode="rgb">RGB</button>
+  <button class="tab" data-mode="fc">False Color</button>
+  <button class="tab" data-mode="ndvi">NDVI</button>
+</div>
+
+<div class="label label-left">Original 10m</div>
+<div class="label label-right">Super-Resolved 1m</div>
+
+<div class="info-panel">
+  <h3>{place}</h3>
+  <span class="dim">Original:</span> <span class="val">Sentinel-2 &mdash; {pixel_size_orig:.0f}m/px</span><br>
+  <span class="dim">Enhanced:</span> <span class="hl">S2DR4 &mdash; {pixel_size_sr:.0f}m/px ({upsample_factor}x)</span><br>
+  <span class="dim">Area:</span> <span class="val">{extent_m} m</span><br>
+  <span class="dim">Image:</span> <span class="val">{width} &times; {height} px</span><br>
+  <span class="dim">Dates:</span> <span class="val">{dates}</span>
+</div>
+
+<div class="zoom-controls">
+  <button class="zoom-btn" id="zoomIn" title="Zoom in">+</button>
+  <button class="zoom-btn" id="zoomOut" title="Zoom out">&minus;</button>
+  <button class="zoom-btn" id="zoomReset" title="Reset view" style="font-size:14px;">&#8634;</button>
+</div>
+
+<script>
+{viewer_script}</script>
+</body>
+</html>"""
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+# The pipeline modules are flat scripts that import their siblings
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+
+@pytest.fixture
+def write_tif(tmp_path):
+    """write_tif(name, data (bands, H, W), res=10, descriptions=None, **profile) -> path
+    of a GeoTIFF on a UTM 36N grid under tmp_path."""
+    def write(name, data, res=10.0, origin=(450000.0, 1730000.0), descriptions=None, **profile):
+        data = np.asarray(data)
+        path = str(tmp_path / name)
+        profile = dict({"driver": "GTiff", "width": data.shape[2], "height": data.shape[1],
+                        "count": data.shape[0], "dtype": data.dtype.name, "crs": "EPSG:32636",
+                        "transform": from_origin(*origin, res, res)}, **profile)
+        with rasterio.open(path, "w", **profile) as dst:
+            dst.write(data)
+            for i, desc in enumerate(descriptions or [], start=1):
+                dst.set_band_description(i, desc)
+        return path
+    return write
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from change import detect_change
+from s2dr4_tools.spectral import INDICES, MS_BANDS, compute_indices
+
+B8, B4 = MS_BANDS.index("B8"), MS_BANDS.index("B4")
+
+
+def _reflectance():
+    """60 x 70 px of vegetation (B8 > B4) with an invalid (all-zero) 8 x 8 corner."""
+    data = np.random.default_rng(0).uniform(0.02, 0.3, (len(MS_BANDS), 60, 70)).astype(np.float32)
+    data[B8] += 0.3
+    data[:, :8, :8] = 0
+    return data
+
+
+def _ms(write_tif, data, date="20260204"):
+    return write_tif(f"S2L3Ax10_T36PVC-abc-{date}_MS.tif", data, res=1.0, descriptions=MS_BANDS)
+
+
+def _ndvi(path, tmp_path):
+    return compute_indices(path, {"NDVI": INDICES["NDVI"]}, str(tmp_path / "indices"))["NDVI"]
+
+
+@pytest.mark.parametrize("dn", [False, True], ids=["reflectance", "scaled-dn"])
+@pytest.mark.parametrize("pair", ["MS/MS", "NDVI/MS", "MS/NDVI"])
+def test_self_comparison_finds_no_change(write_tif, tmp_path, pair, dn):
+    data = _reflectance()
+    ms = _ms(write_tif, np.round(data * 10000).astype(np.uint16) if dn else data)
+    ndvi = _ndvi(ms, tmp_path) if "NDVI" in pair else None
+    before, after = (ndvi if kind == "NDVI" else ms for kind in pair.split("/"))
+
+    summary = detect_change(before, after, str(tmp_path / "change"), scale=1e-4 if dn else 1.0,
+                            block_size=32, cell_px=16, workers=2)
+
+    assert summary["kind"] == ("NDVI" if ndvi else "MS")
+    assert summary["valid_pixels"] == 60 * 70 - 64
+    assert {name: c["pixels"] for name, c in summary["classes"].items()} == \
+        {"changed": 0, "ndvi_loss": 0, "ndvi_gain": 0}
+    assert summary["polygons"] == 0
+    assert max(abs(summary["dNDVI"]["min"]), abs(summary["dNDVI"]["max"])) < 1e-5
+
+
+def test_vegetation_loss_is_flagged(write_tif, tmp_path):
+    data = _reflectance()
+    ndvi = _ndvi(_ms(write_tif, data), tmp_path)
+    patch = data[:, 30:46, 20:52]
+    before_ndvi = (patch[B8] - patch[B4]) / (patch[B8] + patch[B4])
+    patch[B8] = patch[B4]  # NDVI -> 0
+    after = _ms(write_tif, data, date="20260301")
+
+    summary = detect_change(ndvi, after, str(tmp_path / "change"), block_size=32, cell_px=16)
+
+    expected = np.count_nonzero(before_ndvi > summary["ndvi_delta"])
+    assert summary["classes"]["ndvi_loss"]["pixels"] == expected > 0
+    assert summary["classes"]["changed"]["pixels"] == expected
+    assert summary["classes"]["ndvi_gain"]["pixels"] == 0
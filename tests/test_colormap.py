@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from s2dr4_tools.colormap import NDVI_COLORMAP
+
+
+def test_apply_fills_a_strided_out_view():
+    ndvi = np.linspace(-1, 1, 12 * 10, dtype=np.float32).reshape(12, 10)
+    ndvi[3, 4] = np.nan
+    image = np.zeros((12, 30, 3), dtype=np.uint8)
+    window = image[:, 5:15]
+    assert not window.flags.c_contiguous
+
+    result = NDVI_COLORMAP.apply(ndvi, out=window)
+
+    assert result is window
+    np.testing.assert_array_equal(image[:, 5:15], NDVI_COLORMAP.apply(ndvi))
+    assert not image[:, :5].any() and not image[:, 15:].any()
+
+
+def test_apply_rejects_a_mismatched_out():
+    with pytest.raises(ValueError):
+        NDVI_COLORMAP.apply(np.zeros((4, 5), dtype=np.float32), out=np.zeros((5, 4, 3), np.uint8))
@@ -0,0 +1,81 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+MS_BANDS = ["B2", "B3", "B4", "B5", "B6", "B7", "B8", "B8A", "B11", "B12"]
+SR_DIR = os.path.join("S2DR4_Khartoum_1m", "SD", "T36PVC", "T36PVC-9a3aee44d")
+
+
+def _write(path, data, transform):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with rasterio.open(path, "w", driver="GTiff", width=data.shape[2], height=data.shape[1],
+                       count=data.shape[0], dtype=data.dtype.name, crs="EPSG:32636",
+                       transform=transform, tiled=True, blockxsize=256, blockysize=256) as dst:
+        dst.write(data)
+        if data.shape[0] == len(MS_BANDS):
+            for i, name in enumerate(MS_BANDS, start=1):
+                dst.set_band_description(i, name)
+
+
+def _repo(root):
+    """The repo layout create_comparison.py expects, with small synthetic inputs."""
+    shutil.copytree(SCRIPTS, os.path.join(root, "scripts"),
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    rng = np.random.default_rng(8)
+    orig = rng.uniform(0, 0.4, (10, 70, 70)).astype(np.float32)
+    orig[:, :4] = np.nan
+    _write(os.path.join(root, "Data", "S2_Khartoum_khartoum_center_20260204_10bands.tif"),
+           orig, from_origin(451000, 1715500, 10, 10))
+    for product in ("TCI", "IRP", "NDVI"):
+        _write(os.path.join(root, SR_DIR, f"S2L3Ax10_T36PVC-9a3aee44d-20260131_{product}.tif"),
+               rng.integers(0, 256, (3, 600, 520), dtype=np.uint8),
+               from_origin(451100, 1715400, 1, 1))
+
+
+def _run(root, *args):
+    env = dict(os.environ, BROWSER="true")
+    subprocess.run([sys.executable, os.path.join("scripts", "create_comparison.py"), *args],
+                   cwd=root, env=env, check=True, capture_output=True)
+
+
+def _tree(root):
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            with open(os.path.join(dirpath, name), "rb") as f:
+                files[os.path.relpath(os.path.join(dirpath, name), root)] = f.read()
+    return files
+
+
+def test_max_memory_strips_match_one_strip(tmp_path):
+    root = str(tmp_path)
+    _repo(root)
+    tiles = os.path.join(root, "comparison_tiles")
+
+    _run(root, "--tiles")
+    one_strip = _tree(tiles)
+    shutil.rmtree(tiles)
+    _run(root, "--tiles", "--max-memory", "1M")
+
+    assert len(one_strip) > 6 * 7
+    assert _tree(tiles) == one_strip
+
+
+def test_max_memory_static_page_matches_one_strip(tmp_path):
+    root = str(tmp_path)
+    _repo(root)
+    page = os.path.join(root, "comparison.html")
+
+    _run(root)
+    with open(page, "rb") as f:
+        one_strip = f.read()
+    _run(root, "--max-memory", "1M")
+
+    with open(page, "rb") as f:
+        assert f.read() == one_strip
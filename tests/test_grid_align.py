@@ -0,0 +1,58 @@
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.warp import Resampling, reproject
+
+from s2dr4_tools.grid_align import GridMap, read_aligned
+
+X0, Y0 = 450000.0, 1730000.0
+
+
+def test_upsampled_target_takes_the_source_pixel_under_each_center():
+    src_t = from_origin(X0, Y0, 10, 10)
+    # 1 m target, offset by a fraction of a source pixel and overhanging the source
+    dst_t = from_origin(X0 + 3.5, Y0 - 7.25, 1, 1)
+    gmap = GridMap(src_t, "EPSG:32636", 20, 10, dst_t, "EPSG:32636", 200, 100)
+    data = np.arange(200, dtype=np.float32).reshape(1, 10, 20)
+
+    out = gmap.gather(data[:, gmap.window.row_off:, gmap.window.col_off:],
+                      np.empty((1, 100, 200), np.float32), fill=-1)
+
+    cols = np.floor((3.5 + np.arange(200) + 0.5) / 10).astype(int)
+    rows = np.floor((7.25 + np.arange(100) + 0.5) / 10).astype(int)
+    inside = (rows < 10)[:, None] & (cols < 20)[None, :]
+    expected = np.where(inside, data[0][np.minimum(rows, 9)[:, None], np.minimum(cols, 19)], -1)
+    np.testing.assert_array_equal(out[0], expected)
+
+
+def test_coarser_target_reads_decimated(write_tif):
+    # 1 m source whose 10 x 10 blocks are constant: any sample of a block is exact
+    blocks = np.arange(12 * 8, dtype=np.uint16).reshape(12, 8)
+    data = np.kron(blocks, np.ones((10, 10), np.uint16))[None]
+    path = write_tif("fine.tif", data, res=1.0, origin=(X0, Y0))
+
+    with rasterio.open(path) as ds:
+        gmap = GridMap(ds.transform, ds.crs, ds.width, ds.height,
+                       from_origin(X0, Y0, 10, 10), ds.crs, 8, 12)
+        out = read_aligned(ds, [1], from_origin(X0, Y0, 10, 10), ds.crs, 8, 12)
+
+    assert gmap.decimation > 1 and gmap.read_shape[0] < 120
+    np.testing.assert_array_equal(out[0], blocks)
+
+
+def test_reprojected_target_matches_gdal_nearest(write_tif):
+    rng = np.random.default_rng(5)
+    data = rng.integers(1, 255, (1, 120, 120), dtype=np.uint8)
+    path = write_tif("utm.tif", data, res=10.0, origin=(X0, Y0))
+    dst_t = from_origin(32.5360, 15.6450, 0.0001, 0.0001)
+
+    with rasterio.open(path) as ds:
+        out = read_aligned(ds, [1], dst_t, "EPSG:4326", 80, 80)
+    expected = np.zeros((80, 80), np.uint8)
+    reproject(data[0], expected, src_transform=from_origin(X0, Y0, 10, 10),
+              src_crs="EPSG:32636", dst_transform=dst_t, dst_crs="EPSG:4326",
+              resampling=Resampling.nearest)
+
+    assert (out[0] != 0).all() and (expected != 0).all()
+    # Lattice interpolation may flip a pixel that sits on a source edge
+    assert np.mean(out[0] != expected) < 0.01
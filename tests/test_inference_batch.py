@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from inference_batch import Manifest, bbox_polygon, plan_cells, run_jobs
+
+
+def _cells():
+    return plan_cells([bbox_polygon(32.50, 15.55, 32.56, 15.60)])
+
+
+def test_manifest_resumes_after_interrupt(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    out_dir = str(tmp_path / "out")
+    os.makedirs(out_dir)
+    manifest = Manifest(path)
+    assert manifest.add(_cells(), ["2025-01-10", "2025-02-10"]) == 2 * len(_cells())
+    calls = []
+
+    def infer(lonlat, date):
+        calls.append((lonlat, date))
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        with open(os.path.join(out_dir, f"{date}_{len(calls)}_TCI.tif"), "w") as f:
+            f.write("tif")
+
+    with pytest.raises(KeyboardInterrupt):
+        run_jobs(manifest, infer, out_dir)
+
+    resumed = Manifest(path)
+    assert resumed.counts() == {"done": 2, "pending": len(resumed.jobs) - 2}
+    assert resumed.add(_cells(), ["2025-01-10"]) == 0
+    counts = run_jobs(resumed, infer, out_dir)
+
+    assert counts == {"done": len(resumed.jobs)}
+    assert len(calls) == len(resumed.jobs) + 1
+    assert all(job["attempts"] == 1 and len(job["outputs"]) == 1
+               for job in Manifest(path).jobs.values())
+
+
+def test_failed_jobs_retry_up_to_max_attempts(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    manifest.add(_cells()[:1], ["2025-01-10"])
+
+    def infer(lonlat, date):
+        raise RuntimeError("CUDA out of memory")
+
+    counts = run_jobs(manifest, infer, str(tmp_path), max_attempts=2)
+
+    job = next(iter(manifest.jobs.values()))
+    assert counts == {"failed": 1}
+    assert job["attempts"] == 2 and "CUDA" in job["error"]
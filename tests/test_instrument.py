@@ -0,0 +1,38 @@
+import tracemalloc
+
+import numpy as np
+import rasterio
+from rasterio.io import DatasetReader
+
+from instrument import Run
+
+
+def test_closing_the_last_run_restores_rasterio_read(write_tif):
+    path = write_tif("band.tif", np.ones((1, 64, 64), np.float32))
+    original = DatasetReader.read
+
+    with Run("outer") as outer:
+        with Run("inner") as inner, rasterio.open(path) as ds:
+            ds.read(1)
+        assert DatasetReader.read is not original
+        with rasterio.open(path) as ds:
+            ds.read()
+    assert DatasetReader.read is original
+    with rasterio.open(path) as ds:
+        ds.read()
+
+    assert inner.files[path] == {"reads": 1, "decoded_mb": 64 * 64 * 4 / 1024 ** 2}
+    assert outer.files[path]["reads"] == 2
+
+
+def test_tracemalloc_only_on_request():
+    with Run("plain") as run, run.stage("work") as stage:
+        assert not tracemalloc.is_tracing()
+    assert stage["py_peak_mb"] is None and stage["seconds"] >= 0
+
+    with Run("traced", trace_memory=True) as run, run.stage("work") as stage:
+        assert tracemalloc.is_tracing()
+        buf = np.ones(1 << 20)
+    del buf
+    assert not tracemalloc.is_tracing()
+    assert stage["py_peak_mb"] >= 8
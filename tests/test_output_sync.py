@@ -0,0 +1,41 @@
+import os
+
+from output_sync import sync_outputs
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_second_sync_skips_unchanged_files(tmp_path):
+    src, dst = str(tmp_path / "src"), str(tmp_path / "dst")
+    _write(os.path.join(src, "a_MS.tif"), b"a" * 5000)
+    _write(os.path.join(src, "b_TCI.tif"), b"b" * 3000)
+    _write(os.path.join(src, "notes.txt"), b"not synced")
+    _write(os.path.join(src, "sub", "c_MS.tif"), b"c" * 10)
+
+    first = sync_outputs(src, dst, log=lambda msg: None)
+    assert sorted(first["copied"]) == ["a_MS.tif", "b_TCI.tif"] and first["skipped"] == []
+
+    # b touched with identical bytes: checksum match, still skipped; a rewritten
+    os.utime(os.path.join(src, "b_TCI.tif"), ns=(0, 10 ** 9))
+    _write(os.path.join(src, "a_MS.tif"), b"A" * 5000)
+    second = sync_outputs(src, dst, log=lambda msg: None)
+
+    assert second == {"copied": ["a_MS.tif"], "skipped": ["b_TCI.tif"]}
+    with open(os.path.join(dst, "a_MS.tif"), "rb") as f:
+        assert f.read() == b"A" * 5000
+    assert sync_outputs(src, dst, log=lambda msg: None)["copied"] == []
+    assert not any(name.endswith(".partial") for name in os.listdir(dst))
+
+
+def test_recursive_keeps_layout(tmp_path):
+    src, dst = str(tmp_path / "src"), str(tmp_path / "dst")
+    _write(os.path.join(src, "T36PVC", "x_MS.tif"), b"x" * 100)
+
+    result = sync_outputs(src, dst, recursive=True, log=lambda msg: None)
+
+    assert result["copied"] == [os.path.join("T36PVC", "x_MS.tif")]
+    assert os.path.getsize(os.path.join(dst, "T36PVC", "x_MS.tif")) == 100
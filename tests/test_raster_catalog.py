@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import rasterio
+
+import raster_catalog
+from raster_catalog import RasterCatalog
+from s2dr4_tools.spectral import INDICES, MS_BANDS, compute_indices
+from s2dr4_tools.validity import load_mask, mask_path
+
+
+def _scene(write_tif, date, seed, origin=(450000.0, 1730000.0)):
+    data = np.random.default_rng(seed).uniform(0.01, 0.6, (len(MS_BANDS), 64, 64)).astype(np.float32)
+    data[:, :4, :4] = np.nan
+    return write_tif(f"S2L3Ax10_T36PVC-abc-{date}_MS.tif", data, res=1.0, origin=origin,
+                     descriptions=MS_BANDS), data
+
+
+def test_refresh_rescans_only_changed_files(write_tif, tmp_path):
+    a, data = _scene(write_tif, "20260131", 0)
+    b, _ = _scene(write_tif, "20260204", 1, origin=(460000.0, 1730000.0))
+    db = str(tmp_path / "catalog.sqlite")
+
+    with RasterCatalog(db) as catalog:
+        assert sorted(catalog.refresh([str(tmp_path)], workers=2)["scanned"]) == [a, b]
+        band = catalog.bands(a)[0]
+        assert band["name"] == "B2" and band["valid"] == 64 * 64 - 16 and band["nodata"] == 16
+        np.testing.assert_allclose(band["mean"], np.nanmean(data[0]), rtol=1e-5)
+
+    # A new process sees the persisted catalog; only the rewritten file is opened
+    os.utime(b, ns=(0, 10 ** 9))
+    with RasterCatalog(db) as catalog:
+        result = catalog.refresh([str(tmp_path)], workers=2)
+        assert result["scanned"] == [b] and result["unchanged"] == 1
+        os.remove(a)
+        assert catalog.refresh([str(tmp_path)])["removed"] == [a]
+        assert [r["path"] for r in catalog.query(product="MS", date="2026-02-04")] == [b]
+        assert catalog.query(date="20260131") == []
+
+
+def test_scan_builds_mask_and_stats_in_one_pass(write_tif, monkeypatch):
+    path, _ = _scene(write_tif, "20260131", 0)
+    reads = []
+    original = rasterio.io.DatasetReader.read
+    monkeypatch.setattr(rasterio.io.DatasetReader, "read",
+                        lambda ds, *a, **kw: reads.append(kw.get("window")) or original(ds, *a, **kw))
+
+    _, bands = raster_catalog.scan_raster(path)
+
+    blocks = len(reads)
+    assert blocks == len(set(reads))  # every block decoded once for mask and stats
+    assert os.path.exists(mask_path(path)) and load_mask(path).count() == 64 * 64 - 16
+    assert [b["valid"] for b in bands] == [64 * 64 - 16] * len(MS_BANDS)
+    reads.clear()
+    assert raster_catalog.scan_raster(path)[1] == bands
+    assert len(reads) == blocks  # the mask now comes from memory, only the stats read
+
+
+def test_query_by_bbox(write_tif, tmp_path):
+    a, _ = _scene(write_tif, "20260131", 0)
+    _scene(write_tif, "20260204", 1, origin=(460000.0, 1730000.0))
+    with RasterCatalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        catalog.refresh([str(tmp_path)], stats=False)
+        rec = catalog.get(a)
+        bbox = (rec["min_lon"], rec["min_lat"], rec["max_lon"], rec["max_lat"])
+        assert [r["path"] for r in catalog.query(bbox=bbox)] == [a]
+
+
+def test_index_rasters_are_not_cataloged_as_sr_products(write_tif, tmp_path):
+    ms, _ = _scene(write_tif, "20260131", 0)
+    written = compute_indices(ms, {"NDVI": INDICES["NDVI"], "NDWI": INDICES["NDWI"]},
+                              str(tmp_path / "indices"), workers=2)
+
+    with RasterCatalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        catalog.refresh([str(tmp_path)], stats=False)
+        assert [r["path"] for r in catalog.query(product="MS")] == [ms]
+        for path in written.values():
+            rec = catalog.get(path)
+            assert rec is not None and rec["product"] is None and rec["count"] == 1
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from s2dr4_tools.stats import BandStats, raster_stats
+
+
+def test_merged_blocks_match_numpy():
+    rng = np.random.default_rng(1)
+    values = np.concatenate([rng.normal(0.2, 0.05, 40000), rng.normal(0.6, 0.1, 20000)])
+    values[::97] = np.nan
+    blocks = np.array_split(values, 7)
+
+    merged = BandStats()
+    for block in blocks:
+        part = BandStats()
+        part.update(block)
+        merged.merge(part)
+
+    valid = values[~np.isnan(values)]
+    assert merged.count == valid.size
+    assert merged.nan_count == values.size - valid.size
+    assert merged.min == valid.min() and merged.max == valid.max()
+    assert merged.mean == pytest.approx(valid.mean(), rel=1e-12)
+    assert merged.std == pytest.approx(valid.std(), rel=1e-9)
+    span = valid.max() - valid.min()
+    q = [2, 25, 50, 75, 98]
+    np.testing.assert_allclose(merged.percentile(q), np.percentile(valid, q), atol=span * 2e-3)
+
+
+def test_range_growth_keeps_percentiles():
+    # Later blocks fall outside the first block's range on both sides
+    blocks = [np.linspace(0, 1, 5000), np.linspace(-3, 0, 5000), np.linspace(1, 8, 5000)]
+    stats = BandStats()
+    for block in blocks:
+        stats.update(block)
+    values = np.concatenate(blocks)
+    np.testing.assert_allclose(stats.percentile([10, 50, 90]),
+                               np.percentile(values, [10, 50, 90]), atol=11 * 2e-3)
+
+
+def test_raster_stats_streams_blocks(write_tif):
+    rng = np.random.default_rng(2)
+    data = rng.uniform(0, 1000, (2, 300, 200)).astype(np.float32)
+    path = write_tif("stack.tif", data, tiled=True, blockxsize=64, blockysize=64)
+
+    for st, band in zip(raster_stats(path), data):
+        assert st.count == band.size
+        assert st.mean == pytest.approx(band.mean(dtype=np.float64), rel=1e-9)
+        assert st.min == band.min() and st.max == band.max()
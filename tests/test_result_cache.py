@@ -0,0 +1,51 @@
+import os
+
+import result_cache
+from result_cache import ResultCache
+
+LONLAT, DATE = (32.53, 15.58), "2026-01-31"
+
+
+def _outputs(out_dir):
+    paths = []
+    for product in ("MS", "TCI"):
+        path = os.path.join(out_dir, "T36PVC", f"S2L3Ax10_T36PVC-abc-20260131_{product}.tif")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(product.encode() * 1000)
+        paths.append(path)
+    return paths
+
+
+def test_hit_checks_stat_without_rehashing(tmp_path, monkeypatch):
+    out_dir = str(tmp_path / "out")
+    cache = ResultCache(str(tmp_path / "cache"))
+    cache.store(LONLAT, DATE, "1.0", out_dir, _outputs(out_dir))
+    hashed = []
+    monkeypatch.setattr(result_cache, "file_sha256", hashed.append)
+
+    entry = ResultCache(str(tmp_path / "cache")).lookup((32.530001, 15.58), DATE, "1.0")
+
+    assert entry is not None and entry["scene_date"] == "20260131"
+    assert hashed == []
+    linked = cache.materialize(entry, str(tmp_path / "again"))
+    assert sorted(os.path.basename(p) for p in linked) == [
+        "S2L3Ax10_T36PVC-abc-20260131_MS.tif", "S2L3Ax10_T36PVC-abc-20260131_TCI.tif"]
+
+
+def test_changed_output_drops_the_entry(tmp_path):
+    out_dir = str(tmp_path / "out")
+    cache = ResultCache(str(tmp_path / "cache"))
+    ms, tci = _outputs(out_dir)
+    cache.store(LONLAT, DATE, "1.0", out_dir, [ms, tci])
+
+    # Touched but identical: re-hashed once, still a hit
+    os.utime(tci, ns=(0, 10 ** 9))
+    assert cache.lookup(LONLAT, DATE, "1.0") is not None
+    # Rewritten in place through the hardlink, same size: dropped
+    with open(ms, "r+b") as f:
+        f.write(b"XX")
+    os.utime(ms, ns=(0, 2 * 10 ** 9))
+    assert cache.lookup(LONLAT, DATE, "1.0") is None
+    assert cache.lookup(LONLAT, DATE, "1.0") is None
+    assert not os.listdir(os.path.join(str(tmp_path / "cache"), "objects"))
@@ -0,0 +1,37 @@
+import os
+import re
+
+import numpy as np
+import pytest
+import rasterio
+
+from s2dr4_tools.spectral import INDICES, MS_BANDS, compile_index, compute_indices, evaluate
+
+# How the SR products are named: S2L3Ax10_<tile>-<id>-<date>_<PRODUCT>.tif
+SR_PRODUCT = re.compile(r"S2L3Ax10_[^-]+-[^-]+-\d{8}_[A-Z]+\.tif$")
+
+
+def test_index_rasters_are_not_named_like_sr_products(write_tif, tmp_path):
+    rng = np.random.default_rng(6)
+    data = rng.uniform(0.01, 0.6, (len(MS_BANDS), 300, 300)).astype(np.float32)
+    data[:, :5, :5] = 0
+    ms = write_tif("S2L3Ax10_T36PVC-abc-20260131_MS.tif", data, descriptions=MS_BANDS)
+
+    written = compute_indices(ms, {"NDVI": INDICES["NDVI"], "NDWI": INDICES["NDWI"]},
+                              str(tmp_path / "indices"), workers=2, block_size=128)
+
+    assert sorted(os.path.basename(p) for p in written.values()) == [
+        "S2L3Ax10_T36PVC-abc-20260131.idx_NDVI.tif", "S2L3Ax10_T36PVC-abc-20260131.idx_NDWI.tif"]
+    assert not any(SR_PRODUCT.search(p) for p in written.values())
+    bands = dict(zip(MS_BANDS, data))
+    with rasterio.open(written["NDVI"]) as ds:
+        ndvi = ds.read(1)
+    assert np.isnan(ndvi[:5, :5]).all()
+    np.testing.assert_allclose(ndvi[5:], evaluate(INDICES["NDVI"], bands)[5:], rtol=1e-6)
+
+
+def test_expressions_are_restricted():
+    assert compile_index("sqrt(B8) - B4 / 2")[1] == ["B8", "B4"]
+    for expr in ("__import__('os')", "B8.real", "B99 + 1", "'a' + B4"):
+        with pytest.raises(ValueError):
+            compile_index(expr)
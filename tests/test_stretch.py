@@ -0,0 +1,32 @@
+import numpy as np
+
+from s2dr4_tools.stretch import StretchCache, StretchParams, apply_stretch, raster_stretch
+
+
+def test_save_load_round_trip(tmp_path):
+    rng = np.random.default_rng(3)
+    cache = StretchCache({8: StretchParams(100.0, 4000.0)})
+    red = rng.uniform(200, 3000, (64, 64))
+    params = cache.get("tile_a.tif", 4, red)
+    path = str(tmp_path / "stretch.json")
+    cache.save(path)
+
+    loaded = StretchCache.load(path)
+
+    assert loaded.shared == {4: params, 8: StretchParams(100.0, 4000.0)}
+    # Shared cut points win over the data of any other file
+    assert loaded.get("tile_b.tif", 4, red * 10) == params
+    np.testing.assert_array_equal(apply_stretch(red, loaded.get("tile_b.tif", 4, red)),
+                                  apply_stretch(red, params))
+
+
+def test_raster_stretch_matches_in_memory_percentiles(write_tif):
+    rng = np.random.default_rng(4)
+    data = rng.uniform(0, 10000, (1, 256, 256)).astype(np.float32)
+    data[0, :10] = 0
+    path = write_tif("band.tif", data, tiled=True, blockxsize=64, blockysize=64)
+
+    low, high = raster_stretch(path, [1])[1]
+
+    valid = data[data != 0]
+    np.testing.assert_allclose([low, high], np.percentile(valid, [2, 98]), rtol=5e-3)
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from tile_pyramid import PyramidWriter, level_size, max_zoom_for, write_pyramid
+
+
+def test_levels_halve_down_to_one_tile():
+    assert max_zoom_for(256, 100) == 0
+    assert max_zoom_for(257, 100) == 1
+    assert max_zoom_for(1000, 600) == 2
+    assert level_size(1000, 601, 2, 2) == (1000, 601)
+    assert level_size(1000, 601, 2, 1) == (500, 301)
+    assert level_size(1000, 601, 2, 0) == (250, 151)
+
+
+def test_write_pyramid_crops_edge_tiles(tmp_path):
+    rng = np.random.default_rng(0)
+    img = Image.fromarray(rng.integers(0, 256, (300, 600, 3), dtype=np.uint8))
+
+    meta = write_pyramid(img, str(tmp_path))
+
+    assert meta["max_zoom"] == 2
+    expected = {2: (3, 2), 1: (2, 1), 0: (1, 1)}
+    assert meta["tiles"] == sum(nx * ny for nx, ny in expected.values())
+    for z, (nx, ny) in expected.items():
+        assert sorted(os.listdir(tmp_path / str(z))) == [str(x) for x in range(nx)]
+        assert len(os.listdir(tmp_path / str(z) / "0")) == ny
+    with Image.open(tmp_path / "2" / "2" / "1.jpg") as tile:
+        assert tile.size == (600 - 512, 300 - 256)
+    with Image.open(tmp_path / "0" / "0" / "0.jpg") as tile:
+        assert tile.size == (150, 75)
+
+
+def _tree(root):
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+def test_strips_match_a_single_strip(tmp_path):
+    rng = np.random.default_rng(7)
+    img = rng.integers(0, 256, (701, 530, 3), dtype=np.uint8)
+
+    whole = PyramidWriter(str(tmp_path / "whole"), 530, 701)
+    whole.write(img)
+    meta = whole.close()
+    strips = PyramidWriter(str(tmp_path / "strips"), 530, 701)
+    for row0 in range(0, 701, 37):
+        strips.write(img[row0:row0 + 37])
+
+    assert strips.close() == meta
+    assert meta["max_zoom"] == 2 and meta["tiles"] == 3 * 3 + 2 * 2 + 1
+    assert _tree(tmp_path / "strips") == _tree(tmp_path / "whole")
+
+
+def test_close_rejects_missing_rows(tmp_path):
+    writer = PyramidWriter(str(tmp_path), 300, 300)
+    writer.write(np.zeros((100, 300, 3), np.uint8))
+    with pytest.raises(ValueError):
+        writer.close()
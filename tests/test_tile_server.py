@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from tile_server import DatasetPool, TileCache, TileServer
+
+
+def _key(n):
+    return ("aoi", "rgb_sr", 3, n, 0, "jpg")
+
+
+def test_tile_cache_evicts_least_recently_used(tmp_path):
+    cache = TileCache(max_bytes=300)
+    for n in range(3):
+        cache.put(_key(n), bytes([n]) * 100)
+    assert cache.get(_key(0)) == (bytes([0]) * 100, "memory")  # 0 is now the most recent
+
+    cache.put(_key(3), b"3" * 100)
+
+    assert cache.get(_key(1)) == (None, None)
+    assert [cache.get(_key(n))[1] for n in (0, 2, 3)] == ["memory"] * 3
+    assert cache.stats()["bytes"] == 300 and cache.stats()["misses"] == 1
+
+    # With a cache directory an evicted tile is read back from disk
+    cache = TileCache(max_bytes=150, cache_dir=str(tmp_path))
+    cache.put(_key(0), b"a" * 100)
+    cache.put(_key(1), b"b" * 100)
+    assert cache.stats()["tiles"] == 1
+    assert cache.get(_key(0)) == (b"a" * 100, "disk")
+    assert cache.get(_key(0)) == (b"a" * 100, "memory")
+
+
+def test_dataset_pool_reuses_idle_handles(write_tif):
+    a = write_tif("a.tif", np.ones((1, 8, 8), dtype=np.uint8))
+    b = write_tif("b.tif", np.ones((1, 8, 8), dtype=np.uint8))
+    pool = DatasetPool(max_idle=2)
+
+    with pool.dataset(a) as ds:
+        first = ds
+    with pool.dataset(a) as ds:
+        assert ds is first
+        with pool.dataset(a) as busy:  # the idle handle is checked out: open another
+            assert busy is not first
+    assert pool.opened == 2 and pool.idle == 2
+
+    with pool.dataset(b) as ds:
+        pass
+    assert pool.opened == 3 and pool.idle == 2
+    assert busy.closed and not first.closed and not ds.closed  # least recently used first
+
+    pool.close()
+    assert pool.idle == 0 and ds.closed
+
+
+class _SlowSource:
+    key, ext = "aoi", "jpg"
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def render(self, layer, z, x, y):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.2)
+        if x < 0:
+            raise KeyError(z, x, y)
+        return f"{layer}/{z}/{x}/{y}".encode()
+
+
+@pytest.fixture
+def server():
+    server = TileServer(("127.0.0.1", 0), [], DatasetPool())
+    yield server
+    server.server_close()
+
+
+def test_concurrent_requests_render_a_tile_once(server):
+    source = _SlowSource()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: server.tile(source, "rgb_sr", 2, 1, 1), range(8)))
+
+    assert source.calls == 1
+    assert {data for data, _ in results} == {b"rgb_sr/2/1/1"}
+    assert sorted(hit for _, hit in results) == ["render"] + ["shared"] * 7
+    assert server.tile(source, "rgb_sr", 2, 1, 1)[1] == "memory"
+    assert server.stats()["rendered"] == 1 and server.stats()["shared"] == 7
+
+
+def test_waiting_requests_share_a_render_error(server):
+    source = _SlowSource()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(server.tile, source, "rgb_sr", 2, -1, 0) for _ in range(4)]
+    for future in futures:
+        with pytest.raises(KeyError):
+            future.result()
+    assert source.calls == 1 and server._in_flight == {}
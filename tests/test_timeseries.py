@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+from rasterio.windows import Window
+
+from s2dr4_tools.spectral import MS_BANDS
+from timeseries import NDVI_BAND, TimeSeriesCube
+
+
+def _scene(write_tif, date, seed):
+    """40 x 50 px at 1 m with an invalid (NaN) corner."""
+    data = np.random.default_rng(seed).uniform(0.05, 0.6, (len(MS_BANDS), 40, 50)).astype(np.float32)
+    data[:, :5, :6] = np.nan
+    return write_tif(f"S2L3Ax10_T36PVC-abc-{date}_MS.tif", data, res=1.0,
+                     descriptions=MS_BANDS), data
+
+
+def test_append_and_pixel_profile(write_tif, tmp_path):
+    a, data_a = _scene(write_tif, "20260131", 0)
+    b, data_b = _scene(write_tif, "20260204", 1)
+    cube = TimeSeriesCube.for_products(str(tmp_path / "cube"), [a], chunk=16)
+    assert cube.bands == list(MS_BANDS) + [NDVI_BAND]
+    assert (cube.width, cube.height) == (50, 40)
+
+    assert cube.append("20260131", [a], workers=2)
+    assert cube.append("2026-02-04", [b], workers=2)
+    assert cube.dates == ["2026-01-31", "2026-02-04"]
+
+    # Pixel (row 20, col 33): center of the cell in the cube CRS
+    x, y = cube.transform * (33.5, 20.5)
+    profile = cube.pixel(x, y)
+    np.testing.assert_array_equal(profile[:, :-1], [data_a[:, 20, 33], data_b[:, 20, 33]])
+    b8, b4 = MS_BANDS.index("B8"), MS_BANDS.index("B4")
+    np.testing.assert_allclose(profile[0, -1], (data_a[b8, 20, 33] - data_a[b4, 20, 33])
+                               / (data_a[b8, 20, 33] + data_a[b4, 20, 33]), rtol=1e-5)
+
+    # A window across chunk borders matches the source; invalid pixels are NaN
+    block = cube.read(Window(0, 0, 50, 40), bands=["B2"])
+    np.testing.assert_array_equal(block[:, 0], np.stack([data_a[0], data_b[0]]))
+    assert np.isnan(cube.pixel(*(cube.transform * (2.5, 2.5)))).all()
+
+
+def test_append_is_incremental(write_tif, tmp_path):
+    a, _ = _scene(write_tif, "20260131", 0)
+    b, data_b = _scene(write_tif, "20260204", 1)
+    path = str(tmp_path / "cube")
+    cube = TimeSeriesCube.for_products(path, [a], chunk=16)
+    cube.append("20260131", [a])
+    first = os.path.join(path, "dates", "2026-01-31.npy")
+    stamp = os.stat(first).st_mtime_ns
+
+    # Reopened later: a stored date is skipped, a new one leaves the old file alone
+    cube = TimeSeriesCube.for_products(path, [a, b])
+    assert not cube.append("20260131", [a])
+    assert cube.append("20260204", [b])
+    assert os.stat(first).st_mtime_ns == stamp
+    np.testing.assert_array_equal(TimeSeriesCube(path).read(dates=["20260204"])[0, :-1], data_b)
+    with pytest.raises(KeyError):
+        cube.array("20260301")
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+from rasterio.windows import Window
+
+from s2dr4_tools import read_valid_within_bounds, read_within_bounds
+from s2dr4_tools import validity
+from s2dr4_tools.validity import load_mask, mask_path
+
+
+def _bordered(write_tif):
+    """100 x 100 px, 10 m: valid inside, an invalid border of NaN and all-zero pixels."""
+    data = np.random.default_rng(2).uniform(0.1, 0.6, (3, 100, 100)).astype(np.float32)
+    data[:, :7] = 0
+    data[1, :, 95:] = np.nan
+    data[:, 40:43, 20:60] = 0
+    return write_tif("bordered.tif", data), data
+
+
+def test_sidecar_round_trip(write_tif, monkeypatch):
+    path, data = _bordered(write_tif)
+    expected = ~(np.isnan(data).any(axis=0) | (data == 0).all(axis=0))
+
+    mask = load_mask(path)
+    assert os.path.exists(mask_path(path))
+    np.testing.assert_array_equal(mask.read(), expected)
+    np.testing.assert_array_equal(mask.read(Window(90, -3, 20, 10))[3:, :10], expected[:7, 90:])
+    assert not mask.read(Window(90, -3, 20, 10))[:3].any()
+
+    # A fresh process reads the sidecar instead of the raster
+    validity._loaded.clear()
+    monkeypatch.setattr(validity, "compute_mask", lambda ds: pytest.fail("recomputed"))
+    np.testing.assert_array_equal(load_mask(path).bits, mask.bits)
+
+    # Rewriting the raster invalidates the sidecar
+    monkeypatch.undo()
+    data[:, :, 50:] = 0
+    write_tif("bordered.tif", data)
+    assert load_mask(path).count() == expected[:, :50].sum()
+
+
+@pytest.mark.parametrize("bounds, size", [
+    ((450000.0, 1729000.0, 451000.0, 1730000.0), (30, 30)),   # decimated, step 3.33
+    ((449950.0, 1728930.0, 450970.0, 1730040.0), (37, 41)),   # partly outside the source
+    ((450000.0, 1729000.0, 451000.0, 1730000.0), (250, 250)),  # upsampled
+])
+def test_mask_lines_up_with_the_data(write_tif, bounds, size):
+    path, _ = _bordered(write_tif)
+    w, h = size
+    data = read_within_bounds(path, bounds, w, h)
+    valid = read_valid_within_bounds(path, bounds, w, h)
+    # Outside the source the data is filled with 0, which is invalid as well
+    expected = ~(np.isnan(data).any(axis=0) | (data == 0).all(axis=0))
+    np.testing.assert_array_equal(valid, expected)